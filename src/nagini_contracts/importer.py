@@ -5,70 +5,91 @@ file, You can obtain one at http://mozilla.org/MPL/2.0/.
 """
 
 import ast
-import imp
-import os
+import hashlib
+import importlib.util
 import sys
-import types
 
-from astor import to_source
+from importlib.abc import MetaPathFinder
+from importlib.machinery import PathFinder, SourceFileLoader
+from nagini_contracts import contracts, transformer
 from nagini_contracts.transformer import transform_ast
 
-class ContractsImporter(object):
+
+def _transformer_tag() -> str:
     """
-    Import hook for use on `sys.meta_path`.
+    Returns a tag identifying the version of the transformation, which is
+    derived from the source of the transformer, the source of the contracts
+    module (which defines e.g. the ghost prefix) and the optimization level.
     """
+    digest = hashlib.sha256()
+    for module in (transformer, contracts):
+        with open(module.__file__, 'rb') as file:
+            digest.update(file.read())
+    return 'contracts{}o{}'.format(digest.hexdigest()[:12], sys.flags.optimize)
 
-    def __init__(self):
-        self._cache = {}
 
-    def find_module(self, name, path=None):
-        try:
-            lastname = name.split('.')[-1]
-            # print("find_module", name, path)
-            self._cache[name] = imp.find_module(lastname, path), path
-        except ImportError:
-            return None
-        return self
+class ContractsLoader(SourceFileLoader):
+    """
+    Loader for source modules which removes contracts and ghost code from
+    the AST before compiling it. The transformed bytecode is cached like
+    that of plain modules, i.e., in ``__pycache__`` and keyed by the mtime
+    and size of the source, but under a tag of the transformer version, so
+    it is never mixed up with the untransformed bytecode of the same module.
+    """
 
-    def load_module(self, name):
-        # print("load_module", name)
-        try:
-            (fd, fn, info), path = self._cache[name]
-        except KeyError:
-            # can that happen?
-            raise ImportError(name)
-        if info[2] == imp.PY_SOURCE:
-            newpath = None
-            filename = fn
-            with fd:
-                code = fd.read()
-        elif info[2] == imp.PY_COMPILED:
-            newpath = None
-            filename = fn[:-1]
-            with open(filename, 'U') as f:
-                code = f.read()
-        elif info[2] == imp.PKG_DIRECTORY:
-            filename = os.path.join(fn, '__init__.py')
-            newpath = [fn]
-            with open(filename, 'U') as f:
-                code = f.read()
-        else:
-            return imp.load_module(name, fd, fn, info)
+    def __init__(self, fullname: str, path: str, tag: str) -> None:
+        super().__init__(fullname, path)
+        self._tag = tag
+        self._bytecode_path = None
+        self._transformed_path = None
+
+    def _redirect(self, path: str) -> str:
+        """
+        Maps the path of the untransformed bytecode of this module, which the
+        standard machinery uses, to that of the transformed one.
+        """
+        if self._bytecode_path is None:
+            self._bytecode_path = importlib.util.cache_from_source(self.path)
+            self._transformed_path = importlib.util.cache_from_source(
+                self.path, optimization=self._tag)
+        if path == self._bytecode_path:
+            return self._transformed_path
+        return path
+
+    def get_data(self, path: str) -> bytes:
+        return super().get_data(self._redirect(path))
+
+    def set_data(self, path: str, data: bytes, **kwargs) -> None:
+        super().set_data(self._redirect(path), data, **kwargs)
+
+    def source_to_code(self, data, path, *, _optimize=-1):
+        tree = ast.parse(data, path)
+        transformed_ast = transform_ast(tree)
+        return compile(transformed_ast, path, 'exec', dont_inherit=True,
+                       optimize=_optimize)
+
+    def exec_module(self, module) -> None:
         try:
-            module = types.ModuleType(name)
-            module.__file__ = filename
-            if newpath:
-                module.__path__ = newpath
-            tree = ast.parse(code)
-            # print("Before Transformation:\n%s" % to_source(tree))
-            transformed_ast = transform_ast(tree)
-            # print("After Transformation:\n%s" % to_source(transformed_ast))
-            code = compile(transformed_ast, filename, 'exec')
-            sys.modules[name] = module
-            exec(code, module.__dict__)
-            return module
-        except Exception:
-            raise ImportError('cannot import %s' % (name))
+            super().exec_module(module)
+        except Exception as e:
+            raise ImportError('cannot import %s' % (module.__name__)) from e
+
+
+class ContractsImporter(MetaPathFinder):
+    """
+    Import hook for use on `sys.meta_path`. Finds modules like the standard
+    path based finder, but loads source modules with a ``ContractsLoader``.
+    """
+
+    def __init__(self):
+        self._tag = _transformer_tag()
+
+    def find_spec(self, fullname, path=None, target=None):
+        spec = PathFinder.find_spec(fullname, path, target)
+        if spec is None or not isinstance(spec.loader, SourceFileLoader):
+            return None
+        spec.loader = ContractsLoader(fullname, spec.origin, self._tag)
+        return spec
 
 
 def install_hook():
@@ -56,192 +56,115 @@ class GhostCollector(ast.NodeVisitor):
             self.ghost_funcs.add(node.name)
 
 
-class NoOpCollector(ast.NodeVisitor):
+class ContractEraser:
     """
-    AST visitor that collects @pure, @predicate and @ghost annotations.
+    Removes ghost code and calls to contract functions from an AST in a
+    single bottom-up pass. A statement is removed if it is a ghost function
+    or if it is a module-level statement, an assignment, deletion,
+    expression statement, loop or conditional and an expression of the
+    statement itself (i.e., not of the statements it contains) uses a ghost
+    variable or calls a contract or ghost function. Afterwards, function and
+    class definitions, loops, conditionals and try-statements whose body
+    became empty are removed as well, unless they have other branches; all
+    other bodies left empty get a ``pass`` statement.
     """
-    def __init__(self, ghost_vars, ghost_funcs):
-        self.ghost_vars = ghost_vars
-        self.ghost_funcs = ghost_funcs
-        self.noop_stmts = set()
-        self._cur_stmt = None
-
-    @property
-    def _cur_stmt(self):
-        return self.__cur_stmt
-
-    @_cur_stmt.setter
-    def _cur_stmt(self, stmt):
-        assert stmt is None or \
-               isinstance(stmt, ast.stmt), "_cur_stmt is not a stmt or None"
-        self.__cur_stmt = stmt
 
-    @classmethod
-    def collect(cls, tree, ghost_vars, ghost_funcs):
-        """
-        Collects and returns statements that need to be turned into no-ops
-        (i.e., deleted from the AST).
+    # Fields containing the statements nested in a statement.
+    BODY_FIELDS = ('body', 'orelse', 'finalbody')
 
-        :param tree: The AST of the program.
-        :param ghost_vars: A set containing the names of ghost variables.
-        :param ghost_funcs: A set containing the names of ghost functions.
-        :return: A set containing ast.stmt's that need to be deleted.
-        """
-        collector = cls(ghost_vars, ghost_funcs)
-        collector.visit(tree)
-        return collector.noop_stmts
+    # Fields containing nodes with bodies nested in a statement (exception
+    # handlers and match cases).
+    CLAUSE_FIELDS = ('handlers', 'cases')
 
-    def visit_Module(self, node):
-        for stmt in node.body:
-            self._cur_stmt = stmt
-            self.visit(stmt)
-
-    def visit_Name(self, node):
-        if node.id.startswith(GHOST_PREFIX):
-            self.noop_stmts.add(self._cur_stmt)
-
-    def visit_Attribute(self, node):
-        if node.attr.startswith(GHOST_PREFIX):
-            self.noop_stmts.add(self._cur_stmt)
-
-    def visit_FunctionDef(self, node):
-        if node.name in self.ghost_funcs:
-            self.noop_stmts.add(node)
-            return
+    # Statements which are removed if they contain ghost code.
+    ERASABLE = (ast.Delete, ast.Assign, ast.AugAssign, ast.AnnAssign, ast.Expr,
+                ast.For, ast.AsyncFor, ast.While, ast.If)
 
-        self.generic_visit(node)
+    # Statements which are removed if their body became empty.
+    REMOVABLE = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.For,
+                 ast.AsyncFor, ast.While, ast.If, ast.Try)
 
-    def visit_Call(self, node):
-        func_name = None
-        if isinstance(node.func, ast.Name):
-            func_name = node.func.id
-        elif isinstance(node.func, ast.Attribute):
-            func_name = node.func.attr
-
-        if func_name in contract_keywords or func_name in self.ghost_funcs:
-            self.noop_stmts.add(self._cur_stmt)
-            return
-
-        self.generic_visit(node)
-
-    def visit_Delete(self, node):
-        self._cur_stmt = node
-        self.generic_visit(node)
-
-    def visit_Assign(self, node):
-        self._cur_stmt = node
-        self.generic_visit(node)
-
-    def visit_AugAssign(self, node):
-        self._cur_stmt = node
-        self.generic_visit(node)
-
-    def visit_Expr(self, node):
-        self._cur_stmt = node
-        self.generic_visit(node)
-
-    def visit_For(self, node):
-        self._cur_stmt = node
-        self.generic_visit(node)
-
-    def visit_While(self, node):
-        self._cur_stmt = node
-        self.generic_visit(node)
-
-    def visit_If(self, node):
-        self._cur_stmt = node
-        self.generic_visit(node)
-
-
-class EmptyBodyCollector(ast.NodeVisitor):
-    """
-    Collects statement that have an empty body due to AST rewriting.
-    """
-    def __init__(self):
-        self.noop_stmts = set()
-
-    @classmethod
-    def collect(cls, tree):
-        """
-        Collects and returns statements that need to be removed, because their
-        body does not contain any statements (e.g., after removing all
-        statements involving ghost variables).
-
-        :param tree: The AST of the program.
-        :return: Set containing ast.stmt's that need to be deleted.
-        """
-        collector = cls()
-        collector.visit(tree)
-        return collector.noop_stmts
-
-    def visit_FunctionDef(self, node):
-        if not node.body:
-            self.noop_stmts.add(node)
-            return
-
-        self.generic_visit(node)
-
-    def visit_ClassDef(self, node):
-        if not node.body:
-            self.noop_stmts.add(node)
-            return
-
-        self.generic_visit(node)
-
-    def visit_For(self, node):
-        if not node.body:
-            self.noop_stmts.add(node)
-            return
-
-        self.generic_visit(node)
-
-    def visit_While(self, node):
-        if not node.body:
-            self.noop_stmts.add(node)
-            return
-
-        self.generic_visit(node)
-
-    def visit_If(self, node):
-        if not node.body:
-            self.noop_stmts.add(node)
-            return
-
-        self.generic_visit(node)
-
-    def visit_Try(self, node):
-        if not node.body:
-            self.noop_stmts.add(node)
-            return
-
-        self.generic_visit(node)
-
-
-class StmtEraser(ast.NodeTransformer):
-    """
-    AST visitor that deletes statements passed by 'noop_stmts'.
-    """
-    def __init__(self, noop_stmts):
-        self.noop_stmts = noop_stmts
+    def __init__(self, ghost_funcs):
+        self.ghost_funcs = ghost_funcs
 
     @classmethod
-    def erase(cls, tree, noop_stmts):
+    def erase(cls, tree, ghost_funcs):
         """
-        Removes statements in 'noop_stmts' from the AST.
+        Removes ghost code and contracts from the AST.
 
         :param tree: The AST to be modified.
-        :param noop_stmts: The statements to be removed.
+        :param ghost_funcs: A set containing the names of ghost functions.
         :return: The modified AST.
         """
-        eraser = cls(noop_stmts)
-        return eraser.visit(tree)
+        eraser = cls(ghost_funcs)
+        if hasattr(tree, 'body'):
+            tree.body = eraser.erase_body(tree.body, True)
+        return tree
 
-    def visit(self, node):
-        if isinstance(node, ast.stmt) and node in self.noop_stmts:
-            return None
-
-        self.generic_visit(node)
-        return node
+    def is_noop_expr(self, node):
+        """
+        Checks if the given expression uses a ghost variable or calls a
+        contract or ghost function.
+        """
+        for child in ast.walk(node):
+            if isinstance(child, ast.Name):
+                if child.id.startswith(GHOST_PREFIX):
+                    return True
+            elif isinstance(child, ast.Attribute):
+                if child.attr.startswith(GHOST_PREFIX):
+                    return True
+            elif isinstance(child, ast.Call):
+                func_name = None
+                if isinstance(child.func, ast.Name):
+                    func_name = child.func.id
+                elif isinstance(child.func, ast.Attribute):
+                    func_name = child.func.attr
+                if (func_name in contract_keywords or
+                        func_name in self.ghost_funcs):
+                    return True
+        return False
+
+    def is_noop_stmt(self, stmt, top_level):
+        if (isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef)) and
+                stmt.name in self.ghost_funcs):
+            return True
+        if not top_level and not isinstance(stmt, self.ERASABLE):
+            return False
+        for field, value in ast.iter_fields(stmt):
+            if field in self.BODY_FIELDS or field in self.CLAUSE_FIELDS:
+                continue
+            values = value if isinstance(value, list) else [value]
+            for child in values:
+                if isinstance(child, ast.AST) and self.is_noop_expr(child):
+                    return True
+        return False
+
+    def erase_body(self, body, top_level=False):
+        """
+        Returns the given list of statements without the ones to be removed,
+        after removing ghost code and contracts from the remaining ones.
+        """
+        result = []
+        for stmt in body:
+            if self.is_noop_stmt(stmt, top_level):
+                continue
+            for field in self.BODY_FIELDS:
+                nested = getattr(stmt, field, None)
+                if nested:
+                    setattr(stmt, field, self.erase_body(nested))
+            for field in self.CLAUSE_FIELDS:
+                for clause in getattr(stmt, field, None) or []:
+                    clause.body = self.erase_body(clause.body)
+                    if not clause.body:
+                        clause.body = [ast.copy_location(ast.Pass(), clause)]
+            if hasattr(stmt, 'body') and not stmt.body:
+                other_branches = (getattr(stmt, 'orelse', None) or
+                                  getattr(stmt, 'finalbody', None))
+                if isinstance(stmt, self.REMOVABLE) and not other_branches:
+                    continue
+                stmt.body = [ast.copy_location(ast.Pass(), stmt)]
+            result.append(stmt)
+        return result
 
 
 def transform_ast(tree):
@@ -251,15 +174,7 @@ def transform_ast(tree):
     :param tree: source node of the AST
     :return: source node of the transformed AST
     """
-    transformed_ast = tree
-    # Collect ghost variables and functions.
+    # Collect ghost functions, which may be used before they are defined.
     ghost_vars, ghost_funcs = GhostCollector.collect(tree)
-    # Collect no-op statements.
-    noop_stmts = NoOpCollector.collect(transformed_ast, ghost_vars, ghost_funcs)
-    while noop_stmts:
-        # Remove no-op statements from the AST.
-        transformed_ast = StmtEraser.erase(transformed_ast, noop_stmts)
-        # Collect statements with an empty body.
-        noop_stmts = EmptyBodyCollector.collect(transformed_ast)
-
-    return transformed_ast
+    # Remove ghost code and contracts.
+    return ContractEraser.erase(tree, ghost_funcs)
@@ -47,6 +47,7 @@ from nagini_translation.lib.program_nodes import (
     UnionType,
 )
 from nagini_translation.lib.resolver import get_target as do_get_target
+from nagini_translation.lib.resolver import resolution_cache
 from nagini_translation.lib.typedefs import Expr
 from nagini_translation.lib.typeinfo import TypeInfo
 from nagini_translation.lib.util import (
@@ -56,6 +57,8 @@ from nagini_translation.lib.util import (
     get_parent_of_type,
     InvalidProgramException,
     is_io_existential,
+    number_nodes,
+    set_parent,
     UnsupportedException,
 )
 from nagini_translation.lib.views import PythonModuleView
@@ -116,6 +119,7 @@ class Analyzer(ast.NodeVisitor):
         ``container``. Checks there is any existing element with the
         same name, and raises an exception in that case.
         """
+        resolution_cache.clear()
         if isinstance(container, PythonModule):
             if name in container.classes:
                 cls = container.classes[name]
@@ -145,6 +149,7 @@ class Analyzer(ast.NodeVisitor):
         with tokenize.open(abs_path) as file:
             text = file.read()
         parse_result = ast.parse(text)
+        number_nodes(parse_result)
         try:
             mark_text_ranges(parse_result, text)
         except Exception:
@@ -231,7 +236,7 @@ class Analyzer(ast.NodeVisitor):
         else:
             if names:
                 new_module = PythonModuleView(new_module, names)
-            into_mod.from_imports.append(new_module)
+            into_mod.add_from_import(new_module)
 
 
     def analyze(self) -> None:
@@ -363,13 +368,13 @@ class Analyzer(ast.NodeVisitor):
                         self.visit(item, node)
 
     def visit(self, child_node: ast.AST, parent: ast.AST) -> None:
-        child_node._parent = parent
+        set_parent(child_node, parent)
         method = 'visit_' + child_node.__class__.__name__
         visitor = getattr(self, method, self.visit_default)
         visitor(child_node)
 
     def visit_but_ignore(self, node: ast.AST, parent: ast.AST) -> None:
-        node._parent = parent
+        set_parent(node, parent)
         for field in node._fields:
             fieldval = getattr(node, field)
             if isinstance(fieldval, ast.AST):
@@ -907,12 +912,7 @@ class Analyzer(ast.NodeVisitor):
         Returns the closest parent node of 'node' that is of the given type
         (e.g. ast.Name), or None if there is no such node.
         """
-        parent = node._parent
-        while not isinstance(parent, ast.Module):
-            if isinstance(parent, typ):
-                return parent
-            parent = parent._parent
-        return None
+        return get_parent_of_type(node, typ)
 
     def _get_parents_of_type(self, node: ast.AST, typ: type) -> List[ast.AST]:
         """
@@ -0,0 +1,11 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+"""Benchmarks for performance-critical parts of the translator.
+
+Every benchmark is a module that can be run with
+``python -m nagini_translation.benchmarks.<name>``.
+"""
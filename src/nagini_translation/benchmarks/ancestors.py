@@ -0,0 +1,122 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+"""Benchmark for looking up enclosing nodes during the analysis.
+
+Generates modules in which names are nested increasingly deeply inside
+statements, analyzes them and compares looking up the enclosing nodes of all
+names using the index recorded by the analyzer with walking the parent
+chain::
+
+    python -m nagini_translation.benchmarks.ancestors --depths 10 50 200
+"""
+
+import argparse
+import ast
+import json
+import os
+import shutil
+import tempfile
+import time
+
+# These imports monkey-patch mypy and should happen as early as possible.
+import nagini_translation.mypy_patches.column_info_patch
+import nagini_translation.mypy_patches.optional_patch
+
+from nagini_translation.analyzer import Analyzer
+from nagini_translation.lib import config
+from nagini_translation.lib.typeinfo import TypeInfo
+from nagini_translation.lib.util import ENCLOSING_KINDS, get_parent_of_type
+from typing import List
+
+
+def generate_module(depth: int, names: int) -> str:
+    """
+    Returns the source of a module with a function containing ``depth``
+    nested if-statements, the innermost of which contains ``names``
+    assignments.
+    """
+    lines = ['def f(x: int) -> int:', '    y = 0']
+    indent = '    '
+    for level in range(depth):
+        lines.append(indent + 'if x > {}:'.format(level))
+        indent += '    '
+    for _ in range(names):
+        lines.append(indent + 'y = y + x')
+    lines.append('    return y')
+    return '\n'.join(lines) + '\n'
+
+
+def walk_parent_of_type(node: ast.AST, typ: type) -> ast.AST:
+    parent = node._parent
+    while not isinstance(parent, ast.Module):
+        if isinstance(parent, typ):
+            return parent
+        parent = parent._parent
+    return None
+
+
+def analyze(path: str) -> Analyzer:
+    from nagini_translation.main import collect_modules
+    types = TypeInfo()
+    if not types.check(path):
+        raise Exception('Generated module is not type correct.')
+    analyzer = Analyzer(types, path, set())
+    resources_path = os.path.join(os.path.dirname(config.__file__), '..',
+                                  'resources')
+    with open(os.path.join(resources_path, 'preamble.index'), 'r') as file:
+        analyzer.add_native_silver_builtins(json.loads(file.read()))
+    analyzer.module.add_builtin_vars()
+    collect_modules(analyzer, path)
+    return analyzer
+
+
+def benchmark(depths: List[int], names: int) -> None:
+    tmp_dir = tempfile.mkdtemp(prefix='nagini')
+    try:
+        print('Depth, Names, Analysis, Walk, Index')
+        for depth in depths:
+            path = os.path.join(tmp_dir, 'nested{}.py'.format(depth))
+            with open(path, 'w') as file:
+                file.write(generate_module(depth, names))
+            start = time.time()
+            analyzer = analyze(path)
+            analysis = time.time() - start
+            nodes = [node for node in ast.walk(analyzer.asts[path])
+                     if isinstance(node, ast.Name)]
+            times = []
+            for lookup in (walk_parent_of_type, get_parent_of_type):
+                start = time.time()
+                for node in nodes:
+                    for kind in ENCLOSING_KINDS:
+                        lookup(node, kind)
+                times.append(time.time() - start)
+            print('{}, {}, {:.3f}, {:.4f}, {:.4f}'.format(
+                depth, len(nodes), analysis, times[0], times[1]))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--depths',
+        type=int,
+        nargs='+',
+        help='nesting depths of the generated modules',
+        default=[10, 50, 100, 200])
+    parser.add_argument(
+        '--names',
+        type=int,
+        help='number of assignments in the innermost block',
+        default=500)
+    args = parser.parse_args()
+    os.environ['MYPYPATH'] = config.mypy_path
+    benchmark(args.depths, args.names)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+"""Benchmark for conversions between Python and Scala collections.
+
+Measures the conversion helpers of ``ViperAST`` for collections of
+different sizes, and counts the calls into the JVM made while translating
+a corpus of Python files, relative to the number of statements in them::
+
+    python -m nagini_translation.benchmarks.conversions \\
+        --output calls.json tests/functional/verification
+
+A previous output file can be given with ``--compare`` to report files for
+which the number of JVM calls per statement increased.
+"""
+
+import argparse
+import ast
+import json
+import os
+import time
+
+# These imports monkey-patch mypy and should happen as early as possible.
+import nagini_translation.mypy_patches.column_info_patch
+import nagini_translation.mypy_patches.optional_patch
+
+from nagini_translation.lib import config
+from nagini_translation.lib.jvmaccess import JVM
+from nagini_translation.lib.typeinfo import TypeException
+from nagini_translation.lib.util import (
+    InvalidProgramException,
+    UnsupportedException,
+)
+from nagini_translation.lib.viper_ast import ViperAST
+from typing import Dict, List
+
+
+SIZES = [0, 1, 10, 100, 1000]
+
+DEFAULT_CORPUS = 'tests/functional/verification/'
+
+
+class JVMCallCounter:
+    """
+    Counts calls of Java methods and constructors made through JPype.
+    Must be installed before the JVM is started, since only Java classes
+    loaded afterwards are affected.
+    """
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def install(self) -> None:
+        import _jpype
+        from jpype import _jclass
+        get_attr = _jclass._javaGetAttr
+        init = _jclass._javaInit
+
+        def counting_get_attr(obj, name):
+            result = get_attr(obj, name)
+            if isinstance(result, _jpype._JavaBoundMethod):
+                self.calls += 1
+            return result
+
+        def counting_init(obj, *args):
+            self.calls += 1
+            init(obj, *args)
+
+        _jclass._javaGetAttr = counting_get_attr
+        _jclass._javaInit = counting_init
+
+
+def count_statements(path: str) -> int:
+    with open(path, 'r') as file:
+        tree = ast.parse(file.read())
+    return sum(1 for node in ast.walk(tree) if isinstance(node, ast.stmt))
+
+
+def benchmark_helpers(viper: ViperAST, counter: JVMCallCounter,
+                      repetitions: int) -> None:
+    """
+    Measures the collection conversion helpers for different sizes.
+    """
+    no_pos = viper.NoPosition
+    no_info = viper.NoInfo
+    print('Helper, Size, Calls, Time')
+    for size in SIZES:
+        elements = [viper.IntLit(i, no_pos, no_info) for i in range(size)]
+        entries = {viper.TypeVar('T' + str(i)): viper.Int
+                   for i in range(min(size, 100))}
+        seq = viper.to_seq(elements)
+        for name, run in [('to_seq', lambda: viper.to_seq(elements)),
+                          ('to_list', lambda: viper.to_list(seq)),
+                          ('to_map', lambda: viper.to_map(entries))]:
+            calls = counter.calls
+            start = time.time()
+            for _ in range(repetitions):
+                run()
+            duration = (time.time() - start) / repetitions
+            calls = (counter.calls - calls) / repetitions
+            print('{}, {}, {:.0f}, {:.6f}'.format(name, size, calls,
+                                                  duration))
+
+
+def benchmark_corpus(paths: List[str], jvm: JVM,
+                     counter: JVMCallCounter) -> Dict[str, Dict]:
+    """
+    Translates the given files and counts the JVM calls made for each of
+    them.
+    """
+    from nagini_translation.main import translate
+    results = {}
+    print('File, Statements, Calls, Calls/Statement, Time')
+    for path in paths:
+        statements = count_statements(path)
+        calls = counter.calls
+        start = time.time()
+        try:
+            translate(path, jvm)
+        except (TypeException, InvalidProgramException,
+                UnsupportedException):
+            # Tests for translation errors are not interesting here.
+            continue
+        duration = time.time() - start
+        calls = counter.calls - calls
+        per_statement = calls / max(statements, 1)
+        results[path] = {
+            'statements': statements,
+            'calls': calls,
+            'calls_per_statement': per_statement,
+            'time': duration,
+        }
+        print('{}, {}, {}, {:.1f}, {:.2f}'.format(
+            path, statements, calls, per_statement, duration))
+    total_statements = sum(r['statements'] for r in results.values())
+    total_calls = sum(r['calls'] for r in results.values())
+    print('Total: {} statements, {} calls, {:.1f} calls per statement'.format(
+        total_statements, total_calls, total_calls / max(total_statements, 1)))
+    return results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict],
+            tolerance: float) -> bool:
+    """
+    Reports all files for which the number of calls per statement grew by
+    more than the given fraction. Returns True if there are none.
+    """
+    regressions = 0
+    for path, result in sorted(results.items()):
+        if path not in baseline:
+            continue
+        before = baseline[path]['calls_per_statement']
+        after = result['calls_per_statement']
+        if after > before * (1 + tolerance):
+            regressions += 1
+            print('Regression: {}: {:.1f} -> {:.1f} calls per statement'.format(
+                path, before, after))
+    return regressions == 0
+
+
+def collect_files(paths: List[str]) -> List[str]:
+    result = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dir_names, file_names in os.walk(path):
+                dir_names.sort()
+                for file_name in sorted(file_names):
+                    if file_name.endswith('.py'):
+                        result.append(os.path.join(root, file_name))
+        else:
+            result.append(path)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        'paths',
+        nargs='*',
+        help='Python files or directories to translate',
+        default=[DEFAULT_CORPUS])
+    parser.add_argument(
+        '--repetitions',
+        type=int,
+        help='number of times every helper is run',
+        default=100)
+    parser.add_argument(
+        '--output',
+        help='write the results for the corpus to the given JSON file')
+    parser.add_argument(
+        '--compare',
+        help='compare the results with the given JSON file')
+    parser.add_argument(
+        '--tolerance',
+        type=float,
+        help='allowed relative increase of calls per statement',
+        default=0.05)
+    args = parser.parse_args()
+
+    counter = JVMCallCounter()
+    counter.install()
+    os.environ['MYPYPATH'] = config.mypy_path
+    jvm = JVM(config.classpath)
+    viper = ViperAST(jvm, jvm.java, jvm.scala, jvm.viper, 'benchmark')
+    benchmark_helpers(viper, counter, args.repetitions)
+    results = benchmark_corpus(collect_files(args.paths), jvm, counter)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare, 'r') as file:
+            baseline = json.load(file)
+        if not compare(results, baseline, args.tolerance):
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
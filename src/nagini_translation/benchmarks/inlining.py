@@ -0,0 +1,198 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+"""Benchmark for the templates of inlined method bodies.
+
+Translates constructor-heavy test files and generated modules, whose
+constructors inline the constructors of their base classes, once with and
+once without templates of inlined bodies, checks that both translations are
+the same and reports their times and the size of the Silver programs::
+
+    python -m nagini_translation.benchmarks.inlining --chains 5 10 --wide 20
+
+Generated chains consist of classes which each call the constructor of the
+previous one, generated wide hierarchies of many subclasses of one base
+class whose constructor they call.
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+# These imports monkey-patch mypy and should happen as early as possible.
+import nagini_translation.mypy_patches.column_info_patch
+import nagini_translation.mypy_patches.optional_patch
+
+from nagini_translation.lib import config
+from nagini_translation.lib.errors import error_manager
+from nagini_translation.lib.jvmaccess import JVM
+from nagini_translation.lib.profiling import program_size
+from typing import List, Tuple
+
+
+CORPUS = [
+    'tests/functional/verification/test_constructor.py',
+    'tests/functional/verification/test_super.py',
+]
+
+
+def generate_chain(depth: int, fields: int) -> str:
+    """
+    Returns the source of a module with ``depth`` classes, each of which
+    extends the previous one, initializes ``fields`` fields and calls the
+    constructor of its base class.
+    """
+    lines = ['from nagini_contracts.contracts import *', '', '']
+    for level in range(depth):
+        base = 'C{}'.format(level - 1) if level else 'object'
+        lines.append('class C{}({}):'.format(level, base))
+        lines.append('    def __init__(self, x: int) -> None:')
+        if level:
+            lines.append('        C{}.__init__(self, x)'.format(level - 1))
+        for field in range(fields):
+            lines.append('        self.f{}_{} = x + {}'.format(level, field,
+                                                               field))
+        for field in range(fields):
+            lines.append('        Ensures(Acc(self.f{}_{}))'.format(
+                level, field))
+            lines.append('        Ensures(self.f{0}_{1} == x + {1})'.format(
+                level, field))
+        lines.extend(['', ''])
+    return '\n'.join(lines)
+
+
+def generate_wide(subclasses: int, fields: int) -> str:
+    """
+    Returns the source of a module with a base class which initializes
+    ``fields`` fields, and ``subclasses`` classes which extend it and call
+    its constructor.
+    """
+    lines = [
+        'from nagini_contracts.contracts import *',
+        '',
+        '',
+        'class Base:',
+        '    def __init__(self, x: int) -> None:',
+    ]
+    for field in range(fields):
+        lines.append('        self.f{0} = x + {0}'.format(field))
+    for field in range(fields):
+        lines.append('        Ensures(Acc(self.f{0}) and self.f{0} == x + {0})'
+                     .format(field))
+    for sub in range(subclasses):
+        lines.extend([
+            '',
+            '',
+            'class Sub{}(Base):'.format(sub),
+            '    def __init__(self, x: int) -> None:',
+            '        Base.__init__(self, x)',
+            '        self.g{} = x'.format(sub),
+            '        Ensures(Acc(self.f0) and self.f0 == x)',
+            '        Ensures(Acc(self.g{0}) and self.g{0} == x)'.format(sub),
+        ])
+    return '\n'.join(lines) + '\n'
+
+
+def set_templates(enabled: bool) -> None:
+    config.file_config.config['Translation']['inline_templates'] = (
+        'true' if enabled else 'false')
+
+
+def run(path: str, jvm: JVM, repetitions: int) -> Tuple[float, float, str]:
+    """
+    Translates the given file the given number of times without and with
+    templates, and returns the minimal times of both and the program.
+    Raises an exception if the programs differ.
+    """
+    from nagini_translation.main import translate
+    best = [None, None]  # type: List[float]
+    programs = [None, None]  # type: List[str]
+    errors = [None, None]  # type: List[int]
+    for _ in range(repetitions):
+        for enabled in (False, True):
+            set_templates(enabled)
+            start = time.time()
+            prog = translate(path, jvm)
+            duration = time.time() - start
+            if prog is None:
+                raise Exception('Could not translate ' + path)
+            if best[enabled] is None or duration < best[enabled]:
+                best[enabled] = duration
+            programs[enabled] = str(prog)
+            errors[enabled] = error_manager.size()
+    if programs[False] != programs[True] or errors[False] != errors[True]:
+        raise Exception('Translations of {} differ.'.format(path))
+    return best[False], best[True], prog
+
+
+def benchmark(paths: List[str], chains: List[int], wide: List[int],
+              fields: int, jvm: JVM, repetitions: int) -> None:
+    tmp_dir = tempfile.mkdtemp(prefix='nagini')
+    files = [(path, path) for path in paths]
+    for depth in chains:
+        path = os.path.join(tmp_dir, 'chain{}.py'.format(depth))
+        with open(path, 'w') as file:
+            file.write(generate_chain(depth, fields))
+        files.append(('chain:{}'.format(depth), path))
+    for subclasses in wide:
+        path = os.path.join(tmp_dir, 'wide{}.py'.format(subclasses))
+        with open(path, 'w') as file:
+            file.write(generate_wide(subclasses, fields))
+        files.append(('wide:{}'.format(subclasses), path))
+    enabled = config.translation_config.inline_templates
+    try:
+        print('File, Methods, Lines, Without templates, With templates')
+        for name, path in files:
+            without, with_templates, prog = run(path, jvm, repetitions)
+            size = program_size(prog)
+            print('{}, {}, {}, {:.2f}, {:.2f}'.format(
+                name, size['methods'], size['lines'], without,
+                with_templates))
+    finally:
+        set_templates(enabled)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        'paths',
+        nargs='*',
+        help='Python files to translate',
+        default=CORPUS)
+    parser.add_argument(
+        '--chains',
+        type=int,
+        nargs='*',
+        help='numbers of classes of the generated constructor chains',
+        default=[5, 10])
+    parser.add_argument(
+        '--wide',
+        type=int,
+        nargs='*',
+        help='numbers of subclasses of the generated hierarchies',
+        default=[20, 50])
+    parser.add_argument(
+        '--fields',
+        type=int,
+        help='number of fields initialized by every generated constructor',
+        default=3)
+    parser.add_argument(
+        '--repetitions',
+        type=int,
+        help='number of times every file is translated',
+        default=3)
+    args = parser.parse_args()
+    os.environ['MYPYPATH'] = config.mypy_path
+    jvm = JVM(config.classpath)
+    benchmark(args.paths, args.chains, args.wide, args.fields, jvm,
+              args.repetitions)
+
+
+if __name__ == '__main__':
+    main()
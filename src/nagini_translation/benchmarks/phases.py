@@ -0,0 +1,355 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+"""Benchmark for the phases of translating and verifying programs.
+
+Translates and verifies a fixed corpus of test files and generated modules
+and reports the time spent in each phase (type checking, analysis,
+translation, SIF and ARP transformations, consistency check and
+verification), as well as size metrics of the resulting Silver programs::
+
+    python -m nagini_translation.benchmarks.phases --output phases.json
+
+Besides the times, the outcome of the verification and its number of
+errors are recorded.
+A previous output file can be given with ``--compare`` to report phases
+that became slower, programs that became larger and programs whose
+verification outcome changed; the benchmark then fails if there are any,
+or if a program has no baseline. ``make benchmark`` compares against the
+reference baseline ``phases_baseline.json`` next to this module, and fails
+if there is none. Since timings depend on the machine, the reference
+baseline is recorded with ``make benchmark_baseline`` on the release
+machine and committed, and ``make benchmark`` is run there before a
+release.
+The benchmark fails without recording or comparing anything if a program
+cannot be translated or its verification does not complete. With
+``--type-slice``, only the part of the type hierarchy each program needs is
+encoded, which allows comparing the verification times of both encodings.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+# These imports monkey-patch mypy and should happen as early as possible.
+import nagini_translation.mypy_patches.column_info_patch
+import nagini_translation.mypy_patches.optional_patch
+
+from nagini_translation.lib import config
+from nagini_translation.lib.jvmaccess import JVM
+from nagini_translation.lib.profiling import PHASES, phase_timer, program_size
+from nagini_translation.lib.typeinfo import TypeException
+from nagini_translation.lib.util import (
+    InvalidProgramException,
+    UnsupportedException,
+)
+from nagini_translation.verifier import INCOMPLETE_OUTCOMES, ViperVerifier
+from typing import Dict, List, Optional, Tuple
+
+
+CORPUS = [
+    'tests/functional/verification/test_behavioural_subtyping.py',
+    'tests/functional/verification/test_exception.py',
+    'tests/functional/verification/test_lists.py',
+    'tests/functional/verification/test_lock.py',
+    'tests/functional/verification/test_with.py',
+    'tests/functional/verification/examples/cav_example.py',
+    'tests/functional/verification/examples/iap_bst.py',
+    'tests/functional/verification/examples/rosetta_qsort.py',
+    'tests/sif/verification/test_try_catch.py',
+    'tests/arp/verification/test_chalice_basic.py',
+]
+
+SYNTHETIC_SIZES = [20, 100]
+
+SYNTHETIC_PREFIX = 'synthetic:'
+
+
+def generate_module(methods: int) -> str:
+    """
+    Returns the source of a module with a class with ``methods`` methods
+    containing loops, and as many client functions calling them.
+    """
+    lines = [
+        'from nagini_contracts.contracts import *',
+        '',
+        '',
+        'class Counter:',
+        '    def __init__(self) -> None:',
+        '        self.value = 0',
+        '        Ensures(Acc(self.value) and self.value == 0)',
+        '',
+    ]
+    for i in range(methods):
+        lines.extend([
+            '    def add_{}(self, n: int) -> int:'.format(i),
+            '        Requires(Acc(self.value) and n >= 0)',
+            '        Ensures(Acc(self.value))',
+            '        Ensures(self.value == Old(self.value) + n)',
+            '        Ensures(Result() == self.value)',
+            '        start = self.value',
+            '        i = 0',
+            '        while i < n:',
+            '            Invariant(Acc(self.value))',
+            '            Invariant(0 <= i and i <= n)',
+            '            Invariant(self.value == start + i)',
+            '            self.value = self.value + 1',
+            '            i = i + 1',
+            '        return self.value',
+            '',
+        ])
+    for i in range(methods):
+        lines.extend([
+            '',
+            'def client_{}(c: Counter) -> None:'.format(i),
+            '    Requires(Acc(c.value) and c.value == 0)',
+            '    Ensures(Acc(c.value) and c.value == 3)',
+            '    c.add_{}(1)'.format(i),
+            '    c.add_{}(2)'.format(i),
+            '',
+        ])
+    return '\n'.join(lines)
+
+
+class BenchmarkFailure(Exception):
+    """
+    Raised if a program cannot be benchmarked, e.g. because its
+    verification did not complete.
+    """
+
+
+def run(path: str, jvm: JVM, backend: ViperVerifier, sif: bool, arp: bool,
+        repetitions: int, type_slice: bool = False,
+        must_verify: bool = False) -> Optional[Dict]:
+    """
+    Translates and verifies the given file the given number of times and
+    returns the minimal time spent in every phase, the total time, the size
+    of the Silver program and the outcome of the verification with its
+    number of errors. Returns None if the file cannot be translated. Raises
+    a BenchmarkFailure if the verification does not complete (e.g. it times
+    out), if its outcome differs between repetitions, or if it fails
+    although ``must_verify`` is set; such runs are not valid timings.
+    """
+    from nagini_translation.main import translate, verify
+    best = {}
+    size = None
+    outcome = None
+    for _ in range(repetitions):
+        phase_timer.reset()
+        start = time.time()
+        try:
+            prog = translate(path, jvm, sif=sif, arp=arp,
+                             type_slice=type_slice)
+        except (TypeException, InvalidProgramException,
+                UnsupportedException):
+            return None
+        if prog is None:
+            return None
+        vresult = verify(prog, path, jvm, backend, arp=arp)
+        if vresult is None:
+            raise BenchmarkFailure('no verification result')
+        if vresult.outcome in INCOMPLETE_OUTCOMES:
+            raise BenchmarkFailure('verification outcome ' + vresult.outcome)
+        if must_verify and not vresult:
+            raise BenchmarkFailure('verification failed')
+        run_outcome = {
+            'outcome': vresult.outcome,
+            'errors': 0 if vresult else len(vresult.errors),
+        }
+        if outcome is not None and run_outcome != outcome:
+            raise BenchmarkFailure('verification outcome changed between '
+                                   'repetitions')
+        outcome = run_outcome
+        times = phase_timer.times()
+        times['total'] = time.time() - start
+        for phase, duration in times.items():
+            best[phase] = min(best.get(phase, duration), duration)
+        if size is None:
+            size = program_size(prog)
+    result = {
+        'phases': best,
+        'size': size,
+    }
+    result.update(outcome)
+    return result
+
+
+def benchmark(paths: List[str], synthetic_sizes: List[int], jvm: JVM,
+              backend: ViperVerifier, repetitions: int,
+              type_slice: bool = False) -> Tuple[Dict[str, Dict], List[str]]:
+    """
+    Benchmarks the given files and generated modules of the given sizes.
+    Returns the results by program name, and the names of the programs
+    which could not be benchmarked.
+    """
+    sif_available = jvm.is_known_class(jvm.viper.silver.sif.SIFReturnStmt)
+    arp_available = jvm.is_known_class(jvm.viper.silver.plugin.ARPPlugin)
+    tmp_dir = tempfile.mkdtemp(prefix='nagini')
+    files = []
+    for path in paths:
+        if 'sif' in path and not sif_available:
+            continue
+        if 'arp' in path and not arp_available:
+            continue
+        files.append((path, path))
+    for methods in synthetic_sizes:
+        path = os.path.join(tmp_dir, 'synthetic{}.py'.format(methods))
+        with open(path, 'w') as file:
+            file.write(generate_module(methods))
+        files.append((SYNTHETIC_PREFIX + str(methods), path))
+    results = {}
+    failed = []
+    print(', '.join(['File'] + PHASES + ['total', 'methods', 'lines']))
+    try:
+        for name, path in files:
+            # Like in the test suite, the mode is determined by the path.
+            # Generated modules are correct, test files may contain
+            # expected errors.
+            try:
+                result = run(path, jvm, backend, 'sif' in name, 'arp' in name,
+                             repetitions, type_slice,
+                             name.startswith(SYNTHETIC_PREFIX))
+            except BenchmarkFailure as e:
+                print('{}: {}'.format(name, e))
+                failed.append(name)
+                continue
+            if result is None:
+                print('{}: translation failed'.format(name))
+                failed.append(name)
+                continue
+            results[name] = result
+            phases = result['phases']
+            print(', '.join(
+                [name] +
+                ['{:.2f}'.format(phases.get(phase, 0.0))
+                 for phase in PHASES + ['total']] +
+                [str(result['size']['methods']), str(result['size']['lines'])]))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return results, failed
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict],
+            tolerance: float, min_delta: float) -> bool:
+    """
+    Reports all phases whose time grew by more than the given fraction and
+    at least ``min_delta`` seconds, all size metrics that grew by more
+    than the given fraction, all programs whose verification outcome or
+    number of errors changed and all programs missing from the baseline.
+    Returns True if there are none.
+    """
+    regressions = 0
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            regressions += 1
+            print('No baseline for {}'.format(name))
+            continue
+        before = baseline[name]
+        if (before.get('outcome'), before.get('errors')) != (
+                result.get('outcome'), result.get('errors')):
+            regressions += 1
+            print('Regression: {}: verification was {} with {} errors, now '
+                  '{} with {} errors'.format(
+                      name, before.get('outcome'), before.get('errors'),
+                      result.get('outcome'), result.get('errors')))
+            continue
+        before_phases = baseline[name]['phases']
+        for phase, after in result['phases'].items():
+            before = before_phases.get(phase)
+            if before is None:
+                continue
+            if after > before * (1 + tolerance) and after - before > min_delta:
+                regressions += 1
+                print('Regression: {}: {} took {:.2f}s instead of {:.2f}s'.format(
+                    name, phase, after, before))
+        before_size = baseline[name]['size']
+        for metric, after in result['size'].items():
+            before = before_size.get(metric)
+            if before is None:
+                continue
+            if after > before * (1 + tolerance):
+                regressions += 1
+                print('Regression: {}: {} grew from {} to {}'.format(
+                    name, metric, before, after))
+    return regressions == 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        'paths',
+        nargs='*',
+        help='Python files to translate and verify',
+        default=CORPUS)
+    parser.add_argument(
+        '--synthetic',
+        type=int,
+        nargs='*',
+        help='numbers of methods of the generated modules',
+        default=SYNTHETIC_SIZES)
+    parser.add_argument(
+        '--verifier',
+        help='verifier to be used (carbon or silicon)',
+        default='silicon')
+    parser.add_argument(
+        '--repetitions',
+        type=int,
+        help='number of times every file is verified',
+        default=3)
+    parser.add_argument(
+        '--type-slice',
+        action='store_true',
+        help='only encode the part of the type hierarchy a program needs')
+    parser.add_argument(
+        '--output',
+        help='write the results to the given JSON file')
+    parser.add_argument(
+        '--compare',
+        help='compare the results with the given JSON file')
+    parser.add_argument(
+        '--tolerance',
+        type=float,
+        help='allowed relative increase of phase times and program sizes',
+        default=0.2)
+    parser.add_argument(
+        '--min-delta',
+        type=float,
+        help='minimal increase in seconds reported as a regression',
+        default=0.1)
+    args = parser.parse_args()
+
+    if args.verifier == 'silicon':
+        backend = ViperVerifier.silicon
+    elif args.verifier == 'carbon':
+        backend = ViperVerifier.carbon
+    else:
+        parser.error('Unknown verifier specified: ' + args.verifier)
+    if args.compare and not os.path.exists(args.compare):
+        raise SystemExit('No baseline in {}, record it with --output '
+                         'first.'.format(args.compare))
+    config.set_verifier(args.verifier)
+    os.environ['MYPYPATH'] = config.mypy_path
+    jvm = JVM(config.classpath)
+    results, failed = benchmark(args.paths, args.synthetic, jvm, backend,
+                                args.repetitions, args.type_slice)
+    if failed:
+        # Neither record nor compare incomplete results.
+        raise SystemExit('Could not benchmark: ' + ', '.join(failed))
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare, 'r') as file:
+            baseline = json.load(file)
+        if not compare(results, baseline, args.tolerance, args.min_delta):
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+"""Benchmark for removing contracts and ghost code at import time.
+
+Generates increasingly large modules whose functions contain contracts,
+ghost code and deeply nested blocks that only contain ghost code, and
+measures the time ``transform_ast`` takes to remove them. The time per
+statement should stay roughly the same for all sizes and depths::
+
+    python -m nagini_translation.benchmarks.transformer --sizes 10 100 1000
+"""
+
+import argparse
+import ast
+import time
+
+from nagini_contracts.transformer import transform_ast
+from typing import List
+
+
+def generate_module(functions: int, depth: int) -> str:
+    """
+    Returns the source of a module with ``functions`` functions, each of
+    which has contracts, uses a ghost function and contains ``depth``
+    nested if-statements and loops that only contain ghost code.
+    """
+    lines = [
+        'from nagini_contracts.contracts import *',
+        '',
+        '',
+        '@Ghost',
+        '@Pure',
+        'def ghost_sum(x: int, y: int) -> int:',
+        '    return x + y',
+        '',
+    ]
+    for i in range(functions):
+        lines.extend([
+            '',
+            'def f_{}(x: int) -> int:'.format(i),
+            '    Requires(x >= 0)',
+            '    Ensures(Result() >= x)',
+            '    _gh_total = 0',
+            '    y = x',
+        ])
+        indent = '    '
+        for level in range(depth):
+            if level % 2:
+                lines.append(indent + 'while x > {}:'.format(level))
+                lines.append(indent + '    Invariant(x > 0)')
+            else:
+                lines.append(indent + 'if x > {}:'.format(level))
+            indent += '    '
+            lines.append(indent + '_gh_total = ghost_sum(_gh_total, x)')
+        lines.extend([
+            '    Assert(_gh_total >= 0)',
+            '    return y',
+            '',
+        ])
+    return '\n'.join(lines)
+
+
+def benchmark(sizes: List[int], depths: List[int], repetitions: int) -> None:
+    print('Functions, Depth, Statements, Time, Time per statement')
+    for depth in depths:
+        for functions in sizes:
+            source = generate_module(functions, depth)
+            best = None
+            for _ in range(repetitions):
+                tree = ast.parse(source)
+                statements = sum(1 for node in ast.walk(tree)
+                                 if isinstance(node, ast.stmt))
+                start = time.perf_counter()
+                transform_ast(tree)
+                duration = time.perf_counter() - start
+                best = duration if best is None else min(best, duration)
+            print('{}, {}, {}, {:.4f}, {:.2f}us'.format(
+                functions, depth, statements, best,
+                best / statements * 1e6))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        '--sizes',
+        type=int,
+        nargs='+',
+        help='numbers of functions of the generated modules',
+        default=[10, 100, 1000])
+    parser.add_argument(
+        '--depths',
+        type=int,
+        nargs='+',
+        help='nesting depths of the ghost blocks in every function',
+        default=[5, 20, 50])
+    parser.add_argument(
+        '--repetitions',
+        type=int,
+        help='number of times every module is transformed',
+        default=3)
+    args = parser.parse_args()
+    benchmark(args.sizes, args.depths, args.repetitions)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,24 +5,120 @@ file, You can obtain one at http://mozilla.org/MPL/2.0/.
 """
 
 import argparse
+import asyncio
+import itertools
+import json
 import zmq
+import zmq.asyncio
 
 from nagini_translation.lib.constants import DEFAULT_CLIENT_SOCKET
+from typing import Any, Dict
 
 
-context = zmq.Context()
+class AsyncClient:
+    """
+    Client for the Nagini server that can keep several requests in flight.
 
-socket = context.socket(zmq.REQ)
-socket.connect(DEFAULT_CLIENT_SOCKET)
+    Every request returns a coroutine that resolves to the JSON response of
+    the server, e.g.::
 
-parser = argparse.ArgumentParser()
-parser.add_argument(
-        'python_file',
-        help='Python file to verify')
+        client = AsyncClient()
+        first, second = await asyncio.gather(
+            client.verify(file='a.py'),
+            client.verify(file='b.py', verifier='carbon', select=['f']))
 
-args = parser.parse_args()
+    With pyzmq versions before 17, the ZeroMQ event loop has to be installed
+    first using ``zmq.asyncio.install()``.
+    """
 
-socket.send_string(args.python_file)
-response = socket.recv_string()
+    def __init__(self, address: str = DEFAULT_CLIENT_SOCKET) -> None:
+        self._context = zmq.asyncio.Context()
+        self._socket = self._context.socket(zmq.DEALER)
+        self._socket.connect(address)
+        self._ids = itertools.count()
+        self._pending = {}
+        self._receiver = None
 
-print(response)
\ No newline at end of file
+    def next_id(self) -> str:
+        """
+        Returns a fresh request ID. Generated IDs have a prefix of their own,
+        s.t. they never equal IDs chosen by the caller.
+        """
+        return 'client-{}'.format(next(self._ids))
+
+    async def verify(self, file: str = None, source: str = None,
+                     request_id: str = None, **options) -> Dict[str, Any]:
+        """
+        Verifies the given file, or the given source code, with the given
+        options (``verifier``, ``sif``, ``arp``, ``select``, ``ignore_global``,
+        ``ide_mode``, ``show_viper_errors``). Raises a ValueError if the given
+        request ID is used by a request that is still in flight.
+        """
+        request = {
+            'id': self.next_id() if request_id is None else request_id,
+            'command': 'verify',
+            'file': file,
+            'source': source,
+            'options': options,
+        }
+        return await self._request(request)
+
+    async def cancel(self, request_id: str) -> bool:
+        """
+        Cancels the request with the given ID. Returns whether the server
+        still knew about the request.
+        """
+        request = {
+            'id': self.next_id(),
+            'command': 'cancel',
+            'target': request_id,
+        }
+        response = await self._request(request)
+        return response['status'] == 'ok'
+
+    async def _request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        if request['id'] in self._pending:
+            raise ValueError('Request id {} is already in use.'.format(
+                request['id']))
+        future = asyncio.get_event_loop().create_future()
+        self._pending[request['id']] = future
+        if self._receiver is None or self._receiver.done():
+            self._receiver = asyncio.ensure_future(self._receive())
+        await self._socket.send_multipart([b'', json.dumps(request).encode()])
+        return await future
+
+    async def _receive(self) -> None:
+        while self._pending:
+            frames = await self._socket.recv_multipart()
+            response = json.loads(frames[-1].decode())
+            future = self._pending.pop(response.get('id'), None)
+            if future and not future.done():
+                future.set_result(response)
+
+    def close(self) -> None:
+        if self._receiver is not None:
+            self._receiver.cancel()
+        self._socket.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+            'python_file',
+            help='Python file to verify')
+
+    args = parser.parse_args()
+
+    context = zmq.Context()
+
+    socket = context.socket(zmq.REQ)
+    socket.connect(DEFAULT_CLIENT_SOCKET)
+
+    socket.send_string(args.python_file)
+    response = socket.recv_string()
+
+    print(response)
+
+
+if __name__ == '__main__':
+    main()
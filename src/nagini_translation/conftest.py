@@ -11,6 +11,7 @@ See http://doc.pytest.org/en/latest/writing_plugins.html for documentation.
 import os
 import pytest
 
+from nagini_translation import tests as nagini_tests
 from nagini_translation.lib import config
 from nagini_translation.tests import _JVM as jvm
 from nagini_translation.verifier import ViperVerifier
@@ -19,6 +20,8 @@ from typing import List
 
 _TRANSLATION_TEST_FUNCTION_NAME = 'test_translation'
 _VERIFICATION_TEST_FUNCTION_NAME = 'test_verification'
+_SIF_CONCURRENCY_TEST_FUNCTION_NAME = 'test_sif_concurrency'
+_TYPE_SLICE_TEST_FUNCTION_NAME = 'test_type_slice_domain'
 
 _TRANSLATION_TESTS_SUFFIX = 'translation'
 _VERIFICATION_TESTS_SUFFIX = 'verification'
@@ -29,6 +32,20 @@ _IO_TESTS_DIR = 'tests/io/'
 _OBLIGATIONS_TESTS_DIR = 'tests/obligations/'
 _ARP_TESTS_DIR = 'tests/arp/'
 
+# Tests in directories with this name are translated with a type slice.
+_TYPE_SLICE_DIR_NAME = 'type_slice'
+
+# SIF verification tests whose programs are transformed concurrently. The
+# first one has all-low and lowness-preserving methods, the others do not.
+_SIF_CONCURRENCY_TEST_FILES = [
+    'tests/sif/verification/test_low_annotation.py',
+    'tests/sif/verification/test_ctrl_flow.py',
+    'tests/sif/verification/test_dyn_calls.py',
+    'tests/sif/verification/test_exception_loop.py',
+    'tests/sif/verification/test_fields_assign.py',
+    'tests/sif/verification/test_lists.py',
+]
+
 
 class PyTestConfig:
     """Class that holds the configuration for tests."""
@@ -37,6 +54,8 @@ class PyTestConfig:
         self.verification_test_dirs = []
         self.single_test = None
         self.verifiers = []
+        self.workers = 1
+        self.timings_file = None
 
         self.init_from_config_file()
 
@@ -49,6 +68,9 @@ class PyTestConfig:
         for verifier in test_config.verifiers:
             self.add_verifier(verifier)
 
+        self.workers = test_config.workers
+        self.timings_file = test_config.timings_file
+
     def add_test(self, test: str):
         if test == 'functional':
             self._add_test_dir(_FUNCTIONAL_TESTS_DIR)
@@ -125,6 +147,10 @@ def pytest_addoption(parser: 'pytest.config.Parser'):
                      action='store_true')
     parser.addoption('--silicon', dest='silicon', action='store_true')
     parser.addoption('--carbon', dest='carbon', action='store_true')
+    parser.addoption('--workers', dest='workers', action='store', type=int,
+                     default=None)
+    parser.addoption('--timings-file', dest='timings_file', action='store',
+                     default=None)
 
 
 def pytest_configure(config: 'pytest.config.Config'):
@@ -190,6 +216,11 @@ def pytest_configure(config: 'pytest.config.Config'):
             pytest.exit('No backend verifiers avaliable on the classpath.')
         for verifier in verifiers:
             _pytest_config.add_verifier(verifier)
+    # Setup parallel test runner.
+    if config.option.workers is not None:
+        _pytest_config.workers = config.option.workers
+    if config.option.timings_file:
+        _pytest_config.timings_file = config.option.timings_file
 
 
 def pytest_generate_tests(metafunc: 'pytest.python.Metafunc'):
@@ -209,8 +240,9 @@ def pytest_generate_tests(metafunc: 'pytest.python.Metafunc'):
             sif = 'sif' in file
             reload_resources = file in reload_triggers
             arp = 'arp' in file
-            params.append((file, sif, reload_resources, arp))
-        metafunc.parametrize('path,sif,reload_resources,arp', params)
+            type_slice = _TYPE_SLICE_DIR_NAME in file
+            params.append((file, sif, reload_resources, arp, type_slice))
+        metafunc.parametrize('path,sif,reload_resources,arp,type_slice', params)
     elif func_name == _VERIFICATION_TEST_FUNCTION_NAME:
         for test_dir in _pytest_config.verification_test_dirs:
             files = _test_files(test_dir)
@@ -222,8 +254,54 @@ def pytest_generate_tests(metafunc: 'pytest.python.Metafunc'):
             sif = 'sif' in file
             reload_resources = file in reload_triggers
             arp = 'arp' in file
-            params.extend([(file, verifier, sif, reload_resources, arp) for verifier
-                           in _pytest_config.verifiers])
-        metafunc.parametrize('path,verifier,sif,reload_resources,arp', params)
-    else:
+            type_slice = _TYPE_SLICE_DIR_NAME in file
+            params.extend([(file, verifier, sif, reload_resources, arp, type_slice)
+                           for verifier in _pytest_config.verifiers])
+        metafunc.parametrize('path,verifier,sif,reload_resources,arp,type_slice',
+                             params)
+    elif func_name == _SIF_CONCURRENCY_TEST_FUNCTION_NAME:
+        sif_dir = os.path.join(_SIF_TESTS_DIR, _VERIFICATION_TESTS_SUFFIX)
+        if sif_dir in _pytest_config.verification_test_dirs:
+            params.append(_SIF_CONCURRENCY_TEST_FILES)
+        metafunc.parametrize('paths', params)
+    elif func_name == _TYPE_SLICE_TEST_FUNCTION_NAME:
+        functional_dir = os.path.join(_FUNCTIONAL_TESTS_DIR,
+                                      _VERIFICATION_TESTS_SUFFIX)
+        if functional_dir in _pytest_config.verification_test_dirs:
+            params.extend(_test_files(os.path.join(functional_dir,
+                                                   _TYPE_SLICE_DIR_NAME)))
+        metafunc.parametrize('path', params)
+    elif 'path' in metafunc.fixturenames:
         pytest.exit('Unrecognized test function.')
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_collection_modifyitems(session: 'pytest.main.Session',
+                                  config: 'pytest.config.Config',
+                                  items: List['pytest.Item']):
+    """Starts running the selected tests in worker processes if requested."""
+    nagini_tests.start_timings(_pytest_config.workers,
+                               _pytest_config.timings_file)
+    if _pytest_config.workers <= 1:
+        return
+    jobs = []
+    for item in items:
+        if not hasattr(item, 'callspec'):
+            continue
+        params = item.callspec.params
+        func_name = item.function.__name__
+        if func_name == _VERIFICATION_TEST_FUNCTION_NAME:
+            verifier = params['verifier']
+        elif func_name == _TRANSLATION_TEST_FUNCTION_NAME:
+            verifier = None
+        else:
+            continue
+        jobs.append(nagini_tests.ScheduledTest(
+            params['path'], verifier, params['sif'],
+            params['reload_resources'], params['arp'], params['type_slice']))
+    nagini_tests.start_parallel_runner(_pytest_config.workers, jobs)
+
+
+def pytest_sessionfinish(session: 'pytest.main.Session'):
+    """Stops the worker processes and writes the test timings."""
+    nagini_tests.stop_test_runs()
@@ -0,0 +1,393 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+"""Persistent, content-addressed cache for translation results.
+
+Entries are keyed by a hash of the verified file, the options that
+influence the translation and a fingerprint of Nagini itself. Every entry
+records the transitive import closure reported by mypy, together with the
+hashes of all files in it, so that an entry is only used if none of the
+imported modules changed either. The cache directory is bounded in size;
+least recently used entries are evicted first.
+"""
+
+
+import hashlib
+import json
+import logging
+import os
+import re
+
+from nagini_translation.lib import config
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+
+logger = logging.getLogger('nagini_translation.lib.cache')
+
+
+CACHE_FORMAT_VERSION = '1'
+
+_ENTRY_SUFFIX = '.json'
+
+_VERIFIED_SUFFIX = '.verified'
+
+_fingerprint = None
+
+_IDENTIFIER = re.compile(r"[A-Za-z_$][A-Za-z0-9_$']*")
+
+# Declarations of names which are local to a Silver member: parameters,
+# results, local and quantified variables (all of the form ``name: Type``,
+# unlike field declarations), labels and let-bound variables.
+_LOCAL_DECLARATION = re.compile(
+    r"(?<![A-Za-z0-9_$'])(?:(?<!field )([A-Za-z_$][A-Za-z0-9_$']*): |"
+    r"label ([A-Za-z_$][A-Za-z0-9_$']*)|let ([A-Za-z_$][A-Za-z0-9_$']*) ==)")
+
+# Declarations of global names: fields, functions (including domain
+# functions), predicates, methods and domains.
+_GLOBAL_DECLARATION = re.compile(
+    r"(?<![A-Za-z0-9_$'])(?:field|function|predicate|method|domain) "
+    r"([A-Za-z_$][A-Za-z0-9_$']*)")
+
+_LOCAL_PREFIX = '$local'
+
+
+def file_digest(path: str) -> Optional[str]:
+    """
+    Returns the SHA-256 hash of the contents of the given file, or None if
+    the file cannot be read.
+    """
+    hasher = hashlib.sha256()
+    try:
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(65536), b''):
+                hasher.update(chunk)
+    except OSError:
+        return None
+    return hasher.hexdigest()
+
+
+def nagini_fingerprint() -> str:
+    """
+    Returns a hash over the sources and resources of the translator and the
+    contracts library, s.t. cached results are invalidated whenever Nagini
+    itself changes.
+    """
+    global _fingerprint
+    if _fingerprint is None:
+        import nagini_contracts
+        import nagini_translation
+        hasher = hashlib.sha256(CACHE_FORMAT_VERSION.encode())
+        for package in (nagini_translation, nagini_contracts):
+            root = os.path.dirname(package.__file__)
+            for dir_path, dir_names, file_names in os.walk(root):
+                dir_names[:] = sorted(d for d in dir_names
+                                      if d != '__pycache__')
+                for file_name in sorted(file_names):
+                    if file_name.endswith(('.py', '.sil', '.index')):
+                        path = os.path.join(dir_path, file_name)
+                        hasher.update(os.path.relpath(path, root).encode())
+                        hasher.update((file_digest(path) or '').encode())
+        _fingerprint = hasher.hexdigest()
+    return _fingerprint
+
+
+def obligation_settings() -> List[Tuple[str, bool]]:
+    """
+    Returns the effective settings of the ``Obligations`` section of the
+    configuration file, which change the generated Silver code.
+    """
+    obligation_config = config.obligation_config
+    return sorted((name, getattr(obligation_config, name))
+                  for name, attribute in vars(type(obligation_config)).items()
+                  if isinstance(attribute, property))
+
+
+def _stat_digest(path: str) -> str:
+    """
+    Returns a string identifying the given file or directory (recursively)
+    by the modification times and sizes of the files in it.
+    """
+    if os.path.isdir(path):
+        stats = []
+        for dir_path, dir_names, file_names in os.walk(path):
+            dir_names.sort()
+            for file_name in sorted(file_names):
+                stats.append(_stat_digest(os.path.join(dir_path, file_name)))
+        return ','.join(stats)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return path + ':missing'
+    return '{}:{}:{}'.format(path, stat.st_mtime_ns, stat.st_size)
+
+
+def backend_fingerprint() -> str:
+    """
+    Returns a hash over the installed backends, i.e., the entries of the
+    class path and the Z3 and Boogie executables. Besides their paths, it
+    covers the modification times and sizes of the files, s.t. cached
+    results are not reused after upgrading Viper or Z3 in place.
+    """
+    paths = [entry for entry in (config.classpath or '').split(os.pathsep)
+             if entry]
+    paths += [path for path in (config.z3_path, config.boogie_path) if path]
+    hasher = hashlib.sha256()
+    for path in paths:
+        hasher.update(_stat_digest(path).encode())
+        hasher.update(b'\0')
+    return hasher.hexdigest()
+
+
+class TranslationCache:
+    """
+    On-disk cache mapping a Python module (and everything it imports) to its
+    Silver translation and verification results.
+    """
+
+    def __init__(self, directory: str, max_size: int) -> None:
+        self.directory = os.path.join(directory, 'translations')
+        self.max_size = max_size
+
+    def key(self, path: str, selected: Set[str], sif: bool, arp: bool,
+            ignore_global: bool, type_slice: bool = False) -> Optional[str]:
+        """
+        Computes the cache key for translating the given file with the given
+        options. Returns None if the file cannot be read.
+        """
+        source_digest = file_digest(path)
+        if source_digest is None:
+            return None
+        key_data = json.dumps([nagini_fingerprint(), os.path.abspath(path),
+                               source_digest, sorted(selected), sif, arp,
+                               ignore_global, type_slice,
+                               obligation_settings()])
+        return hashlib.sha256(key_data.encode()).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, key + _ENTRY_SUFFIX)
+
+    def lookup(self, key: str) -> Optional[Dict]:
+        """
+        Returns the entry stored for the given key, if it exists and none of
+        the files in its import closure changed since it was stored.
+        """
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, 'r') as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None
+        for dep_path, digest in entry['dependencies'].items():
+            if file_digest(dep_path) != digest:
+                logger.info('Cache entry for %s is stale, %s changed.',
+                            entry['path'], dep_path)
+                self._remove(entry_path)
+                return None
+        # Mark entry as recently used.
+        try:
+            os.utime(entry_path, None)
+        except OSError:
+            pass
+        return entry
+
+    def store(self, key: str, path: str, dependencies: List[str],
+              program: Optional[str], results: Dict[str, str]) -> None:
+        """
+        Stores the Silver program text and the given verification results for
+        the given key, merging them with the results already stored for it.
+        """
+        dep_digests = {}
+        for dep_path in set(os.path.abspath(dep) for dep in [path] + dependencies):
+            digest = file_digest(dep_path)
+            if digest is None:
+                # Cannot track this dependency, so don't cache at all.
+                return
+            dep_digests[dep_path] = digest
+        entry = self.lookup(key) or {}
+        stored_results = entry.get('results', {})
+        stored_results.update(results)
+        entry = {
+            'path': os.path.abspath(path),
+            'dependencies': dep_digests,
+            'program': program or entry.get('program'),
+            'results': stored_results,
+        }
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = self._entry_path(key) + '.tmp'
+            with open(tmp_path, 'w') as file:
+                json.dump(entry, file)
+            os.replace(tmp_path, self._entry_path(key))
+        except OSError as e:
+            logger.warning('Could not write translation cache entry: %s', e)
+            return
+        self.evict()
+
+    def _verified_path(self, fingerprint: str) -> str:
+        return os.path.join(self.directory, fingerprint + _VERIFIED_SUFFIX)
+
+    def is_verified(self, fingerprint: str) -> bool:
+        """
+        Checks if a program part with the given fingerprint has been verified
+        successfully before.
+        """
+        path = self._verified_path(fingerprint)
+        try:
+            # Mark entry as recently used.
+            os.utime(path, None)
+        except OSError:
+            return False
+        return True
+
+    def mark_verified(self, fingerprint: str) -> None:
+        """
+        Records that a program part with the given fingerprint has been
+        verified successfully.
+        """
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._verified_path(fingerprint), 'w'):
+                pass
+        except OSError as e:
+            logger.warning('Could not write verification cache entry: %s', e)
+            return
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Removes least recently used entries until the total size of the
+        cache is below the configured maximum.
+        """
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        entries = []
+        total = 0
+        for name in names:
+            if not name.endswith((_ENTRY_SUFFIX, _VERIFIED_SUFFIX)):
+                continue
+            entry_path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(entry_path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry_path))
+            total += stat.st_size
+        entries.sort()
+        for _, size, entry_path in entries:
+            if total <= self.max_size:
+                break
+            self._remove(entry_path)
+            total -= size
+
+    def _remove(self, entry_path: str) -> None:
+        try:
+            os.remove(entry_path)
+        except OSError:
+            pass
+
+
+def declared_globals(texts: Iterable[str]) -> Set[str]:
+    """
+    Returns the names of all fields, functions, predicates, methods, domains
+    and domain functions declared in the given Silver texts.
+    """
+    return {name for text in texts
+            for name in _GLOBAL_DECLARATION.findall(text)}
+
+
+def normalize_locals(text: str, global_names: Set[str] = frozenset()) -> str:
+    """
+    Renames all names declared locally in the given Silver text to names
+    derived from the order of their declarations. Fresh names are unique in
+    the whole program, so adding e.g. a loop to one method renumbers the
+    local variables and labels of all methods translated after it; texts of
+    members which only differ in such names are the same after renaming.
+
+    Renaming is textual, so a local which has the same name as one of the
+    given global names is kept as it is; its occurrences cannot be told
+    apart from references to the global. Every renamed occurrence therefore
+    refers to a local, and texts which are the same after renaming only
+    differ in the names of their locals.
+    """
+    if _LOCAL_PREFIX in text:
+        # Renaming could make different texts equal.
+        return text
+    names = {}
+    for match in _LOCAL_DECLARATION.finditer(text):
+        name = next(group for group in match.groups() if group)
+        if name not in names and name not in global_names:
+            names[name] = _LOCAL_PREFIX + str(len(names))
+    if not names:
+        return text
+    return _IDENTIFIER.sub(lambda m: names.get(m.group(0), m.group(0)), text)
+
+
+class PartFingerprinter:
+    """
+    Computes fingerprints of the parts of a split program, which change
+    whenever the verification result of a part can change. They cover the
+    given verifier settings, the installed backends and the Silver text of
+    everything in the part, i.e., the verified method and its whole
+    dependency cone, with local names normalized (see ``normalize_locals``).
+    Locals are only renamed if no global declared in any of the given parts
+    has the same name.
+    """
+
+    def __init__(self, settings: List[str],
+                 parts: List['ProgramPart']) -> None:
+        self.settings = json.dumps([nagini_fingerprint(),
+                                    backend_fingerprint()] + settings)
+        # Texts and digests of Silver nodes, keyed by the identity of the
+        # nodes, which are kept alive by the parts.
+        self._texts = {}
+        self._digests = {}
+        self._shared_digests = {}
+        self._globals = declared_globals(
+            self._text(node) for part in parts
+            for node in part.shared + part.members)
+
+    def _text(self, node: 'silver.ast.Node') -> str:
+        key = id(node)
+        if key not in self._texts:
+            self._texts[key] = str(node)
+        return self._texts[key]
+
+    def _digest(self, node: 'silver.ast.Node') -> str:
+        key = id(node)
+        if key not in self._digests:
+            text = normalize_locals(self._text(node), self._globals)
+            self._digests[key] = hashlib.sha256(text.encode()).hexdigest()
+        return self._digests[key]
+
+    def fingerprint(self, part: 'ProgramPart') -> str:
+        shared_key = id(part.shared)
+        if shared_key not in self._shared_digests:
+            hasher = hashlib.sha256()
+            for node in part.shared:
+                hasher.update(self._digest(node).encode())
+            self._shared_digests[shared_key] = hasher.hexdigest()
+        hasher = hashlib.sha256(self.settings.encode())
+        hasher.update(self._shared_digests[shared_key].encode())
+        for node in part.members:
+            hasher.update(self._digest(node).encode())
+        return hasher.hexdigest()
+
+
+def result_key(backend: str, ide_mode: bool, show_viper_errors: bool,
+               options: Sequence[str] = ()) -> str:
+    """
+    Returns the key under which the output of a verification run with the
+    given settings is stored inside a cache entry. Besides the given backend
+    options, the key covers the installed backends (see
+    ``backend_fingerprint``), s.t. results are not reused after upgrading
+    Viper or Z3.
+    """
+    settings = json.dumps([backend_fingerprint()] + list(options))
+    settings_digest = hashlib.sha256(settings.encode()).hexdigest()
+    return '{}:{}:{}:{}'.format(backend, int(ide_mode), int(show_viper_errors),
+                                settings_digest)
@@ -130,6 +130,50 @@ class TestConfig(SectionConfig):
         else:
             self.tests = tests_value.strip().split()
 
+    @property
+    def workers(self):
+        """Number of worker processes running the tests."""
+        return self._info.getint('workers', 1)
+
+    @property
+    def timings_file(self):
+        """File to which the durations of the tests are written."""
+        return self._info.get('timings_file', 'test_timings.json')
+
+
+class CacheConfig(SectionConfig):
+    """Translation cache configuration."""
+
+    def __init__(self, config) -> None:
+        super().__init__(config, 'Cache')
+
+    @property
+    def enabled(self):
+        """Use the on-disk translation cache."""
+        return self._info.getboolean('enabled', True)
+
+    @property
+    def directory(self):
+        """Directory in which cache entries are stored."""
+        return self._info.get('directory', _get_cache_dir())
+
+    @property
+    def max_size(self):
+        """Maximum total size of all cache entries in bytes."""
+        return self._info.getint('max_size', 256 * 1024 * 1024)
+
+
+class TranslationConfig(SectionConfig):
+    """Translation configuration."""
+
+    def __init__(self, config) -> None:
+        super().__init__(config, 'Translation')
+
+    @property
+    def inline_templates(self):
+        """Instantiate templates of inlined method bodies."""
+        return self._info.getboolean('inline_templates', True)
+
 
 class FileConfig:
     """Configuration stored in the config file."""
@@ -139,6 +183,8 @@ class FileConfig:
         self.config.read(config_file)
         self.obligation_config = ObligationConfig(self.config)
         self.test_config = TestConfig(self.config)
+        self.cache_config = CacheConfig(self.config)
+        self.translation_config = TranslationConfig(self.config)
 
 
 def _construct_classpath(verifier : str = None):
@@ -237,6 +283,23 @@ def _get_mypy_dir():
     return None
 
 
+def _get_cache_dir():
+    """ Construct the cache directory.
+
+    First tries the environment variable ``NAGINI_CACHE_DIR``. If it is
+    not defined, uses a ``nagini`` directory inside ``XDG_CACHE_HOME``
+    (or ``~/.cache``).
+    """
+
+    cache_dir = os.environ.get('NAGINI_CACHE_DIR')
+    if cache_dir:
+        return cache_dir
+    cache_home = os.environ.get('XDG_CACHE_HOME')
+    if not cache_home:
+        cache_home = os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'nagini')
+
+
 def set_verifier(v: str):
     global classpath
     not_set_by_arg = classpath == _construct_classpath()
@@ -295,6 +358,18 @@ Test configuration.
 """
 
 
+cache_config = file_config.cache_config
+"""
+Translation cache configuration.
+"""
+
+
+translation_config = file_config.translation_config
+"""
+Translation configuration.
+"""
+
+
 __all__ = (
     'classpath',
     'boogie_path',
@@ -302,5 +377,7 @@ __all__ = (
     'mypy_path',
     'mypy_dir',
     'obligation_config',
+    'cache_config',
+    'translation_config',
     'set_verifier',
 )
@@ -7,10 +7,13 @@ file, You can obtain one at http://mozilla.org/MPL/2.0/.
 """Error handling state is stored in singleton ``manager``."""
 
 
+import bisect
+import threading
+
+from array import array
 from collections import namedtuple
-from uuid import uuid1
 
-from typing import Any, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from nagini_translation.lib.errors.wrappers import Error
 from nagini_translation.lib.errors.rules import Rules
@@ -20,28 +23,125 @@ from nagini_translation.lib.jvmaccess import JVM
 Item = namedtuple('Item', 'node vias reason_string')
 
 
+class ErrorTable:
+    """Error information of a single generation.
+
+    The IDs of the generation are consecutive and start at ``base``. Via
+    lists and conversion rules are shared by many positions, so they are
+    interned and only referenced by their index.
+    """
+
+    def __init__(self, base: int) -> None:
+        self.base = base
+        self.nodes = []                 # type: List[ast.Node]
+        self.reason_strings = []        # type: List[Optional[str]]
+        self.via_refs = array('l')
+        self.rule_refs = array('l')
+        self.vias = []                  # type: List[List[Any]]
+        self.via_ids = {}               # type: Dict[Tuple[int, ...], int]
+        self.rules = []                 # type: List[Rules]
+        self.rule_ids = {}              # type: Dict[int, int]
+
+    def intern_vias(self, vias: List[Any]) -> int:
+        # Via lists are built from the entries of the context's position
+        # stack, which stay the same objects while they are on the stack.
+        # The interned copy keeps them alive, so their IDs are not reused.
+        key = tuple(id(via) for via in vias)
+        index = self.via_ids.get(key)
+        if index is None:
+            index = len(self.vias)
+            self.vias.append(list(vias))
+            self.via_ids[key] = index
+        return index
+
+    def intern_rules(self, rules: Optional[Rules]) -> int:
+        if rules is None:
+            return -1
+        index = self.rule_ids.get(id(rules))
+        if index is None:
+            index = len(self.rules)
+            self.rules.append(rules)
+            self.rule_ids[id(rules)] = index
+        return index
+
+    @property
+    def end(self) -> int:
+        """The first ID after the ones of this generation."""
+        return self.base + len(self.nodes)
+
+
 class ErrorManager:
-    """A singleton object that stores the state needed for error handling."""
+    """A singleton object that stores the state needed for error handling.
+
+    Error information is identified by dense integer IDs. It is grouped into
+    generations, each of which belongs to one translation; a generation can
+    be released as soon as the errors of its program have been converted,
+    while the information of other programs is still in use. IDs are never
+    reused, so positions of released generations are simply not found.
+    """
 
     def __init__(self) -> None:
-        self._items = {}                # type: Dict[str, Item]
-        self._conversion_rules = {}     # type: Dict[str, Rules]
+        self._lock = threading.Lock()
+        self._bases = []                # type: List[int]
+        self._tables = {}               # type: Dict[int, ErrorTable]
+        self._current = None            # type: ErrorTable
+        self._new_table(0)
+
+    def _new_table(self, base: int) -> int:
+        # Every generation gets a distinct base, even if the previous one is
+        # empty, s.t. it is not released together with another one.
+        if self._current is not None:
+            base = max(base, self._current.base + 1)
+        table = ErrorTable(base)
+        self._bases.append(base)
+        self._tables[base] = table
+        self._current = table
+        return base
+
+    def start_generation(self) -> int:
+        """Start a new generation of error information.
+
+        All information added afterwards belongs to the new generation.
+        Returns the generation, which can be passed to ``release``.
+        """
+        with self._lock:
+            return self._new_table(self._current.end)
+
+    def release(self, generation: int) -> None:
+        """Free the error information of the given generation."""
+        with self._lock:
+            table = self._tables.pop(generation, None)
+            if table is None:
+                return
+            self._bases.remove(generation)
+            if table is self._current:
+                self._new_table(table.end)
 
     def add_error_information(
             self, node: 'ast.Node', vias: List[Any], reason_string: str,
             conversion_rules: Rules = None) -> str:
         """Add error information to state."""
-        item_id = str(uuid1())
-        assert item_id not in self._items
-        self._items[item_id] = Item(node, vias, reason_string)
-        if conversion_rules is not None:
-            self._conversion_rules[item_id] = conversion_rules
-        return item_id
+        table = self._current
+        item_id = table.end
+        table.reason_strings.append(reason_string)
+        table.via_refs.append(table.intern_vias(vias))
+        table.rule_refs.append(table.intern_rules(conversion_rules))
+        # Appending the node last makes the item visible to lookups.
+        table.nodes.append(node)
+        return str(item_id)
 
     def clear(self) -> None:
         """Clear all state."""
-        self._items.clear()
-        self._conversion_rules.clear()
+        with self._lock:
+            self._bases = []
+            self._tables = {}
+            self._current = None
+            self._new_table(0)
+
+    def size(self) -> int:
+        """Return the number of stored items."""
+        with self._lock:
+            return sum(len(table.nodes) for table in self._tables.values())
 
     def convert(
             self,
@@ -57,23 +157,60 @@ class ErrorManager:
         ]
         return new_errors
 
+    def get_node(
+            self, position: 'ast.AbstractSourcePosition') -> Optional['ast.Node']:
+        """Get the Python node for which the given position was created."""
+        entry = self._lookup(position)
+        if entry is None:
+            return None
+        table, index = entry
+        return table.nodes[index]
+
     def get_vias(self, node_id: str) -> List[Any]:
         """Get via information for the given ``node_id``."""
-        item = self._items[node_id]
-        return item.vias
+        entry = self._find(int(node_id))
+        if entry is None:
+            return []
+        table, index = entry
+        return table.vias[table.via_refs[index]]
 
-    def _get_item(self, pos: 'ast.AbstractSourcePosition') -> Optional[Item]:
-        if hasattr(pos, 'id'):
-            node_id = pos.id()
-            return self._items[node_id]
+    def _find(self, item_id: int) -> Optional[Tuple[ErrorTable, int]]:
+        with self._lock:
+            position = bisect.bisect_right(self._bases, item_id) - 1
+            if position < 0:
+                return None
+            table = self._tables[self._bases[position]]
+        index = item_id - table.base
+        if index < len(table.nodes):
+            return table, index
         return None
 
+    def _lookup(
+            self, position: 'ast.AbstractSourcePosition'
+    ) -> Optional[Tuple[ErrorTable, int]]:
+        if hasattr(position, 'id'):
+            try:
+                item_id = int(position.id())
+            except ValueError:
+                return None
+            return self._find(item_id)
+        return None
+
+    def _get_item(self, pos: 'ast.AbstractSourcePosition') -> Optional[Item]:
+        entry = self._lookup(pos)
+        if entry is None:
+            return None
+        table, index = entry
+        return Item(table.nodes[index], table.vias[table.via_refs[index]],
+                    table.reason_strings[index])
+
     def _get_conversion_rules(
             self, position: 'ast.AbstractSourcePosition') -> Optional[Rules]:
-        if hasattr(position, 'id'):
-            node_id = position.id()
-            if node_id in self._conversion_rules:
-                return self._conversion_rules[node_id]
+        entry = self._lookup(position)
+        if entry is not None:
+            table, index = entry
+            if table.rule_refs[index] >= 0:
+                return table.rules[table.rule_refs[index]]
         return None
 
     def _try_get_rules_workaround(
@@ -0,0 +1,776 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+"""
+Templates for the bodies of inlined methods.
+
+``CallTranslator.inline_method`` translates the body of the inlined method
+again at every call site, although the Silver code this produces only differs
+between call sites in site-specific values: the variables and labels the
+names in the body are aliased to, the fresh names, integers and position IDs
+created while translating it, and the code of the calls the body inlines in
+turn.
+
+The first time a body is inlined with a given combination of the context
+flags its translation depends on, the translation is recorded as a template:
+the sequence of Viper AST factory calls and other side effects (fresh names,
+variables, positions, call dependencies) it performed, with every
+site-specific value replaced by a reference to its source. Instantiating the
+template at another call site performs the same sequence with the values of
+that site, which creates the same Silver code, the same fresh names and the
+same error information as translating the body again. Calls inlined by the
+body are not part of its template; they are inlined again, through their own
+templates, at every instantiation.
+
+Bodies whose translation could depend on anything else (loops, exception
+handlers, quantifiers, ...) are always translated. So are bodies whose
+recording used a value the template cannot trace back to its source; this is
+detected while recording, so a template is either exact or never used.
+"""
+
+import ast
+import re
+
+from nagini_translation.lib.config import translation_config
+from nagini_translation.lib.constants import MAIN_METHOD_NAME
+from nagini_translation.lib.context import Context
+from nagini_translation.lib.program_nodes import (
+    PythonClass,
+    PythonMethod,
+    PythonNode,
+    PythonScope,
+    PythonVar,
+)
+from nagini_translation.lib.typedefs import Stmt, StmtsAndExpr
+from nagini_translation.lib.util import get_body_indices
+from nagini_translation.lib.viper_ast import ViperAST
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+
+# Statements and expressions whose translation uses context state a template
+# does not capture, like loop labels, exception handlers and aliases for
+# bound variables.
+UNSUPPORTED_NODES = (
+    ast.For, ast.AsyncFor, ast.While, ast.Try, ast.With, ast.AsyncWith,
+    ast.Raise, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef,
+    ast.Lambda, ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp,
+    ast.Yield, ast.YieldFrom, ast.Await, ast.Global, ast.Nonlocal,
+    ast.Delete, ast.Import, ast.ImportFrom,
+)
+
+# Obligation variables of the calling method that inlined code refers to.
+CALLER_OBLIGATION_VARS = ('current_thread_var', 'residue_level',
+                          'current_wait_level', 'current_wait_level_target')
+
+# Maximum number of nodes searched for a Silver node that was not created by
+# a recorded step, but taken apart from one.
+MAX_SUBNODE_SEARCH = 2000
+
+# Parameters of ViperAST.to_position.
+POSITION_PARAMS = ('expr', 'vias', 'error_string', 'rules', 'file')
+
+IDENTIFIER = re.compile(r'[A-Za-z_$][A-Za-z0-9_$]*')
+
+# Kinds of encoded values.
+_CONSTANT = 0
+_SLOT = 1       # the result of a recorded step
+_ROLE = 2       # a site-specific value, or one of its attributes
+_LIST = 3
+_TUPLE = 4
+_DICT = 5
+_ITEM = 6       # an element of an encoded list or tuple
+_ATTR = 7       # an attribute of an encoded value
+_SUBNODE = 8    # a descendant of an encoded Silver node
+_SEQ = 9        # a Scala sequence with encoded elements
+
+# Kinds of recorded steps.
+_FACTORY = 0
+_POSITION = 1
+_FRESH_NAME = 2
+_VARIABLE = 3
+_FRESH_INT = 4
+_CALL_DEPENDENCY = 5
+_INLINED_CALL = 6
+
+_CALLER = ('caller',)
+
+
+class UnsupportedValue(Exception):
+    """
+    Raised while recording if a value cannot be traced back to its source.
+    """
+
+
+class FreshInt(int):
+    """
+    A fresh integer created while recording, which can be told apart from
+    equal integer constants.
+    """
+
+
+class BodyInfo:
+    """
+    What a template for the body of a method depends on, found by looking at
+    the body once.
+    """
+
+    def __init__(self, method: PythonMethod) -> None:
+        start, end = get_body_indices(method.node.body)
+        self.supported = True
+        # Names that are looked up in the current class, among others.
+        self.identifiers = set()  # type: Set[str]
+        self.accesses_private = False
+        for stmt in method.node.body[start:end]:
+            for node in ast.walk(stmt):
+                if isinstance(node, UNSUPPORTED_NODES):
+                    self.supported = False
+                elif isinstance(node, ast.Name):
+                    self.identifiers.add(node.id)
+                elif isinstance(node, ast.Str):
+                    self.identifiers.add(node.s)
+                elif (isinstance(node, ast.Attribute) and
+                        node.attr.startswith('__') and
+                        not node.attr.endswith('__')):
+                    self.accesses_private = True
+
+
+class Template:
+    """
+    The recorded translation of the body of a method.
+    """
+
+    def __init__(self, steps: List[Tuple], result: Tuple,
+                 roles: List[Tuple], key_objects: List[Any]) -> None:
+        self.steps = steps
+        self.result = result
+        self.roles = roles
+        # The objects the key refers to by ID, kept alive so that their IDs
+        # are not reused.
+        self.key_objects = key_objects
+
+
+class Recorder:
+    """
+    Records the translation of an inlined body at its first call site.
+    """
+
+    def __init__(self, templates: 'InlineTemplates', ctx: Context,
+                 roles: Dict[Tuple, Any]) -> None:
+        self.templates = templates
+        self.ctx = ctx
+        self.caller = ctx.current_function
+        self.position = ctx.position
+        self.position_length = len(ctx.position)
+        self.steps = []  # type: List[Tuple]
+        # Keeps the results of all steps alive, so that their IDs stay valid.
+        self.values = []  # type: List[Any]
+        self.used_roles = set()  # type: Set[Tuple]
+        # Encodings of known values, by ID, and of known names.
+        self.objects = {}  # type: Dict[int, Tuple]
+        self.names = {}  # type: Dict[str, Tuple]
+        self.java_objects = None  # type: Any
+        self.java_codes = []  # type: List[Tuple]
+        # Keeps nodes which are encoded as constants alive.
+        self.constants = []  # type: List[Any]
+        # Nesting depth of recorded calls; calls made by recorded calls are
+        # part of them and not recorded themselves.
+        self.depth = 0
+        # Number of aliases added by recorded inlined calls, which add them
+        # again when the template is instantiated.
+        self.inlined_aliases = 0
+        self.error = None  # type: Optional[str]
+        for role, value in roles.items():
+            self.register(value, (_ROLE, role, None), overwrite=False)
+
+    def fail(self, reason: str) -> None:
+        if self.error is None:
+            self.error = reason
+
+    def add_step(self, step: Tuple, result: Any) -> Any:
+        index = len(self.values)
+        self.steps.append(step)
+        self.values.append(result)
+        self.register(result, (_SLOT, index))
+        return result
+
+    def register(self, value: Any, code: Tuple,
+                 overwrite: bool = True) -> None:
+        """
+        Makes the given value, and the values it is made of, known as the
+        value with the given encoding.
+        """
+        if value is None or isinstance(value, bool):
+            return
+        if isinstance(value, str):
+            if overwrite or value not in self.names:
+                self.names[value] = code
+            return
+        if isinstance(value, int) and not isinstance(value, FreshInt):
+            return
+        if isinstance(value, (list, tuple)):
+            # Lists can change afterwards, so only their elements are known.
+            for index, item in enumerate(value):
+                self.register(item, (_ITEM, code, index), overwrite)
+            return
+        if not overwrite and id(value) in self.objects:
+            return
+        self.objects[id(value)] = code
+        if isinstance(value, PythonVar):
+            for attr in ('sil_name', 'decl', '_ref'):
+                self.register(getattr(value, attr, None),
+                              (_ATTR, code, attr), overwrite)
+        elif self.java_objects is not None and self.is_java(value):
+            self.java_objects.put(value, len(self.java_codes))
+            self.java_codes.append(code)
+
+    def is_java(self, value: Any) -> bool:
+        return isinstance(value, self.templates.java_object)
+
+    def encode(self, value: Any) -> Tuple:
+        """
+        Returns the encoding of an argument of a recorded step.
+        """
+        if value is None or isinstance(value, (bool, float)):
+            return (_CONSTANT, value)
+        code = self.objects.get(id(value))
+        if code is not None:
+            return self.use(code)
+        if isinstance(value, str):
+            return self.encode_string(value)
+        if isinstance(value, int):
+            return (_CONSTANT, value)
+        if isinstance(value, list):
+            return (_LIST, [self.encode(item) for item in value])
+        if isinstance(value, tuple):
+            return (_TUPLE, tuple(self.encode(item) for item in value))
+        if isinstance(value, dict):
+            return (_DICT, [(self.encode(k), self.encode(v))
+                            for k, v in value.items()])
+        if isinstance(value, (ast.AST, PythonNode)):
+            return (_CONSTANT, value)
+        if self.is_java(value):
+            return self.encode_java(value)
+        if callable(value):
+            raise UnsupportedValue('function ' + repr(value))
+        return (_CONSTANT, value)
+
+    def encode_string(self, value: str) -> Tuple:
+        code = self.names.get(value)
+        if code is not None:
+            return self.use(code)
+        if self.mentions_names(value):
+            raise UnsupportedValue('string ' + value)
+        return (_CONSTANT, value)
+
+    def use(self, code: Tuple) -> Tuple:
+        if code[0] == _ROLE:
+            self.used_roles.add(code[1])
+        elif code[0] in (_ITEM, _ATTR, _SUBNODE):
+            self.use(code[1])
+        return code
+
+    def encode_java(self, value: Any) -> Tuple:
+        """
+        Returns the encoding of a Java object which is not known by the ID of
+        its Python wrapper.
+        """
+        viper = self.templates.viper
+        if self.java_objects is None:
+            # Several Python wrappers can refer to the same Java object, so
+            # known Java objects are also looked up by Java identity, once
+            # there is a need to.
+            self.java_objects = viper.java.util.IdentityHashMap()
+            for known in list(self.values) + list(self.templates.role_values):
+                self.register_java(known)
+        index = self.java_objects.get(value)
+        if index is not None:
+            return self.use(self.java_codes[index.intValue()])
+        if isinstance(value, (viper.ast.Type, viper.ast.Info)):
+            return (_CONSTANT, value)
+        if isinstance(value, viper.ast.Position):
+            if value == viper.NoPosition:
+                return (_CONSTANT, value)
+            raise UnsupportedValue('position ' + str(value))
+        if isinstance(value, viper.ast.Node):
+            if self.contains_known(value) or self.mentions_names(str(value)):
+                return self.use(self.find_subnode(value))
+            # A node that existed before, like the declaration of a
+            # parameter of a function.
+            code = (_CONSTANT, value)
+            self.constants.append(value)
+            self.objects[id(value)] = code
+            return code
+        if isinstance(value, viper.scala.collection.Seq):
+            items = ViperAST.to_list(viper, value)
+            return (_SEQ, [self.encode(item) for item in items])
+        if value == viper.none:
+            return (_CONSTANT, value)
+        raise UnsupportedValue('object ' + str(value))
+
+    def mentions_names(self, text: str) -> bool:
+        return any(token in self.names for token in IDENTIFIER.findall(text))
+
+    def contains_known(self, node: Any) -> bool:
+        """
+        Checks if the given Silver node contains a known node or position.
+        """
+        viper = self.templates.viper
+        to_visit = [node]
+        budget = MAX_SUBNODE_SEARCH
+        while to_visit:
+            budget -= 1
+            if not budget:
+                return True
+            current = to_visit.pop()
+            if self.java_objects.containsKey(current):
+                return True
+            if (isinstance(current, viper.ast.Positioned) and
+                    self.java_objects.containsKey(current.pos())):
+                return True
+            iterator = current.subnodes().iterator()
+            while iterator.hasNext():
+                to_visit.append(iterator.next())
+        return False
+
+    def register_java(self, value: Any) -> None:
+        if isinstance(value, (list, tuple)):
+            for item in value:
+                self.register_java(item)
+            return
+        code = self.objects.get(id(value))
+        if code is None:
+            return
+        if isinstance(value, PythonVar):
+            for attr in ('decl', '_ref'):
+                self.register_java(getattr(value, attr, None))
+        elif self.is_java(value):
+            self.java_objects.put(value, len(self.java_codes))
+            self.java_codes.append(code)
+
+    def find_subnode(self, node: Any) -> Tuple:
+        """
+        Finds a Silver node that was taken apart from a known one, e.g. the
+        operand of a binary expression.
+        """
+        target = self.templates.viper.java.util.IdentityHashMap()
+        target.put(node, 0)
+        budget = MAX_SUBNODE_SEARCH
+        for index in reversed(range(len(self.values))):
+            root = self.values[index]
+            if not isinstance(root, self.templates.viper.ast.Node):
+                continue
+            to_visit = [(root, ())]  # type: List[Tuple[Any, Tuple[int, ...]]]
+            while to_visit and budget:
+                current, path = to_visit.pop()
+                budget -= 1
+                if path and target.containsKey(current):
+                    return (_SUBNODE, (_SLOT, index), path)
+                iterator = current.subnodes().iterator()
+                position = 0
+                while iterator.hasNext():
+                    to_visit.append((iterator.next(), path + (position,)))
+                    position += 1
+        raise UnsupportedValue('node ' + str(node))
+
+    def record_call(self, kind: int, target: Any, args: Tuple,
+                    result: Any, kwargs: Dict[str, Any] = None) -> None:
+        """
+        Records a call which created the given result.
+        """
+        if self.error is not None:
+            return
+        try:
+            encoded = tuple(self.encode(arg) for arg in args)
+            if kwargs:
+                encoded_kwargs = {name: self.encode(value)
+                                  for name, value in kwargs.items()}
+            else:
+                encoded_kwargs = None
+        except UnsupportedValue as e:
+            self.fail(str(e))
+            return
+        self.add_step((kind, target, encoded, encoded_kwargs), result)
+
+    def record_position(self, args: Tuple, kwargs: Dict[str, Any],
+                        result: Any) -> None:
+        """
+        Records the creation of a position, whose error information refers
+        to the position stack of the call site.
+        """
+        params = dict(zip(POSITION_PARAMS, args))
+        params.update(kwargs)
+        if (params['vias'] is not self.position or
+                len(self.position) != self.position_length):
+            self.fail('position stack changed')
+            return
+        args = tuple((_CONSTANT, params.get(name))
+                     for name in POSITION_PARAMS if name != 'vias')
+        self.add_step((_POSITION, None, args, None), result)
+
+    def encode_target(self, scope: PythonScope) -> Tuple:
+        if scope is self.caller:
+            return (_ROLE, _CALLER, None)
+        return (_CONSTANT, scope)
+
+
+class RecordingSet(set):
+    """
+    Stands in for the set of call dependencies of the calling method while
+    recording, and records additions to it.
+    """
+
+    def __init__(self, templates: 'InlineTemplates', original: set) -> None:
+        super().__init__(original)
+        self.templates = templates
+        self.original = original
+
+    def add(self, element: Any) -> None:
+        recorder = self.templates.recorder
+        if recorder is not None and not recorder.depth:
+            recorder.record_call(_CALL_DEPENDENCY, None, (element,), None)
+        super().add(element)
+        self.original.add(element)
+
+
+class InlineTemplates:
+    """
+    Records and instantiates templates of inlined method bodies during the
+    translation of one program.
+    """
+
+    def __init__(self, viper: ViperAST) -> None:
+        self.viper = viper
+        self.java_object = viper.java.lang.Object
+        self.templates = {}  # type: Dict[Tuple, Any]
+        self.bodies = {}  # type: Dict[PythonMethod, BodyInfo]
+        # The active recorder is the last one; None while recording is
+        # suspended for a call inlined by a recorded body.
+        self.recorders = []  # type: List[Optional[Recorder]]
+        self.role_values = []  # type: List[Any]
+        self._restore = []  # type: List[Callable[[], None]]
+        self.recorded = 0
+        self.instantiated = 0
+        self.unsupported = 0
+
+    @property
+    def recorder(self) -> Optional[Recorder]:
+        return self.recorders[-1] if self.recorders else None
+
+    def translate_body(self, method: PythonMethod,
+                       translate: Callable[[], List[Stmt]],
+                       ctx: Context) -> List[Stmt]:
+        """
+        Returns the translation of the body of the given inlined method, which
+        ``translate`` creates, from its template if there is one for the
+        current context.
+        """
+        if not translation_config.inline_templates:
+            return translate()
+        key_objects = self._key(method, ctx)
+        if key_objects is None:
+            return translate()
+        key = tuple(obj if isinstance(obj, (bool, str, tuple, frozenset))
+                    else id(obj) for obj in key_objects)
+        template = self.templates.get(key, False)
+        if template is None:
+            return translate()
+        roles = self._roles(ctx)
+        if template is False:
+            return self._record(key, key_objects, roles, translate, ctx)
+        if not all(role in roles for role in template.roles):
+            return translate()
+        self.instantiated += 1
+        return self._instantiate(template, roles, ctx)
+
+    def inline_call(self, inline: Callable[..., StmtsAndExpr],
+                    *args: Any) -> StmtsAndExpr:
+        """
+        Inlines a call by calling ``inline`` with the given arguments. If the
+        call is part of a body that is being recorded, it is recorded as a
+        single step, which inlines it again when instantiating the template.
+        """
+        recorder = self.recorder
+        if recorder is None or recorder.depth:
+            return inline(*args)
+        aliases = len(recorder.ctx._current_alias_context)
+        self.recorders.append(None)
+        try:
+            result = inline(*args)
+        finally:
+            self.recorders.pop()
+        recorder.inlined_aliases += (len(recorder.ctx._current_alias_context) -
+                                     aliases)
+        recorder.record_call(_INLINED_CALL, inline, args, result)
+        return result
+
+    def statistics(self) -> str:
+        return ('Recorded {} templates of inlined bodies, instantiated them '
+                '{} times; {} bodies could not be recorded.'.format(
+                    self.recorded, self.instantiated, self.unsupported))
+
+    def _key(self, method: PythonMethod,
+             ctx: Context) -> Optional[Tuple]:
+        """
+        Returns the method and the context flags its translation depends on,
+        or None if its body is always translated in the current context.
+        """
+        body = self.bodies.get(method)
+        if body is None:
+            body = BodyInfo(method)
+            self.bodies[method] = body
+        if (not body.supported or ctx.old_expr_aliases or
+                ctx.io_open_context.is_opening):
+            return None
+        cls = ctx.current_class
+        if cls is not None and not body.accesses_private:
+            contents = cls.get_contents(True)
+            if not any(name in contents for name in body.identifiers):
+                cls = None
+        caller = ctx.current_function
+        obligations = ctx.obligation_context
+        return (method, cls, ctx.module, caller.module,
+                caller.name == MAIN_METHOD_NAME,
+                ctx.ignore_family_folds, ctx.ignore_waitlevel_constraints,
+                ctx.arp, ctx.is_thread_start, ctx.current_thread_object,
+                ctx.perm_factor, ctx.info, ctx.current_contract_exception,
+                obligations.is_translating_posts,
+                tuple(obligations._loop_stack),
+                tuple(sorted(ctx.bound_type_vars.items())),
+                # Translations only check if some reason is on the stack.
+                frozenset(reason for reason, _ in ctx.position))
+
+    def _roles(self, ctx: Context) -> Dict[Tuple, Any]:
+        """
+        Returns the site-specific values a template can refer to.
+        """
+        roles = {}  # type: Dict[Tuple, Any]
+        for name, var in ctx.var_aliases.items():
+            roles[('alias', name)] = var
+        for name, label in ctx.label_aliases.items():
+            roles[('label', name)] = label
+        caller = ctx.current_function
+        roles[_CALLER] = caller
+        for attr in ('error_var', 'result'):
+            var = getattr(caller, attr, None)
+            if var is not None:
+                roles[('caller', attr)] = var
+        info = getattr(caller, 'obligation_info', None)
+        if info is not None:
+            for attr in CALLER_OBLIGATION_VARS:
+                roles[('obligation', attr)] = getattr(info, attr)
+            for attr in ('caller_measure_map', 'method_measure_map'):
+                roles[('obligation', attr)] = getattr(info, attr).get_var()
+        return roles
+
+    def _record(self, key: Tuple, key_objects: Tuple, roles: Dict[Tuple, Any],
+                translate: Callable[[], List[Stmt]],
+                ctx: Context) -> List[Stmt]:
+        recorder = Recorder(self, ctx, roles)
+        if not self.recorders:
+            self._install(ctx)
+        self.recorders.append(recorder)
+        self.role_values.extend(roles.values())
+        aliases = (dict(ctx.var_aliases), len(ctx._current_alias_context))
+        locals_before = len(ctx.current_function.locals)
+        try:
+            stmts = translate()
+            result = recorder.encode(stmts)
+        except UnsupportedValue as e:
+            recorder.fail(str(e))
+        finally:
+            self.recorders.pop()
+            del self.role_values[-len(roles):]
+            if not self.recorders:
+                self._uninstall()
+        if aliases != (ctx.var_aliases, len(ctx._current_alias_context) -
+                       recorder.inlined_aliases):
+            recorder.fail('aliases changed')
+        created = sum(1 for kind, target, args, _ in recorder.steps
+                      if kind == _VARIABLE and target == _CALLER_CODE and
+                      args[3][1])
+        inlined = any(step[0] == _INLINED_CALL for step in recorder.steps)
+        if not inlined and (len(ctx.current_function.locals) !=
+                            locals_before + created):
+            recorder.fail('locals changed')
+        if recorder.error is not None:
+            self.templates[key] = None
+            self.unsupported += 1
+        else:
+            self.templates[key] = Template(recorder.steps, result,
+                                           list(recorder.used_roles),
+                                           list(key_objects))
+            self.recorded += 1
+        return stmts
+
+    def _install(self, ctx: Context) -> None:
+        """
+        Starts observing the operations recorded in templates.
+        """
+        viper = self.viper
+        observed = []
+        for name in dir(type(viper)):
+            if name.startswith('_'):
+                continue
+            function = getattr(type(viper), name)
+            if not callable(function) or isinstance(function, type):
+                continue
+            setattr(viper, name, self._observe_factory(name, function))
+            observed.append(name)
+        get_fresh_name = PythonScope.get_fresh_name
+        create_variable = PythonMethod.create_variable
+        PythonScope.get_fresh_name = self._observe_fresh_name(get_fresh_name)
+        PythonMethod.create_variable = self._observe_variable(create_variable)
+        get_fresh_int = ctx.get_fresh_int
+        ctx.get_fresh_int = self._observe_fresh_int(get_fresh_int)
+        caller = ctx.current_function
+        call_deps = caller.call_deps
+        caller.call_deps = RecordingSet(self, call_deps)
+
+        def restore() -> None:
+            for name in observed:
+                delattr(viper, name)
+            PythonScope.get_fresh_name = get_fresh_name
+            PythonMethod.create_variable = create_variable
+            del ctx.get_fresh_int
+            caller.call_deps = call_deps
+        self._restore.append(restore)
+
+    def _uninstall(self) -> None:
+        self._restore.pop()()
+
+    def _observe_factory(self, name: str, function: Callable) -> Callable:
+        viper = self.viper
+
+        def observed(*args, **kwargs):
+            recorder = self.recorder
+            if recorder is None or recorder.depth:
+                return function(viper, *args, **kwargs)
+            recorder.depth += 1
+            try:
+                result = function(viper, *args, **kwargs)
+            finally:
+                recorder.depth -= 1
+            if name == 'to_position':
+                recorder.record_position(args, kwargs, result)
+            else:
+                recorder.record_call(_FACTORY, function, args, result,
+                                     kwargs)
+            return result
+        return observed
+
+    def _observe_fresh_name(self, function: Callable) -> Callable:
+        templates = self
+
+        def get_fresh_name(self, name: str) -> str:
+            recorder = templates.recorder
+            if recorder is None or recorder.depth:
+                return function(self, name)
+            recorder.depth += 1
+            try:
+                result = function(self, name)
+            finally:
+                recorder.depth -= 1
+            recorder.record_call(_FRESH_NAME, recorder.encode_target(self),
+                                 (name,), result)
+            return result
+        return get_fresh_name
+
+    def _observe_variable(self, function: Callable) -> Callable:
+        templates = self
+
+        def create_variable(self, name: str, cls: PythonClass,
+                            translator: 'Translator',
+                            local: bool = True) -> PythonVar:
+            recorder = templates.recorder
+            if recorder is None or recorder.depth:
+                return function(self, name, cls, translator, local)
+            recorder.depth += 1
+            try:
+                result = function(self, name, cls, translator, local)
+            finally:
+                recorder.depth -= 1
+            recorder.record_call(_VARIABLE, recorder.encode_target(self),
+                                 (name, cls, translator, local), result)
+            return result
+        return create_variable
+
+    def _observe_fresh_int(self, function: Callable) -> Callable:
+
+        def get_fresh_int() -> int:
+            recorder = self.recorder
+            result = function()
+            if recorder is None or recorder.depth:
+                return result
+            result = FreshInt(result)
+            recorder.add_step((_FRESH_INT, None, (), None), result)
+            return result
+        return get_fresh_int
+
+    def _instantiate(self, template: Template, roles: Dict[Tuple, Any],
+                     ctx: Context) -> List[Stmt]:
+        viper = self.viper
+        values = []  # type: List[Any]
+        decode = self._decoder(values, roles)
+        for kind, target, args, kwargs in template.steps:
+            args = [decode(arg) for arg in args]
+            if kind == _FACTORY:
+                if kwargs:
+                    kwargs = {name: decode(value)
+                              for name, value in kwargs.items()}
+                    result = target(viper, *args, **kwargs)
+                else:
+                    result = target(viper, *args)
+            elif kind == _POSITION:
+                expr, error_string, rules, file = args
+                result = viper.to_position(expr, ctx.position, error_string,
+                                           rules, file)
+            elif kind == _FRESH_NAME:
+                result = decode(target).get_fresh_name(*args)
+            elif kind == _VARIABLE:
+                result = decode(target).create_variable(*args)
+            elif kind == _FRESH_INT:
+                result = ctx.get_fresh_int()
+            elif kind == _CALL_DEPENDENCY:
+                ctx.current_function.call_deps.add(args[0])
+                result = None
+            else:
+                result = self.inline_call(target, *args)
+            values.append(result)
+        return decode(template.result)
+
+    def _decoder(self, values: List[Any],
+                 roles: Dict[Tuple, Any]) -> Callable[[Tuple], Any]:
+        viper = self.viper
+
+        def decode(code: Tuple) -> Any:
+            kind = code[0]
+            if kind == _CONSTANT:
+                return code[1]
+            if kind == _SLOT:
+                return values[code[1]]
+            if kind == _ROLE:
+                value = roles[code[1]]
+                return getattr(value, code[2]) if code[2] else value
+            if kind == _LIST:
+                return [decode(item) for item in code[1]]
+            if kind == _TUPLE:
+                return tuple(decode(item) for item in code[1])
+            if kind == _DICT:
+                return {decode(k): decode(v) for k, v in code[1]}
+            if kind == _ITEM:
+                return decode(code[1])[code[2]]
+            if kind == _ATTR:
+                return getattr(decode(code[1]), code[2])
+            if kind == _SUBNODE:
+                node = decode(code[1])
+                for index in code[2]:
+                    node = ViperAST.to_list(viper, node.subnodes())[index]
+                return node
+            return ViperAST.to_seq(viper, [decode(item) for item in code[1]])
+        return decode
+
+
+_CALLER_CODE = (_ROLE, _CALLER, None)  # type: Tuple
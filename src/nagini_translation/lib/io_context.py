@@ -51,6 +51,11 @@ class IOOpenContext:
         self._open_var_aliases.clear()
         self._open_var_alias_definitions.clear()
 
+    @property
+    def is_opening(self) -> bool:
+        """Are we currently translating IO open?"""
+        return self._is_opening
+
     def add_variable(self, var_name: str, var: PythonVar) -> None:
         """Add IO opening variable."""
         assert self._is_opening
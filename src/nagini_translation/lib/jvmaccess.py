@@ -20,6 +20,15 @@ class JVM:
         self.viper = jpype.JPackage('viper')
         self.fastparse = jpype.JPackage('fastparse')
 
+    def attach_current_thread(self) -> None:
+        """
+        Makes the JVM accessible from the current thread. Must be called by
+        every thread other than the one that started the JVM before it uses
+        any Java objects.
+        """
+        if not jpype.isThreadAttachedToJVM():
+            jpype.attachThreadToJVM()
+
     def get_proxy(self, supertype, instance):
         return jpype.JProxy(supertype, inst=instance)
 
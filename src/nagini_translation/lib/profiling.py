@@ -0,0 +1,281 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+"""Timing of the phases of translating and verifying a program.
+
+Besides accumulating the times of the phases, a profiler can record nested
+spans for the phases and for every translated member, which can be written
+as JSON or in the Chrome trace event format (viewable in
+``chrome://tracing`` or Perfetto).
+"""
+
+import ast
+import json
+import os
+import threading
+import time
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+
+TYPE_CHECK = 'type_check'
+ANALYSIS = 'analysis'
+TRANSLATION = 'translation'
+SIF_TRANSFORMATION = 'sif_transformation'
+ARP_TRANSFORMATION = 'arp_transformation'
+CONSISTENCY_CHECK = 'consistency_check'
+VERIFICATION = 'verification'
+
+PHASES = [
+    TYPE_CHECK,
+    ANALYSIS,
+    TRANSLATION,
+    SIF_TRANSFORMATION,
+    ARP_TRANSFORMATION,
+    CONSISTENCY_CHECK,
+    VERIFICATION,
+]
+
+
+class PhaseTimer:
+    """
+    Accumulates the time spent in each phase since it was last reset. Phases
+    may be entered from several threads at once (e.g. when verifying the
+    parts of a program concurrently), in which case their times add up.
+    """
+
+    def __init__(self) -> None:
+        self._times = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            with profiler.span(name, 'phase'):
+                yield
+        finally:
+            duration = time.perf_counter() - start
+            with self._lock:
+                self._times[name] = self._times.get(name, 0.0) + duration
+
+    def reset(self) -> None:
+        with self._lock:
+            self._times.clear()
+
+    def times(self) -> Dict[str, float]:
+        """
+        Returns the accumulated times of all phases that were entered, in
+        the order in which they are executed.
+        """
+        with self._lock:
+            times = dict(self._times)
+        result = OrderedDict()
+        for name in PHASES:
+            if name in times:
+                result[name] = times.pop(name)
+        for name in sorted(times):
+            result[name] = times[name]
+        return result
+
+    def __str__(self) -> str:
+        return ', '.join('{}: {:.2f}s'.format(name, duration)
+                         for name, duration in self.times().items())
+
+
+phase_timer = PhaseTimer()
+
+
+class Span:
+    """
+    A timed section of the work of a single thread, possibly nested in
+    another one. ``args`` holds additional information about the section.
+    """
+
+    def __init__(self, name: str, category: str, args: Dict[str, Any],
+                 parent: Optional['Span'], thread: int) -> None:
+        self.name = name
+        self.category = category
+        self.args = args
+        self.parent = parent
+        self.thread = thread
+        self.children = []
+        self.start = 0.0
+        self.duration = 0.0
+
+    def to_json(self) -> Dict[str, Any]:
+        return OrderedDict([
+            ('name', self.name),
+            ('category', self.category),
+            ('start', self.start),
+            ('duration', self.duration),
+            ('args', self.args),
+            ('children', [child.to_json() for child in self.children]),
+        ])
+
+
+class Profiler:
+    """
+    Records spans while it is enabled. Recording is per thread, i.e., spans
+    opened in a thread are nested in the spans open in the same thread
+    only. While disabled, opening a span costs a single check.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._roots = []
+        self._spans = []
+        self._origin = time.perf_counter()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """
+        Discards all recorded spans and starts recording.
+        """
+        with self._lock:
+            self._roots = []
+            self._spans = []
+        self._origin = time.perf_counter()
+        self.enabled = True
+
+    def stop(self) -> None:
+        self.enabled = False
+
+    def _stack(self) -> List[Span]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def span(self, name: str, category: str = '', **args):
+        """
+        Records the time spent in the body as a span, which is nested in the
+        innermost span open in the current thread. Yields the span (or None
+        if the profiler is disabled), whose arguments may be extended.
+        """
+        if not self.enabled:
+            yield None
+            return
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        span = Span(name, category, args, parent, threading.get_ident())
+        stack.append(span)
+        span.start = time.perf_counter() - self._origin
+        try:
+            yield span
+        finally:
+            span.duration = time.perf_counter() - self._origin - span.start
+            stack.pop()
+            with self._lock:
+                self._spans.append(span)
+                if parent:
+                    parent.children.append(span)
+                else:
+                    self._roots.append(span)
+
+    def translate_member(self, kind: str, member: 'PythonNode',
+                         viper: 'ViperAST', translate: Callable, *args) -> Any:
+        """
+        Calls ``translate`` with the given arguments to translate the given
+        member (method, function, predicate, IO operation) and records a span
+        for it, with the number of Python AST nodes of the member, the number
+        of positions created and the size of the resulting Silver nodes.
+        """
+        if not self.enabled:
+            return translate(*args)
+        name = member.name
+        cls = getattr(member, 'cls', None)
+        if cls:
+            name = cls.name + '.' + name
+        positions = viper.position_count
+        with self.span(name, kind) as span:
+            result = translate(*args)
+        span.args['line'] = getattr(member.node, 'lineno', None)
+        span.args['python_nodes'] = (sum(1 for _ in ast.walk(member.node))
+                                     if member.node else 0)
+        span.args['positions'] = viper.position_count - positions
+        results = result if isinstance(result, tuple) else (result,)
+        nodes = []
+        for result_part in results:
+            if isinstance(result_part, list):
+                nodes.extend(result_part)
+            elif result_part is not None:
+                nodes.append(result_part)
+        span.args['silver_members'] = len(nodes)
+        span.args['silver_characters'] = sum(len(str(node)) for node in nodes)
+        return result
+
+    def to_json(self) -> Dict[str, Any]:
+        """
+        Returns the recorded spans as trees, one list per thread.
+        """
+        with self._lock:
+            roots = list(self._roots)
+        threads = OrderedDict()
+        for root in sorted(roots, key=lambda span: span.start):
+            threads.setdefault(str(root.thread), []).append(root.to_json())
+        return OrderedDict([('threads', threads)])
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """
+        Returns the recorded spans as complete events in the Chrome trace
+        event format.
+        """
+        with self._lock:
+            spans = sorted(self._spans, key=lambda span: span.start)
+        pid = os.getpid()
+        events = []
+        for span in spans:
+            events.append(OrderedDict([
+                ('name', span.name),
+                ('cat', span.category),
+                ('ph', 'X'),
+                ('ts', span.start * 1e6),
+                ('dur', span.duration * 1e6),
+                ('pid', pid),
+                ('tid', span.thread),
+                ('args', span.args),
+            ]))
+        return OrderedDict([('traceEvents', events),
+                            ('displayTimeUnit', 'ms')])
+
+    def write(self, path: str, format: str = 'json') -> None:
+        """
+        Writes the recorded spans to the given file, either as JSON or in
+        the Chrome trace format.
+        """
+        if format == 'chrome':
+            data = self.to_chrome_trace()
+        elif format == 'json':
+            data = self.to_json()
+        else:
+            raise ValueError('Unknown profile format: ' + format)
+        with open(path, 'w') as file:
+            json.dump(data, file, indent=1)
+
+
+profiler = Profiler()
+
+
+def program_size(prog: 'silver.ast.Program') -> Dict[str, int]:
+    """
+    Returns size metrics of the given Silver program, i.e., the number of
+    members of each kind and the length of its textual representation.
+    """
+    text = str(prog)
+    return OrderedDict([
+        ('domains', prog.domains().size()),
+        ('fields', prog.fields().size()),
+        ('functions', prog.functions().size()),
+        ('predicates', prog.predicates().size()),
+        ('methods', prog.methods().size()),
+        ('lines', text.count('\n') + 1),
+        ('characters', len(text)),
+    ])
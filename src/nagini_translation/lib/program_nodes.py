@@ -37,10 +37,15 @@ from nagini_translation.lib.util import (
     get_column,
     InvalidProgramException,
     SingletonFreshName,
+    TryBlockList,
 )
 from nagini_translation.lib.views import (
     CombinedDict,
+    flatten_members,
+    IncludedMembers,
     IOOperationContentDict,
+    MemberDict,
+    MODULE_MEMBER_FIELDS,
 )
 from typing import Any, Dict, List, Optional, Set, Tuple
 from toposort import toposort_flatten
@@ -122,7 +127,7 @@ class PythonStatementContainer:
         self.labels = [END_LABEL]
         self.precondition = []
         self.postcondition = []
-        self.try_blocks = []  # direct
+        self.try_blocks = TryBlockList()  # direct
         self.loop_invariants = {}   # type: Dict[Union[ast.While, ast.For], List[ast.AST]]
 
 
@@ -148,13 +153,18 @@ class PythonModule(PythonScope, ContainerInterface, PythonStatementContainer):
         PythonScope.__init__(self, sil_names, None)
         PythonStatementContainer.__init__(self)
         self.node = node
-        self.classes = OrderedDict()
-        self.functions = OrderedDict()
-        self.methods = OrderedDict()
-        self.predicates = OrderedDict()
-        self.io_operations = OrderedDict()
-        self.global_vars = OrderedDict()
-        self.namespaces = OrderedDict()
+        self.classes = MemberDict()
+        self.functions = MemberDict()
+        self.methods = MemberDict()
+        self.predicates = MemberDict()
+        self.io_operations = MemberDict()
+        self.global_vars = MemberDict()
+        self.namespaces = MemberDict()
+        # Symbol table of this module, built by get_contents.
+        self.symbols = None
+        # Symbol table including all imported modules, see
+        # get_included_contents.
+        self.included_symbols = IncludedMembers(self)
         self.global_module = global_module
         self.type_prefix = type_prefix
         self.from_imports = []
@@ -278,9 +288,47 @@ class PythonModule(PythonScope, ContainerInterface, PythonStatementContainer):
         used by get_target). If 'only_top' is true, returns only top level
         elements that can be accessed without a receiver.
         """
-        dicts = [self.classes,  self.functions, self.global_vars, self.methods,
-                 self.predicates, self.io_operations, self.namespaces]
-        return CombinedDict([], dicts)
+        if self.symbols is None:
+            dicts = [getattr(self, field) for field in MODULE_MEMBER_FIELDS]
+            self.symbols = flatten_members(dicts)
+            for d in dicts:
+                d.add_listener(self)
+        return self.symbols
+
+    def get_included_contents(self) -> Dict:
+        """
+        Returns the elements that can be accessed as attributes of this
+        module, i.e. its own members and those of all modules it includes
+        (but not the global module).
+        """
+        return self.included_symbols.get()
+
+    def member_changed(self, name: str) -> None:
+        """
+        Updates the symbol table entry for the given name after it has been
+        added to, changed in or removed from one of the member fields.
+        """
+        if self.symbols is None:
+            return
+        for field in MODULE_MEMBER_FIELDS:
+            members = getattr(self, field)
+            if name in members:
+                self.symbols[name] = members[name]
+                return
+        self.symbols.pop(name, None)
+
+    def invalidate(self) -> None:
+        self.symbols = None
+
+    def add_from_import(self, module: 'PythonModule') -> None:
+        """
+        Makes all members of the given module (or module view) available in
+        this one. Views that include this module are rebuilt when they are
+        used next.
+        """
+        self.from_imports.append(module)
+        for field in MODULE_MEMBER_FIELDS:
+            getattr(self, field).invalidate_listeners()
 
 
 class PythonNode:
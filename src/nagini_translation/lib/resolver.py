@@ -44,7 +44,116 @@ from nagini_translation.lib.util import (
     InvalidProgramException,
     UnsupportedException,
 )
-from typing import List, Optional
+from typing import Any, Callable, List, Optional, Tuple
+
+
+class ResolutionCache:
+    """
+    Caches the results of get_target and get_type during a translation.
+
+    Entries are keyed by the identity of the resolved node, of the containers
+    it is resolved in and of the immediate container. Methods and contexts
+    are the only containers whose contents change during a translation; for
+    methods, the key also contains the number of locals, for contexts, the
+    current aliases of all names occurring in the node.
+    Since entries keep the objects in their keys alive, identities cannot be
+    reused while an entry exists.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._names = {}
+
+    def start(self) -> None:
+        """
+        Enables the cache for a new translation.
+        """
+        self.clear()
+        self.hits = 0
+        self.misses = 0
+        self.enabled = True
+
+    def stop(self) -> None:
+        """
+        Disables the cache and drops all entries, but keeps the counters.
+        """
+        self.enabled = False
+        self.clear()
+
+    def clear(self) -> None:
+        """
+        Invalidates all entries, must be called whenever new members are
+        defined while the cache is enabled.
+        """
+        self._entries = {}
+        self._names = {}
+
+    def _get_names(self, node: ast.AST) -> Tuple[str, ...]:
+        """
+        Returns all names and string literals (which can be type references)
+        occurring in the given node.
+        """
+        names = self._names.get(node)
+        if names is None:
+            names = []
+            for child in ast.walk(node):
+                if isinstance(child, ast.Name):
+                    names.append(child.id)
+                elif isinstance(child, ast.Str):
+                    names.append(child.s)
+            names = tuple(names)
+            self._names[node] = names
+        return names
+
+    def lookup(self, kind: str, node: ast.AST,
+               containers: List[ContainerInterface], container: PythonNode,
+               resolve: Callable[[], Any]) -> Any:
+        """
+        Returns the cached result of resolving the given node, or resolves it
+        using ``resolve`` and caches the result.
+        """
+        if not self.enabled:
+            return resolve()
+        keep_alive = [node, container]
+        key = [kind, id(node), id(container)]
+        for cont in containers:
+            key.append(id(cont))
+            keep_alive.append(cont)
+            if hasattr(cont, 'locals'):
+                # Methods get new locals during translation (e.g. for
+                # exception handling or inlined calls); since locals are
+                # never removed, their number identifies the contents.
+                key.append(len(cont.locals))
+            if hasattr(cont, 'var_aliases'):
+                aliases = cont.var_aliases
+                for name in self._get_names(node):
+                    alias = aliases.get(name)
+                    key.append(id(alias))
+                    keep_alive.append(alias)
+                exception = getattr(cont, 'current_contract_exception', None)
+                key.append(id(exception))
+                keep_alive.append(exception)
+        key = tuple(key)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        result = resolve()
+        self._entries[key] = (result, keep_alive)
+        return result
+
+    def statistics(self) -> str:
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return 'Resolved {} nodes, {} from cache ({:.0%}).'.format(
+            total, self.hits, rate)
+
+
+resolution_cache = ResolutionCache()
 
 
 def get_target(node: ast.AST,
@@ -58,6 +167,18 @@ def get_target(node: ast.AST,
     If the ``type`` parameter is set, will also consider string literals as potential
     references.
     """
+    kind = 'type_target' if type else 'target'
+    return resolution_cache.lookup(
+        kind, node, containers, container,
+        lambda: _get_target(node, containers, container, type))
+
+
+def _get_target(node: ast.AST,
+                containers: List[ContainerInterface],
+                container: PythonNode, type: bool) -> Optional[PythonNode]:
+    """
+    Does the actual work for get_target.
+    """
     if isinstance(node, ast.Name):
         return find_entry(node.id, True, containers)
     elif type and isinstance(node, ast.Str):
@@ -94,15 +215,13 @@ def get_target(node: ast.AST,
         if isinstance(lhs, GenericType):
             # Use the class, since we want to look for members.
             lhs = lhs.cls
-        # Now collect all containers we have to look through
-        containers = []
         if isinstance(lhs, PythonModule):
-            # We have to look through all included modules as well, but not
-            # through the global one, since it makes no sense to refer to
-            # global stuff by looking in a different module
-            containers.extend(lhs.get_included_modules(include_global=False))
-        else:
-            containers.append(lhs)
+            # The table of a module includes all modules it imports from, but
+            # not the global one, since it makes no sense to refer to global
+            # stuff by looking in a different module
+            return lhs.get_included_contents().get(node.attr)
+        # Now collect all containers we have to look through
+        containers = [lhs]
         while (isinstance(containers[-1], PythonClass) and
                    containers[-1].superclass):
             # If we're looking in a class, add all superclasses as well.
@@ -171,6 +290,13 @@ def get_type(node: ast.AST, containers: List[ContainerInterface],
     PythonModules, etc). For primitive values, returns the boxed version.
     Returns None if the type is void.
     """
+    return resolution_cache.lookup(
+        'type', node, containers, container,
+        lambda: _get_boxed_type(node, containers, container))
+
+
+def _get_boxed_type(node: ast.AST, containers: List[ContainerInterface],
+                    container: PythonNode) -> Optional[PythonType]:
     result = _do_get_type(node, containers, container)
     if isinstance(result, PythonType):
         result = result.try_box()
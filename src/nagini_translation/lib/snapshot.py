@@ -0,0 +1,452 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+"""On-disk snapshots of the builtin Silver programs.
+
+Parsing, resolving and translating the Silver resources (resources/all.sil
+and its SIF variant) takes several seconds and used to be repeated in every
+process. Silver ASTs are not serializable (positions, for example, are not
+``Serializable``, and many node classes lack the constructors Java
+serialization needs), so a snapshot instead records the object graph of the
+translated program reflectively: the fields of every object, including the
+ones declared in superclasses. Loading a snapshot allocates all objects
+without running their constructors and then sets their fields, which gives a
+program that is indistinguishable from a freshly parsed one.
+
+Snapshots are keyed by the hashes of the resource files they were created
+from, the installed backends and the snapshot format, so that editing a
+resource or upgrading Viper simply leads to a new snapshot. Objects of
+classes the format does not know about make creating a snapshot fail; the
+resources are then parsed in every process, as before.
+"""
+
+
+import hashlib
+import json
+import logging
+import os
+
+from jpype import JArray, JClass
+from nagini_translation.lib.cache import backend_fingerprint, file_digest
+from nagini_translation.lib.jvmaccess import JVM
+from typing import Any, Dict, List, Optional, Tuple
+
+
+logger = logging.getLogger('nagini_translation.lib.snapshot')
+
+
+SNAPSHOT_FORMAT_VERSION = '1'
+
+_SUFFIX = '.json'
+
+# Kinds of entries in a snapshot.
+_OBJECT = 'o'
+_ARRAY = 'a'
+_STRING = 's'
+_BIG_INTEGER = 'i'
+_PATH = 'p'
+_MODULE = 'm'
+_FUNCTION0 = 'f'
+
+# Packages of the Java platform; objects of these classes are only supported
+# if they have one of the kinds above.
+_PLATFORM_PACKAGES = ('java.', 'javax.', 'jdk.', 'sun.', 'com.sun.')
+
+# Value of java.lang.reflect.Modifier.STATIC.
+_STATIC = 0x0008
+
+_PRIMITIVE_ACCESSORS = {
+    'boolean': 'Boolean',
+    'byte': 'Byte',
+    'char': 'Char',
+    'short': 'Short',
+    'int': 'Int',
+    'long': 'Long',
+    'float': 'Float',
+    'double': 'Double',
+}
+
+
+def snapshot_key(resources: List[str]) -> Optional[str]:
+    """
+    Returns the key of a snapshot of the program parsed from the given
+    resource files, or None if one of them cannot be read.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(SNAPSHOT_FORMAT_VERSION.encode())
+    hasher.update(backend_fingerprint().encode())
+    for path in sorted(resources):
+        digest = file_digest(path)
+        if digest is None:
+            return None
+        # Positions in the program refer to the resource files by path.
+        hasher.update(os.path.abspath(path).encode())
+        hasher.update(digest.encode())
+    return hasher.hexdigest()
+
+
+class _JavaCall:
+    """
+    Java ``Runnable`` which calls a Python function. Since Java 9, making
+    fields accessible requires a calling Java class, which is missing for
+    calls JPype 0.6 makes directly from Python; calls made while Java runs
+    this object have one.
+    """
+
+    def __init__(self, function) -> None:
+        self.function = function
+        self.result = None
+        self.error = None
+
+    def run(self) -> None:
+        try:
+            self.result = self.function()
+        except Exception as e:
+            self.error = e
+
+
+def _call_from_java(jvm: JVM, function) -> Any:
+    call = _JavaCall(function)
+    jvm.java.lang.Thread(jvm.get_proxy('java.lang.Runnable', call)).run()
+    if call.error is not None:
+        raise call.error
+    return call.result
+
+
+class _Constant:
+    """
+    Python implementation of ``scala.Function0`` which always returns the
+    same object; replaces the closures of the snapshotted program.
+    """
+
+    def __init__(self, value) -> None:
+        self.value = value
+
+    def apply(self):
+        return self.value
+
+
+def _reflect(cls) -> Any:
+    """
+    Returns the reflective interface of the given Java class. JPype 0.6
+    represents classes by Python wrappers, which provide it as
+    ``__javaclass__``; later versions provide ``java.lang.Class`` objects as
+    ``class_`` of the wrappers and return them from reflective calls.
+    """
+    if hasattr(cls, '__javaclass__'):
+        return cls.__javaclass__
+    if isinstance(cls, type):
+        return cls.class_
+    return cls
+
+
+def _declared_fields(cls) -> Dict[str, Any]:
+    fields = {}
+    for field in _reflect(cls).getDeclaredFields():
+        field.setAccessible(True)
+        fields[str(field.getName())] = field
+    return fields
+
+
+class _Fields:
+    """
+    Reflective access to the instance fields of a Java class. Closures stored
+    in fields of type ``scala.Function0`` are not read themselves, but
+    applied, since JPype cannot represent objects of their classes.
+    """
+
+    def __init__(self, cls, closure_getter) -> None:
+        self.fields = []
+        self.descriptions = []
+        current = _reflect(cls)
+        while current is not None and current.getName() != 'java.lang.Object':
+            for field in current.getDeclaredFields():
+                if _STATIC & field.getModifiers():
+                    continue
+                field.setAccessible(True)
+                field_type = _reflect(field.getType())
+                primitive = (str(field_type.getName())
+                             if field_type.isPrimitive() else None)
+                closure = (closure_getter(field)
+                           if field_type.getName() == 'scala.Function0'
+                           else None)
+                self.fields.append((field, primitive, closure))
+                self.descriptions.append([str(current.getName()),
+                                          str(field.getName()), primitive])
+            current = current.getSuperclass()
+
+
+class ProgramSnapshots:
+    """
+    Directory of snapshots of the builtin Silver programs, one per variant
+    (e.g. with and without SIF support).
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = os.path.join(directory, 'preamble')
+
+    def _path(self, variant: str, key: str) -> str:
+        return os.path.join(self.directory, variant + '-' + key + _SUFFIX)
+
+    def load(self, jvm: JVM, variant: str, resources: List[str]) -> Any:
+        """
+        Returns the program stored for the given variant and resource files,
+        or None if there is no such snapshot or it cannot be loaded.
+        """
+        key = snapshot_key(resources)
+        if key is None:
+            return None
+        try:
+            with open(self._path(variant, key), 'r') as file:
+                snapshot = json.load(file)
+        except (OSError, ValueError):
+            return None
+        try:
+            return _call_from_java(jvm, _SnapshotReader(jvm, snapshot).read)
+        except Exception as e:
+            logger.warning('Could not load snapshot of the %s Silver program: '
+                           '%s', variant, e)
+            return None
+
+    def store(self, jvm: JVM, variant: str, resources: List[str],
+              program: Any) -> None:
+        """
+        Stores a snapshot of the given program, which has just been parsed
+        from the given resource files, and removes older snapshots of the
+        same variant.
+        """
+        key = snapshot_key(resources)
+        if key is None:
+            return
+        try:
+            writer = _SnapshotWriter(jvm)
+            snapshot = _call_from_java(jvm, lambda: writer.write(program))
+        except Exception as e:
+            logger.warning('Could not create snapshot of the %s Silver '
+                           'program: %s', variant, e)
+            return
+        path = self._path(variant, key)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = path + '.' + str(os.getpid()) + '.tmp'
+            with open(tmp_path, 'w') as file:
+                json.dump(snapshot, file, separators=(',', ':'))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning('Could not write snapshot of the %s Silver '
+                           'program: %s', variant, e)
+            return
+        for name in os.listdir(self.directory):
+            old_path = os.path.join(self.directory, name)
+            if name.startswith(variant + '-') and old_path != path:
+                try:
+                    os.remove(old_path)
+                except OSError:
+                    pass
+
+
+class _SnapshotWriter:
+    """Records the object graph reachable from a Java object."""
+
+    def __init__(self, jvm: JVM) -> None:
+        self.jvm = jvm
+        self.indexes = jvm.java.util.IdentityHashMap()
+        self.strings = {}
+        self.entries = []
+        self.pending = []
+        self.classes = []
+        self.class_indexes = {}
+        self.kinds = {}
+        self.function0 = JClass('scala.Function0')
+        self.path = JClass('java.nio.file.Path')
+        self.arguments = JArray(jvm.java.lang.Object)
+        self.handles = jvm.java.lang.invoke.MethodHandles
+        self.lookup = self.handles.publicLookup()
+        self.apply = self.lookup.findVirtual(
+            self.function0, 'apply',
+            jvm.java.lang.invoke.MethodType.methodType(jvm.java.lang.Object))
+
+    def write(self, root: Any) -> Dict[str, Any]:
+        root_index = self._reference(root)
+        while self.pending:
+            index, obj = self.pending.pop()
+            self.entries[index] = self._entry(obj)
+        return {
+            'version': SNAPSHOT_FORMAT_VERSION,
+            'classes': [[name, fields.descriptions]
+                        for name, fields in self.classes],
+            'objects': self.entries,
+            'root': root_index,
+        }
+
+    def _reference(self, obj: Any) -> Optional[int]:
+        if obj is None:
+            return None
+        if type(obj).__name__ == 'java.lang.String':
+            obj = str(obj)
+        if isinstance(obj, str):
+            if obj not in self.strings:
+                self.strings[obj] = len(self.entries)
+                self.entries.append([_STRING, obj])
+            return self.strings[obj]
+        index = self.indexes.get(obj)
+        if index is not None:
+            return index if isinstance(index, int) else index.intValue()
+        index = len(self.entries)
+        self.indexes.put(obj, self.jvm.java.lang.Integer(index))
+        self.entries.append(None)
+        self.pending.append((index, obj))
+        return index
+
+    def _kind(self, obj: Any) -> Tuple[str, Any]:
+        cls = type(obj)
+        name = cls.__name__
+        if name in self.kinds:
+            return self.kinds[name]
+        if name == 'java.math.BigInteger':
+            kind = (_BIG_INTEGER, None)
+        elif isinstance(obj, self.path):
+            kind = (_PATH, None)
+        elif name.endswith('[]'):
+            component = name[:-2]
+            if component.endswith('[]') or component in _PRIMITIVE_ACCESSORS:
+                raise ValueError('unsupported array type ' + name)
+            kind = (_ARRAY, component)
+        elif isinstance(obj, self.function0):
+            kind = (_FUNCTION0, None)
+        elif 'MODULE$' in _declared_fields(cls):
+            kind = (_MODULE, name)
+        elif name.startswith(_PLATFORM_PACKAGES):
+            raise ValueError('unsupported class ' + name)
+        else:
+            self.class_indexes[name] = len(self.classes)
+            self.classes.append((name, _Fields(cls, self._closure_getter)))
+            kind = (_OBJECT, self.class_indexes[name])
+        self.kinds[name] = kind
+        return kind
+
+    def _closure_getter(self, field) -> Any:
+        """
+        Returns a method handle which reads the given field of an object and
+        applies the closure stored in it.
+        """
+        return self.handles.filterReturnValue(
+            self.lookup.unreflectGetter(field), self.apply)
+
+    def _entry(self, obj: Any) -> List[Any]:
+        kind, data = self._kind(obj)
+        if kind in (_BIG_INTEGER, _PATH):
+            return [kind, str(obj.toString())]
+        if kind == _MODULE:
+            return [_MODULE, data]
+        if kind == _FUNCTION0:
+            return [_FUNCTION0, self._reference(obj.apply())]
+        if kind == _ARRAY:
+            elements = list(obj[0:len(obj)])
+            return [_ARRAY, data, [self._reference(e) for e in elements]]
+        values = []
+        for field, primitive, closure in self.classes[data][1].fields:
+            if primitive:
+                getter = getattr(field, 'get' + _PRIMITIVE_ACCESSORS[primitive])
+                values.append(getter(obj))
+            elif closure:
+                result = closure.invokeWithArguments(self.arguments([obj]))
+                index = len(self.entries)
+                self.entries.append(None)
+                self.entries[index] = [_FUNCTION0, self._reference(result)]
+                values.append(index)
+            else:
+                values.append(self._reference(field.get(obj)))
+        return [_OBJECT, data, values]
+
+
+class _SnapshotReader:
+    """Recreates the object graph recorded by a ``_SnapshotWriter``."""
+
+    def __init__(self, jvm: JVM, snapshot: Dict[str, Any]) -> None:
+        if snapshot.get('version') != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError('unsupported snapshot format')
+        self.jvm = jvm
+        self.snapshot = snapshot
+        self.allocate = None
+        self.new_array = jvm.java.lang.reflect.Array.newInstance
+        self.java_classes = {}
+        self.class_fields = {}
+        self.classes = []
+        self.instances = []
+
+    def _class(self, name: str) -> Any:
+        if name not in self.java_classes:
+            self.java_classes[name] = JClass(name)
+        return self.java_classes[name]
+
+    def _class_fields(self, description: List[Any]):
+        name, field_descriptions = description
+        fields = []
+        for declaring_class, field_name, primitive in field_descriptions:
+            if declaring_class not in self.class_fields:
+                self.class_fields[declaring_class] = _declared_fields(
+                    self._class(declaring_class))
+            field = self.class_fields[declaring_class][field_name]
+            setter = (getattr(field, 'set' + _PRIMITIVE_ACCESSORS[primitive])
+                      if primitive else field.set)
+            fields.append((setter, primitive))
+        return self._class(name), fields
+
+    def read(self) -> Any:
+        unsafe_field = _declared_fields(JClass('sun.misc.Unsafe'))['theUnsafe']
+        self.allocate = unsafe_field.get(None).allocateInstance
+        self.classes = [self._class_fields(description)
+                        for description in self.snapshot['classes']]
+        entries = self.snapshot['objects']
+        self.instances = [self._create(entry) for entry in entries]
+        for index, entry in enumerate(entries):
+            if entry[0] == _FUNCTION0:
+                value = self.instances[entry[1]]
+                self.instances[index] = self.jvm.get_proxy('scala.Function0',
+                                                           _Constant(value))
+        for instance, entry in zip(self.instances, entries):
+            self._fill(instance, entry)
+        return self.instances[self.snapshot['root']]
+
+    def _create(self, entry: List[Any]) -> Any:
+        """
+        Creates the object described by the given entry; the fields of
+        objects and the elements of arrays are set later.
+        """
+        kind = entry[0]
+        if kind == _OBJECT:
+            return self.allocate(self.classes[entry[1]][0])
+        if kind == _ARRAY:
+            return self.new_array(self._class(entry[1]), len(entry[2]))
+        if kind == _STRING:
+            return entry[1]
+        if kind == _BIG_INTEGER:
+            return self.jvm.java.math.BigInteger(entry[1])
+        if kind == _PATH:
+            return self.jvm.java.nio.file.Paths.get(entry[1], [])
+        if kind == _MODULE:
+            return getattr(self._class(entry[1]), 'MODULE$')
+        if kind == _FUNCTION0:
+            # Created once the object it returns exists.
+            return None
+        raise ValueError('unsupported snapshot entry ' + kind)
+
+    def _fill(self, instance: Any, entry: List[Any]) -> None:
+        instances = self.instances
+        if entry[0] == _OBJECT:
+            for (setter, primitive), value in zip(self.classes[entry[1]][1],
+                                                  entry[2]):
+                if primitive:
+                    # Fields of fresh objects are zero already.
+                    if value:
+                        setter(instance, value)
+                elif value is not None:
+                    setter(instance, instances[value])
+        elif entry[0] == _ARRAY:
+            for position, value in enumerate(entry[2]):
+                if value is not None:
+                    instance[position] = instances[value]
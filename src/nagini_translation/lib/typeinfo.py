@@ -4,22 +4,98 @@ License, v. 2.0. If a copy of the MPL was not distributed with this
 file, You can obtain one at http://mozilla.org/MPL/2.0/.
 """
 
+import atexit
 import logging
 import mypy.build
 import os
+import re
+import shutil
+import sys
+import tempfile
 
+from collections import OrderedDict
 from mypy.build import BuildSource
 from nagini_translation.lib import config
 from nagini_translation.lib.constants import IGNORED_IMPORTS, LITERALS
 from nagini_translation.lib.util import (
     construct_lambda_prefix,
 )
-from typing import List, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
 
 
 logger = logging.getLogger('nagini_translation.lib.typeinfo')
 
 
+# Errors which are only reported when checking with strict optional types,
+# and which disappear when checking without. If all errors of the strict
+# check are of this kind, the non-strict check can be skipped.
+OPTIONAL_ERROR_PATTERNS = [re.compile(pattern) for pattern in [
+    r'Item "None" of ".*" has no attribute ".*"$',
+    r'"None" has no attribute ".*"$',
+    r'has incompatible type "?None"?; expected ".*"$',
+    r'has incompatible type "Optional\[(?P<t>.*)\]"; expected "(?P=t)"$',
+    r'\(expression has type "?None"?, variable has type ".*"\)$',
+    r'\(expression has type "Optional\[(?P<t>.*)\]", '
+    r'variable has type "(?P=t)"\)$',
+    r'Incompatible return value type \(got "?None"?, expected ".*"\)$',
+    r'Incompatible return value type \(got "Optional\[(?P<t>.*)\]", '
+    r'expected "(?P=t)"\)$',
+]]
+
+
+def is_optional_error(message: str) -> bool:
+    """
+    Checks if the given mypy message is only reported because of strict
+    optional checking (or is not an error at all).
+    """
+    if ': error: ' not in message:
+        return True
+    return any(pattern.search(message) for pattern in OPTIONAL_ERROR_PATTERNS)
+
+
+def _file_stamp(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+_mypy_cache_dir = None
+
+_incremental = False
+
+
+def enable_incremental_checks() -> None:
+    """
+    Makes mypy use its incremental cache for all following checks in this
+    process, s.t. modules which did not change since an earlier check (e.g.
+    the contracts library) are not checked again, and keeps the results of
+    recent checks, s.t. checking an unchanged file again does not run mypy
+    at all. The cache only lives as long as the process (see
+    ``_get_mypy_cache_dir``), so this only pays off in long-running
+    processes like the verification server; a single check would just write
+    cache files nobody reads.
+    """
+    global _incremental
+    _incremental = True
+
+
+def _get_mypy_cache_dir() -> str:
+    """
+    Returns the directory used for mypy's incremental cache. Modules mypy
+    loads from there are not type checked again, so the types inside of them
+    are only known from an earlier check in the same process; therefore,
+    every process uses its own directory, which is removed when the process
+    exits.
+    """
+    global _mypy_cache_dir
+    if _mypy_cache_dir is None:
+        _mypy_cache_dir = tempfile.mkdtemp(prefix='nagini-mypy-')
+        atexit.register(shutil.rmtree, _mypy_cache_dir, True)
+    return _mypy_cache_dir
+
+
 def col(node) -> Optional[int]:
     """
     Returns the column in a mypy mypy AST node, if any.
@@ -34,11 +110,101 @@ class TypeException(Exception):
         self.messages = messages
 
 
+class TypeScope:
+    """
+    A node in the tree of scopes (modules, classes, functions, lambdas),
+    holding the types of the names declared directly in this scope.
+    """
+
+    __slots__ = ('name', 'parent', 'children', 'types', 'alt_types', 'chain')
+
+    def __init__(self, name: Optional[str], parent: Optional['TypeScope']):
+        self.name = name
+        self.parent = parent
+        self.children = {}
+        self.types = {}
+        self.alt_types = {}
+        # This scope and all enclosing ones, innermost first.
+        self.chain = (self,) + parent.chain if parent else (self,)
+
+    def find(self, path: Sequence[str]) -> Tuple['TypeScope', int]:
+        """
+        Returns the innermost existing scope along the given path, and the
+        number of path elements it corresponds to.
+        """
+        scope = self
+        depth = 0
+        for name in path:
+            child = scope.children.get(name)
+            if child is None:
+                break
+            scope = child
+            depth += 1
+        return scope, depth
+
+    def get_scope(self, path: Sequence[str]) -> 'TypeScope':
+        """
+        Returns the scope for the given path, creating it if necessary.
+        """
+        scope, depth = self.find(path)
+        for name in path[depth:]:
+            name = sys.intern(name)
+            child = TypeScope(name, scope)
+            scope.children[name] = child
+            scope = child
+        return scope
+
+    def get(self, fqn: Sequence[str]):
+        """
+        Returns the type stored for exactly the given fully qualified name.
+        """
+        scope, depth = self.find(fqn[:-1])
+        if depth == len(fqn) - 1:
+            return scope.types.get(fqn[-1])
+        return None
+
+    def merge(self, other: 'TypeScope') -> None:
+        """
+        Adds all entries of the given scope tree to this one, overwriting
+        existing ones.
+        """
+        self.types.update(other.types)
+        self.alt_types.update(other.alt_types)
+        for name, child in other.children.items():
+            own_child = self.children.get(name)
+            if own_child is None:
+                own_child = TypeScope(name, self)
+                self.children[name] = own_child
+            own_child.merge(child)
+
+    def statistics(self) -> Tuple[int, int, int]:
+        """
+        Returns the number of scopes and entries in this tree, and an
+        estimate of the memory they take up in bytes.
+        """
+        scopes = 0
+        entries = 0
+        size = 0
+        to_visit = [self]
+        while to_visit:
+            scope = to_visit.pop()
+            scopes += 1
+            entries += len(scope.types)
+            size += (sys.getsizeof(scope) + sys.getsizeof(scope.children) +
+                     sys.getsizeof(scope.types) +
+                     sys.getsizeof(scope.alt_types) +
+                     sys.getsizeof(scope.chain))
+            for alts in scope.alt_types.values():
+                entries += len(alts)
+                size += sys.getsizeof(alts)
+            to_visit.extend(scope.children.values())
+        return scopes, entries, size
+
+
 class TypeVisitor(mypy.traverser.TraverserVisitor):
     def __init__(self, type_map, path, ignored_lines):
         self.prefix = []
-        self.all_types = {}
-        self.alt_types = {}
+        self.scopes = TypeScope(None, None)
         self.type_map = type_map
         self.path = path
         self.ignored_lines = ignored_lines
@@ -165,15 +331,16 @@ class TypeVisitor(mypy.traverser.TraverserVisitor):
                 error = ' error: Encountered Any type. Type annotation missing?'
                 msg = ':'.join([self.path, str(line), error])
                 raise TypeException([msg])
-        key = tuple(fqn)
-        if key in self.all_types:
-            if not self.type_equals(self.all_types[key], type):
+        scope = self.scopes.get_scope(fqn[:-1])
+        name = fqn[-1]
+        if name in scope.types:
+            if not self.type_equals(scope.types[name], type):
                 # Type change after isinstance
-                if key not in self.alt_types:
-                    self.alt_types[key] = {}
-                self.alt_types[key][(line, col)] = type
+                if name not in scope.alt_types:
+                    scope.alt_types[name] = {}
+                scope.alt_types[name][(line, col)] = type
                 return
-        self.all_types[key] = type
+        scope.types[sys.intern(name)] = type
 
     def type_equals(self, t1, t2):
         if str(t1) == str(t2):
@@ -202,9 +369,8 @@ class TypeVisitor(mypy.traverser.TraverserVisitor):
             if node.type:
                 return node.type
         if isinstance(node, mypy.nodes.NameExpr):
-            key = (node.name,)
-            if key in self.all_types:
-                return self.all_types[key]
+            if node.name in self.scopes.types:
+                return self.scopes.types[node.name]
         elif isinstance(node, mypy.nodes.CallExpr):
             if node.callee.name == 'Result':
                 key = tuple(self.prefix)
@@ -212,7 +378,7 @@ class TypeVisitor(mypy.traverser.TraverserVisitor):
                     if key[i].startswith('lambda'):
                         key = key[:i]
                         break
-                type = self.all_types[key]
+                type = self.scopes.get(key)
                 return type
         if node in self.type_map:
             result = self.type_map[node]
@@ -231,6 +397,90 @@ class TypeVisitor(mypy.traverser.TraverserVisitor):
             super().visit_comparison_expr(o)
 
 
+class ModuleTypes:
+    """
+    Type information collected for a single module.
+    """
+
+    def __init__(self, name: str, path: str, visitor: TypeVisitor) -> None:
+        self.name = name
+        self.path = path
+        self.stamp = _file_stamp(path)
+        self.scopes = visitor.scopes
+        self.type_aliases = visitor.type_aliases
+        self.type_vars = visitor.type_vars
+
+
+class CheckResult:
+    """
+    The type information of all modules a checked file (transitively)
+    imports, together with the state of the files it was collected from.
+    """
+
+    def __init__(self, modules: List[ModuleTypes],
+                 strict_optional: bool) -> None:
+        self.modules = modules
+        self.strict_optional = strict_optional
+
+    def is_current(self) -> bool:
+        return all(_file_stamp(module.path) == module.stamp
+                   for module in self.modules)
+
+
+# Type information of the modules used by the stored check results, used for
+# modules mypy does not check again because they did not change.
+_module_types = {}  # type: Dict[str, ModuleTypes]
+
+# Results of the most recent checks, keyed by the path of the checked file,
+# least recently used first. Only used with incremental checks enabled.
+_check_results = OrderedDict()  # type: Dict[str, CheckResult]
+
+# Maximum number of stored check results. Every result keeps the type scopes
+# (and the mypy types they reference) of all modules the file imports.
+_MAX_CHECK_RESULTS = 32
+
+
+def _lookup_check(key: str) -> Optional[CheckResult]:
+    """
+    Returns the stored result of checking the given file, if none of the
+    files it was collected from changed since.
+    """
+    result = _check_results.get(key)
+    if result is None:
+        return None
+    if not result.is_current():
+        del _check_results[key]
+        _prune_module_types()
+        return None
+    _check_results.move_to_end(key)
+    return result
+
+
+def _store_check(key: str, result: CheckResult) -> None:
+    """
+    Stores the result of checking the given file, evicting results which are
+    no longer current and the least recently used ones beyond the maximum.
+    """
+    _check_results[key] = result
+    _check_results.move_to_end(key)
+    for stale in [k for k, r in _check_results.items() if not r.is_current()]:
+        del _check_results[stale]
+    while len(_check_results) > _MAX_CHECK_RESULTS:
+        _check_results.popitem(last=False)
+    _prune_module_types()
+
+
+def _prune_module_types() -> None:
+    """
+    Drops the type information of all modules no stored check result uses.
+    """
+    used = {id(module) for result in _check_results.values()
+            for module in result.modules}
+    for name in [name for name, module in _module_types.items()
+                 if id(module) not in used]:
+        del _module_types[name]
+
+
 class TypeInfo:
     """
     Provides type information for all variables and functions in a given
@@ -238,13 +488,12 @@ class TypeInfo:
     """
 
     def __init__(self):
-        self.all_types = {}
-        self.alt_types = {}
+        self.scopes = TypeScope(None, None)
         self.files = {}
         self.type_aliases = {}
         self.type_vars = {}
 
-    def _create_options(self, strict_optional: bool):
+    def _create_options(self, strict_optional: bool, incremental: bool):
         """
         Creates an Options object for mypy and activates strict optional typing
         based on the given argument.
@@ -259,8 +508,48 @@ class TypeInfo:
         # enable it like this
         mypy.experiments.STRICT_OPTIONAL = strict_optional
         result.fast_parser = True
+        if incremental:
+            result.incremental = True
+            result.cache_dir = os.path.join(
+                _get_mypy_cache_dir(),
+                'strict' if strict_optional else 'non_strict')
         return result
 
+    def _build(self, filename: str, strict_optional: bool,
+               incremental: bool = None) -> mypy.build.BuildResult:
+        if incremental is None:
+            incremental = _incremental
+        options = self._create_options(strict_optional, incremental)
+        return mypy.build.build([BuildSource(filename, None, None)], options,
+                                bin_dir=config.mypy_dir)
+
+    def _collect_types(self, result: mypy.build.BuildResult
+                       ) -> Optional[List[ModuleTypes]]:
+        """
+        Collects the type information of all modules in the given build
+        result. Returns None if a module was loaded from mypy's cache and its
+        type information is not known from an earlier check.
+        """
+        modules = []
+        for name, file in result.files.items():
+            if name in IGNORED_IMPORTS:
+                continue
+            if not file.defs:
+                # Modules loaded from the cache have no definitions.
+                previous = _module_types.get(name)
+                if (previous and previous.path == file.path and
+                        previous.stamp == _file_stamp(file.path)):
+                    modules.append(previous)
+                    continue
+                stamp = _file_stamp(file.path)
+                if stamp is None or stamp[1] > 0:
+                    return None
+            visitor = TypeVisitor(result.types, name, file.ignored_lines)
+            visitor.prefix = name.split('.')
+            file.accept(visitor)
+            modules.append(ModuleTypes(name, file.path, visitor))
+        return modules
+
     def check(self, filename: str) -> bool:
         """
         Typechecks the given file and collects all type information needed for
@@ -272,38 +561,48 @@ class TypeInfo:
                 logger.info(error)
             raise TypeException(errors)
 
+        key = os.path.abspath(filename)
+        previous = _lookup_check(key) if _incremental else None
+        if previous:
+            mypy.experiments.STRICT_OPTIONAL = previous.strict_optional
+            self._add_modules(previous.modules)
+            return True
+
         try:
-            options_strict = self._create_options(True)
-            res_strict = mypy.build.build(
-                [BuildSource(filename, None, None)],
-                options_strict, bin_dir=config.mypy_dir
-                )
+            res_strict = self._build(filename, True)
 
-            if res_strict.errors:
+            if not all(is_optional_error(e) for e in res_strict.errors):
                 # Run mypy a second time with strict optional checking disabled,
                 # s.t. we don't get overapproximated none-related errors.
-                options_non_strict = self._create_options(False)
-                res_non_strict = mypy.build.build(
-                    [BuildSource(filename, None, None)],
-                    options_non_strict, bin_dir=config.mypy_dir
-                )
+                res_non_strict = self._build(filename, False)
                 if res_non_strict.errors:
                     report_errors(res_non_strict.errors)
-            for name, file in res_strict.files.items():
-                if name in IGNORED_IMPORTS:
-                    continue
-                self.files[name] = file.path
-                visitor = TypeVisitor(res_strict.types, name,
-                                      file.ignored_lines)
-                visitor.prefix = name.split('.')
-                file.accept(visitor)
-                self.all_types.update(visitor.all_types)
-                self.alt_types.update(visitor.alt_types)
-                self.type_aliases.update(visitor.type_aliases)
-                self.type_vars.update(visitor.type_vars)
-            return True
+            # Types are collected with strict optional checking only if there
+            # were no none-related errors.
+            strict_optional = not res_strict.errors
+            mypy.experiments.STRICT_OPTIONAL = strict_optional
+            modules = self._collect_types(res_strict)
+            if modules is None:
+                # Some unchanged modules were never checked in this process,
+                # check everything from scratch.
+                res_strict = self._build(filename, True, incremental=False)
+                mypy.experiments.STRICT_OPTIONAL = strict_optional
+                modules = self._collect_types(res_strict)
         except mypy.errors.CompileError as e:
             report_errors(e.messages)
+        if _incremental:
+            for module in modules:
+                _module_types[module.name] = module
+            _store_check(key, CheckResult(modules, strict_optional))
+        self._add_modules(modules)
+        return True
+
+    def _add_modules(self, modules: List[ModuleTypes]) -> None:
+        for module in modules:
+            self.files[module.name] = module.path
+            self.scopes.merge(module.scopes)
+            self.type_aliases.update(module.type_aliases)
+            self.type_vars.update(module.type_vars)
 
     def get_type_prefix(self, name: str) -> str:
         name = os.path.abspath(name)
@@ -318,31 +617,39 @@ class TypeInfo:
         Looks up the inferred or annotated type for the given name in the given
         prefix
         """
-        key = tuple(prefix + [name])
-        result = self.all_types.get(key)
-        alts = self.alt_types.get(key)
-        if result is None:
-            if not prefix:
-                return None, None
-            else:
-                return self.get_type(prefix[:len(prefix) - 1], name)
-        else:
-            return result, alts
+        scope, _ = self.scopes.find(prefix)
+        for current in scope.chain:
+            result = current.types.get(name)
+            if result is not None:
+                return result, current.alt_types.get(name)
+        return None, None
 
     def get_func_type(self, prefix: List[str]):
         """
         Looks up the type of the function which creates the given context
         """
-        result = self.all_types.get(tuple(prefix))
+        scope, depth = self.scopes.find(prefix)
+        result = None
+        if depth < len(prefix):
+            result = scope.types.get(prefix[depth])
         if result is None:
-            if len(prefix) == 0:
-                return None
-            else:
-                return self.get_func_type(prefix[:len(prefix) - 1])
-        else:
-            if isinstance(result, mypy.types.FunctionLike):
-                result = result.ret_type
-            return result
+            for current in scope.chain:
+                if current.parent is None:
+                    break
+                result = current.parent.types.get(current.name)
+                if result is not None:
+                    break
+        if isinstance(result, mypy.types.FunctionLike):
+            result = result.ret_type
+        return result
+
+    def statistics(self) -> str:
+        """
+        Returns a description of the size of the type table.
+        """
+        scopes, entries, size = self.scopes.statistics()
+        return ('Type table: {} entries in {} scopes, approx. {:.1f} KiB.'
+                .format(entries, scopes, size / 1024))
 
     def is_normal_type(self, type: mypy.types.Type) -> bool:
         return isinstance(type, mypy.nodes.TypeInfo)
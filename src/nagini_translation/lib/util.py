@@ -6,7 +6,9 @@ file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
 import ast
 import astunparse
+import threading
 
+from bisect import bisect_right
 from typing import (
     Any,
     Callable,
@@ -124,6 +126,41 @@ def get_column(node: ast.AST) -> Optional[int]:
     return node.col_offset if hasattr(node, 'col_offset') else None
 
 
+# Nodes which may be shared between several places in a tree and are
+# therefore not numbered.
+_SHARED_NODES = (ast.expr_context, ast.boolop, ast.operator, ast.unaryop,
+                 ast.cmpop)
+
+_next_node_number = 0
+
+_node_numbers_lock = threading.Lock()
+
+
+def number_nodes(tree: ast.AST) -> None:
+    """
+    Numbers the nodes of the given tree in pre-order and records for every
+    node the interval [_first, _last] of the numbers in its subtree, s.t.
+    containment can be checked by comparing two numbers. Numbers are unique
+    across all trees numbered in this process.
+    """
+    global _next_node_number
+    with _node_numbers_lock:
+        number = _next_node_number
+        stack = [(tree, False)]
+        while stack:
+            node, visited = stack.pop()
+            if visited:
+                node._last = number - 1
+                continue
+            node._first = number
+            number += 1
+            stack.append((node, True))
+            children = [child for child in ast.iter_child_nodes(node)
+                        if not isinstance(child, _SHARED_NODES)]
+            stack.extend((child, False) for child in reversed(children))
+        _next_node_number = number
+
+
 def contains_stmt(container: Any, contained: ast.AST) -> bool:
     """
     Checks if 'contained' is a part of the partial AST
@@ -137,6 +174,8 @@ def contains_stmt(container: Any, contained: ast.AST) -> bool:
                 return True
         return False
     elif isinstance(container, ast.AST):
+        if hasattr(container, '_first') and hasattr(contained, '_first'):
+            return container._first <= contained._first <= container._last
         for field in container._fields:
             if contains_stmt(getattr(container, field), contained):
                 return True
@@ -145,11 +184,84 @@ def contains_stmt(container: Any, contained: ast.AST) -> bool:
         return False
 
 
+class TryBlockList(list):
+    """
+    List of the try blocks of a statement container. Computes the nesting of
+    the blocks once, s.t. the blocks protecting a statement can be found
+    without comparing all pairs of blocks.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._nesting = None
+
+    def append(self, block: 'PythonTryBlock') -> None:
+        self._nesting = None
+        super().append(block)
+
+    def _compute_nesting(self) -> Optional[Tuple]:
+        """
+        Returns the blocks sorted by the start of their protected regions,
+        the starts and ends of the regions and the index of the closest
+        enclosing block of every block (-1 if there is none), or None if
+        some regions are not numbered.
+        """
+        regions = []
+        for block in self:
+            region = block.protected_region
+            if not (region and hasattr(region[0], '_first') and
+                    hasattr(region[-1], '_last')):
+                return None
+            regions.append((region[0]._first, region[-1]._last, block))
+        regions.sort(key=lambda r: r[0])
+        starts = [start for start, _, _ in regions]
+        ends = [end for _, end, _ in regions]
+        blocks = [block for _, _, block in regions]
+        parents = []
+        open_regions = []
+        for index, (start, _, _) in enumerate(regions):
+            while open_regions and ends[open_regions[-1]] < start:
+                open_regions.pop()
+            parents.append(open_regions[-1] if open_regions else -1)
+            open_regions.append(index)
+        return blocks, starts, ends, parents
+
+    def surrounding(self, stmt: ast.AST) -> Optional[List['PythonTryBlock']]:
+        """
+        Returns the blocks protecting the given statement from the innermost
+        to the outermost, or None if the statement or some regions are not
+        numbered.
+        """
+        if not hasattr(stmt, '_first'):
+            return None
+        if self._nesting is None:
+            self._nesting = self._compute_nesting() or ()
+        if not self._nesting:
+            return None
+        blocks, starts, ends, parents = self._nesting
+        position = stmt._first
+        # The regions are nested, so the innermost region containing the
+        # statement is the one starting last before it or one of its
+        # enclosing regions.
+        index = bisect_right(starts, position) - 1
+        while index >= 0 and ends[index] < position:
+            index = parents[index]
+        result = []
+        while index >= 0:
+            result.append(blocks[index])
+            index = parents[index]
+        return result
+
+
 def get_surrounding_try_blocks(try_blocks: List['PythonTryBlock'],
                                stmt: ast.AST) -> List['PythonTryBlock']:
     """
     Finds the try blocks in try_blocks that protect the statement stmt.
     """
+    if isinstance(try_blocks, TryBlockList):
+        result = try_blocks.surrounding(stmt)
+        if result is not None:
+            return result
     def rank(b: 'PythonTryBlock', blocks: List['PythonTryBlock']) -> int:
         result = 0
         for b2 in blocks:
@@ -256,7 +368,47 @@ def find_loop_for_previous(node: ast.AST, name: str) -> ast.For:
     return find_loop_for_previous(node._parent, name)
 
 
+# Kinds of nodes for which the closest enclosing node is recorded for every
+# node visited by the analyzer, see ``set_parent``.
+ENCLOSING_KINDS = [
+    ast.Call,
+    ast.arg,
+    ast.FunctionDef,
+    ast.ExceptHandler,
+    (ast.While, ast.For),
+    ast.Try,
+]
+
+_ENCLOSING_INDICES = {kind: index for index, kind in enumerate(ENCLOSING_KINDS)}
+
+_NO_ENCLOSING = (None,) * len(ENCLOSING_KINDS)
+
+
+def set_parent(node: ast.AST, parent: Optional[ast.AST]) -> None:
+    """
+    Sets the parent of the given node and records the closest enclosing node
+    of every kind in ENCLOSING_KINDS for it, which is derived from the
+    information already recorded for the parent. Parents must therefore be
+    set top-down.
+    """
+    node._parent = parent
+    if parent is None or isinstance(parent, ast.Module):
+        node._enclosing = _NO_ENCLOSING
+        return
+    enclosing = parent._enclosing
+    node._enclosing = tuple(parent if isinstance(parent, kind)
+                            else enclosing[index]
+                            for index, kind in enumerate(ENCLOSING_KINDS))
+
+
 def get_parent_of_type(node: ast.AST, typ: type) -> ast.AST:
+    """
+    Returns the closest parent node of 'node' that is of the given type, or
+    None if there is no such node below the module.
+    """
+    index = _ENCLOSING_INDICES.get(typ)
+    if index is not None and hasattr(node, '_enclosing'):
+        return node._enclosing[index]
     parent = node._parent
     while not isinstance(parent, ast.Module):
         if isinstance(parent, typ):
@@ -341,6 +493,8 @@ def get_containing_member(node: ast.AST) -> Optional[ast.FunctionDef]:
     """
     Returns the function this node belongs to, if any.
     """
+    if not isinstance(node, ast.FunctionDef) and hasattr(node, '_enclosing'):
+        return get_parent_of_type(node, ast.FunctionDef)
     member = node
     while not isinstance(member, ast.FunctionDef) and member is not None:
         if hasattr(member, '_parent'):
@@ -6,7 +6,136 @@ file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
 import copy
 
-from typing import Dict, List, Set, Tuple
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+
+# Fields of a module that contain its members, in the order in which they are
+# searched for a name.
+MODULE_MEMBER_FIELDS = ['classes', 'functions', 'global_vars', 'methods',
+                        'predicates', 'io_operations', 'namespaces']
+
+# Marks names that are not contained in a symbol table.
+_MISSING = object()
+
+
+def flatten_members(dicts: Iterable[Any]) -> Dict:
+    """
+    Returns a dict that maps every name in the given dicts to its value in the
+    first of them that contains it.
+    """
+    result = {}
+    for d in dicts:
+        for name, member in d.items():
+            if name not in result:
+                result[name] = member
+    return result
+
+
+class MemberSource:
+    """
+    Mixin for member dicts that notifies the symbol tables built from them
+    (the listeners) when a member changes. Listeners implement
+    ``member_changed(name)``, which updates the entry for the given name, and
+    ``invalidate()``, which drops the whole table.
+    """
+
+    def add_listener(self, listener: Any) -> None:
+        self.listeners[id(listener)] = listener
+
+    def notify_changed(self, name: str) -> None:
+        for listener in list(self.listeners.values()):
+            listener.member_changed(name)
+
+    def invalidate_listeners(self) -> None:
+        for listener in list(self.listeners.values()):
+            listener.invalidate()
+
+
+class MemberDict(MemberSource, OrderedDict):
+    """
+    An OrderedDict containing members of a module, which updates the symbol
+    tables built from it when it is modified.
+    """
+
+    def __init__(self, *args, **kwargs):
+        # Listeners are keyed by identity, since modules define equality.
+        self.listeners = OrderedDict()
+        super().__init__(*args, **kwargs)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.notify_changed(key)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.notify_changed(key)
+
+    def pop(self, key, *default):
+        contained = key in self
+        result = super().pop(key, *default)
+        if contained:
+            self.notify_changed(key)
+        return result
+
+    def popitem(self, last=True):
+        key, value = super().popitem(last)
+        self.notify_changed(key)
+        return key, value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self):
+        keys = list(self)
+        super().clear()
+        for key in keys:
+            self.notify_changed(key)
+
+
+class IncludedMembers:
+    """
+    The members of a module together with those of all modules it includes,
+    materialized into a single dict so that a name is found with one lookup.
+    Like the symbol table of a single module, the dict is updated per member
+    when one of the included modules changes, and dropped when one of them
+    gets a new import.
+    """
+
+    def __init__(self, module: 'PythonModule'):
+        self.module = module
+        self._dict = None
+        self._dicts = None
+
+    def get(self) -> Dict:
+        if self._dict is None:
+            modules = self.module.get_included_modules(include_global=False)
+            dicts = [getattr(module, field) for module in modules
+                     for field in MODULE_MEMBER_FIELDS]
+            self._dict = flatten_members(dicts)
+            self._dicts = dicts
+            for d in dicts:
+                d.add_listener(self)
+        return self._dict
+
+    def member_changed(self, name: str) -> None:
+        if self._dict is None:
+            return
+        source = next((d for d in self._dicts if name in d), None)
+        if source is not None:
+            self._dict[name] = source[name]
+        else:
+            self._dict.pop(name, None)
+
+    def invalidate(self) -> None:
+        self._dict = None
+        self._dicts = None
 
 
 class CombinedDict:
@@ -36,22 +165,12 @@ class CombinedDict:
         raise KeyError(item)
 
     def __contains__(self, item):
-        return self.contains(item, None)
-
-    def contains(self, item, caller_module):
-        """
-        Checks if the given item is contained anywhere in this view, excluding anything
-        represented by ``caller_module`` (to prevent infinite recursion in case of cyclic
-        imports).
-        """
         key = item
         if self.names:
             if not key in self.names:
                 return False
             key = self.names[key]
         for d in self.dicts:
-            if d is caller_module:
-                continue
             if key in d:
                 return True
         return False
@@ -75,36 +194,111 @@ class IOOperationContentDict:
         return result
 
 
-class ModuleDictView:
+class ModuleDictView(MemberSource):
     """
     A view of the given aspect (e.g. 'functions') of the given module with the
-    given renamings.
+    given renamings. The view is materialized into a single dict the first
+    time it is used; afterwards, changed members of the included modules are
+    updated individually, and the dict is only rebuilt if an included module
+    gets a new import.
     """
     def __init__(self, names: List[Tuple[str, str]], module: 'PythonModule',
                  field: str):
-        self.names = names
+        self.names = OrderedDict()
+        # Maps imported names to the names they are available under.
+        self.as_names = {}
+        for name, as_name in names:
+            as_name = as_name if as_name else name
+            self.names[as_name] = name
+            self.as_names.setdefault(name, []).append(as_name)
         self.module = module
         self.field = field
+        self.listeners = OrderedDict()
         self._dict = None
+        self._dicts = None
+        self._building = False
 
-    def initialize(self) -> None:
+    def _get_dict(self) -> Dict:
         """
         We do this lazily because included module information may not be
         complete when we create this object.
         """
-        modules = self.module.get_included_modules((), include_global=False)
-        dicts = [getattr(m, self.field) for m in modules]
-        self._dict = CombinedDict(self.names, dicts)
+        if self._dict is not None:
+            return self._dict
+        dicts, result, complete = self._build()
+        if complete:
+            self._dict = result
+            self._dicts = dicts
+            for d in dicts:
+                d.add_listener(self)
+        return result
 
-    def __contains__(self, item):
+    def _build(self) -> Tuple[List[MemberSource], Dict, bool]:
+        """
+        Collects the members of all modules included by the viewed module.
+        Returns the dicts they were collected from, the members and whether
+        the result is complete, which it is not if a cyclic import led back to
+        another view that is currently being built.
+        """
+        self._building = True
+        complete = True
+        try:
+            modules = self.module.get_included_modules((), include_global=False)
+            dicts = []
+            for module in modules:
+                d = getattr(module, self.field)
+                if isinstance(d, ModuleDictView) and d._building:
+                    # Cyclic import; the members of the view being built are
+                    # found through the modules already being processed.
+                    complete = complete and d is self
+                    continue
+                dicts.append(d)
+            members = flatten_members(dicts)
+        finally:
+            self._building = False
+        if self.names:
+            members = {as_name: members[name]
+                       for as_name, name in self.names.items()
+                       if name in members}
+        return dicts, members, complete
+
+    def member_changed(self, name: str) -> None:
+        """
+        Updates the entries for the given name after it has been added to,
+        changed in or removed from one of the included modules.
+        """
         if self._dict is None:
-            self.initialize()
-        return self._dict.contains(item, self)
+            return
+        source = next((d for d in self._dicts if name in d), None)
+        member = source[name] if source is not None else _MISSING
+        as_names = self.as_names.get(name, []) if self.names else [name]
+        for as_name in as_names:
+            if self._dict.get(as_name, _MISSING) is member:
+                continue
+            if member is _MISSING:
+                del self._dict[as_name]
+            else:
+                self._dict[as_name] = member
+            self.notify_changed(as_name)
 
-    def __getitem__(self, item):
+    def invalidate(self) -> None:
+        """
+        Drops the dict, and those of all tables built from it.
+        """
         if self._dict is None:
-            self.initialize()
-        return self._dict[item]
+            return
+        self._dict = None
+        self._dicts = None
+        self.invalidate_listeners()
+
+    def items(self):
+        return self._get_dict().items()
+
+    def __contains__(self, item):
+        return item in self._get_dict()
+
+    def __getitem__(self, item):
+        return self._get_dict()[item]
 
 
 class PythonModuleView:
@@ -114,6 +308,8 @@ class PythonModuleView:
     """
     def __init__(self, module: 'PythonModule', names: List[Tuple[str, str]]):
         self.module = copy.copy(module)
+        self.module.symbols = None
+        self.module.included_symbols = IncludedMembers(self.module)
         self.original_module = module
         for field in ['functions', 'methods', 'static_methods', 'namespaces',
                       'predicates', 'classes', 'global_vars', 'io_operations']:
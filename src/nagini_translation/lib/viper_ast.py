@@ -4,8 +4,10 @@ License, v. 2.0. If a copy of the MPL was not distributed with this
 file, You can obtain one at http://mozilla.org/MPL/2.0/.
 """
 
+import time
 import types
 
+from jpype import JArray
 from nagini_translation.lib.constants import FUNCTION_DOMAIN_NAME
 from nagini_translation.lib.errors import error_manager, Rules
 
@@ -69,6 +71,19 @@ class ViperAST:
         self.Perm = getconst('Perm')
         self.sourcefile = sourcefile
         self.none = getobject(scala, 'None')
+        self.nil = getobject(scala.collection.immutable, 'Nil')
+        self.empty_map = scala.collection.immutable.HashMap()
+        self._predef = getobject(scala, 'Predef')
+        self._object_tag = getobject(scala.reflect, 'ClassTag').AnyRef()
+        self._object_array = JArray(java.lang.Object)
+        # Java objects for file paths and line/column positions, reused for
+        # all positions referring to the same file or location.
+        self._paths = {}
+        self._line_columns = {}
+        self._end_positions = {}
+        # Number of positions created, and time spent creating them.
+        self.position_count = 0
+        self.position_time = 0.0
 
     def is_available(self) -> bool:
         """
@@ -89,24 +104,26 @@ class ViperAST:
 
     def append(self, list, to_append):
         if not to_append is None:
-            lsttoappend = self.singleton_seq(to_append)
-            list.append(lsttoappend)
+            getattr(list, '$plus$eq')(to_append)
 
     def to_seq(self, list):
-        result = self.scala.collection.mutable.ArraySeq(len(list))
-        for index in range(0, len(list)):
-            result.update(index, list[index])
-        return result.toList()
+        # Elements are passed to Java as a single array, which is wrapped and
+        # converted to a list on the Scala side.
+        if not list:
+            return self.nil
+        array = self._object_array(list)
+        return self._predef.wrapRefArray(array).toList()
 
     def to_list(self, seq):
-        result = []
-        iterator = seq.toIterator()
-        while iterator.hasNext():
-            result.append(iterator.next())
-        return result
+        array = seq.toArray(self._object_tag)
+        # Slicing transfers the array in one call; list() makes the result a
+        # list regardless of what the JPype version returns for slices.
+        return list(array[0:len(array)])
 
     def to_map(self, dict):
-        result = self.scala.collection.immutable.HashMap()
+        if not dict:
+            return self.empty_map
+        result = self.empty_map
         for k, v in dict.items():
             result = result.updated(k, v)
         return result
@@ -203,6 +220,7 @@ class ViperAST:
                                     self.NoTrafos)
 
     def DomainType(self, name, type_vars_map, type_vars):
+        self.used_names.add(name)
         map = self.to_map(type_vars_map)
         seq = self.to_seq(type_vars)
         return self.ast.DomainType(name, map,
@@ -210,6 +228,7 @@ class ViperAST:
 
     def DomainFuncApp(self, func_name, args, type_passed,
                       position, info, domain_name, type_var_map={}):
+        self.used_names.add(func_name)
         arg_decls = [self.LocalVarDecl('arg' + str(i), arg.typ(), arg.pos(),
                                        arg.info())
                      for i, arg in enumerate(args)]
@@ -237,6 +256,7 @@ class ViperAST:
                                    self.to_seq(targets), position, info, self.NoTrafos)
 
     def NewStmt(self, lhs, fields, position, info):
+        self.used_names.update(field.name() for field in fields)
         return self.ast.NewStmt(lhs, self.to_seq(fields), position, info, self.NoTrafos)
 
     def Label(self, name, position, info):
@@ -256,6 +276,7 @@ class ViperAST:
         return self.ast.FieldAssign(lhs, rhs, position, info, self.NoTrafos)
 
     def FieldAccess(self, receiver, field, position, info):
+        self.used_names.add(field.name())
         return self.ast.FieldAccess(receiver, field, position, info, self.NoTrafos)
 
     def FieldAccessPredicate(self, fieldacc, perm, position, info):
@@ -518,19 +539,36 @@ class ViperAST:
             # create artificial ast.Name objects which don't have it. That
             # should probably be changed.
             return self.NoPosition
+        start_time = time.perf_counter()
         if not file:
             file = str(self.sourcefile)
-        path = self.java.nio.file.Paths.get(file, [])
-        start = self.ast.LineColumnPosition(expr.lineno, expr.col_offset)
+        path = self._paths.get(file)
+        if path is None:
+            path = self.java.nio.file.Paths.get(file, [])
+            self._paths[file] = path
+        start = self._line_column(expr.lineno, expr.col_offset)
         id = error_manager.add_error_information(
-            expr, list(vias), error_string, rules)
+            expr, vias, error_string, rules)
         if hasattr(expr, 'end_lineno') and hasattr(expr, 'end_col_offset'):
-            end = self.ast.LineColumnPosition(expr.end_lineno,
-                                              expr.end_col_offset)
-            end = self.scala.Some(end)
+            key = (expr.end_lineno, expr.end_col_offset)
+            end = self._end_positions.get(key)
+            if end is None:
+                end = self.scala.Some(self._line_column(*key))
+                self._end_positions[key] = end
         else:
             end = self.none
-        return self.ast.IdentifierPosition(path, start, end, id)
+        position = self.ast.IdentifierPosition(path, start, end, id)
+        self.position_count += 1
+        self.position_time += time.perf_counter() - start_time
+        return position
+
+    def _line_column(self, line: int, column: int):
+        key = (line, column)
+        result = self._line_columns.get(key)
+        if result is None:
+            result = self.ast.LineColumnPosition(line, column)
+            self._line_columns[key] = result
+        return result
 
     def is_heap_dependent(self, expr) -> bool:
         """
@@ -23,9 +23,27 @@ from jpype import JavaException
 from nagini_translation.analyzer import Analyzer
 from nagini_translation.sif_translator import SIFTranslator
 from nagini_translation.lib import config
-from nagini_translation.lib.constants import DEFAULT_SERVER_SOCKET
+from nagini_translation.lib.cache import (
+    PartFingerprinter,
+    result_key,
+    TranslationCache,
+)
 from nagini_translation.lib.errors import error_manager
 from nagini_translation.lib.jvmaccess import JVM
+from nagini_translation.lib.profiling import (
+    ANALYSIS,
+    ARP_TRANSFORMATION,
+    CONSISTENCY_CHECK,
+    PHASES,
+    phase_timer,
+    profiler,
+    SIF_TRANSFORMATION,
+    TRANSLATION,
+    TYPE_CHECK,
+    VERIFICATION,
+)
+from nagini_translation.lib.resolver import resolution_cache
+from nagini_translation.lib.snapshot import ProgramSnapshots
 from nagini_translation.lib.typedefs import Program
 from nagini_translation.lib.typeinfo import TypeException, TypeInfo
 from nagini_translation.lib.util import (
@@ -35,20 +53,25 @@ from nagini_translation.lib.util import (
 )
 from nagini_translation.lib.viper_ast import ViperAST
 from nagini_translation.sif.lib.util import (
-    configure_mpp_transformation,
-    set_all_low_methods,
-    set_preserves_low_methods
+    SIFConfig,
+    transform_to_mpp,
 )
 from nagini_translation.sif.lib.viper_ast_extended import ViperASTExtended
 from nagini_translation.translator import Translator
+from nagini_translation.translators.program import ProgramPart
 from nagini_translation.verifier import (
-    Carbon,
+    backend_options,
+    CACHED,
     get_arp_plugin,
-    Silicon,
+    get_backend_pool,
+    INCOMPLETE_OUTCOMES,
+    MemberTiming,
+    merge_results,
     VerificationResult,
-    ViperVerifier
+    ViperVerifier,
+    Watchdog,
 )
-from typing import Set
+from typing import List, Sequence, Set
 
 
 TYPE_ERROR_PATTERN = r"^(?P<file>.*):(?P<line>\d+): error: (?P<msg>.*)$"
@@ -80,22 +103,60 @@ def parse_sil_file(sil_path: str, jvm):
 
 
 def load_sil_files(jvm: JVM, sif: bool = False):
+    """
+    Returns the builtin Silver program, loaded from its snapshot if there is
+    one for the current resources. Otherwise, the resources are parsed and
+    a snapshot is stored for later processes.
+    """
     current_path = os.path.dirname(inspect.stack()[0][1])
+    resources_paths = [os.path.join(current_path, 'resources')]
     if sif:
-        resources_path = os.path.join(current_path, 'sif', 'resources')
-    else:
-        resources_path = os.path.join(current_path, 'resources')
-    return parse_sil_file(os.path.join(resources_path, 'all.sil'), jvm)
+        # The SIF resources import the normal ones.
+        resources_paths.append(os.path.join(current_path, 'sif', 'resources'))
+    resources_path = resources_paths[-1]
+    resources = [os.path.join(path, name) for path in resources_paths
+                 for name in sorted(os.listdir(path)) if name.endswith('.sil')]
+    variant = 'sif' if sif else 'default'
+    if sil_snapshots:
+        program = sil_snapshots.load(jvm, variant, resources)
+        if program is not None:
+            return program
+    program = parse_sil_file(os.path.join(resources_path, 'all.sil'), jvm)
+    if sil_snapshots:
+        sil_snapshots.store(jvm, variant, resources, program)
+    return program
+
+
+# Parsed builtin Silver programs, separately for SIF and non-SIF translations.
+sil_programs = {}
+
+# Snapshots of the builtin Silver programs, or None if they are parsed in
+# every process; stored next to the translation cache.
+sil_snapshots = (ProgramSnapshots(config.cache_config.directory)
+                 if config.cache_config.enabled else None)
 
 
 def translate(path: str, jvm: JVM, selected: Set[str] = set(),
               sif: bool = False, arp: bool = False, ignore_global: bool = False,
-              reload_resources: bool = False, verbose: bool = False) -> Program:
+              reload_resources: bool = False, verbose: bool = False,
+              dependencies: List[str] = None,
+              clear_errors: bool = True,
+              parts: List[ProgramPart] = None,
+              type_slice: bool = False) -> Program:
     """
-    Translates the Python module at the given path to a Viper program
+    Translates the Python module at the given path to a Viper program.
+    If a list of dependencies is given, the paths of all modules the given
+    module (transitively) imports are added to it. If ``clear_errors`` is
+    false, the error information of previous translations is kept, which is
+    needed as long as their verification results have not been converted.
+    If a list of parts is given, the program is also split into parts which
+    can be verified independently (one per method plus the rest of the
+    program), which are added to the list. If ``type_slice`` is set, only
+    the part of the type hierarchy the program needs is encoded.
     """
     path = os.path.abspath(path)
-    error_manager.clear()
+    if clear_errors:
+        error_manager.clear()
     current_path = os.path.dirname(inspect.stack()[0][1])
     resources_path = os.path.join(current_path, 'resources')
 
@@ -108,9 +169,14 @@ def translate(path: str, jvm: JVM, selected: Set[str] = set(),
     if sif and not viper_ast.is_extension_available():
         raise Exception('Viper AST SIF extension not found on classpath.')
     types = TypeInfo()
-    type_correct = types.check(path)
+    with phase_timer.phase(TYPE_CHECK):
+        type_correct = types.check(path)
     if not type_correct:
         return None
+    if verbose:
+        print(types.statistics())
+    if dependencies is not None:
+        dependencies.extend(types.files.values())
 
     analyzer = Analyzer(types, path, selected)
     main_module = analyzer.module
@@ -118,38 +184,52 @@ def translate(path: str, jvm: JVM, selected: Set[str] = set(),
         analyzer.add_native_silver_builtins(json.loads(file.read()))
 
     main_module.add_builtin_vars()
-    collect_modules(analyzer, path)
+    with phase_timer.phase(ANALYSIS):
+        collect_modules(analyzer, path)
     if sif:
         translator = SIFTranslator(jvm, path, types, viper_ast)
     else:
         translator = Translator(jvm, path, types, viper_ast)
-    analyzer.process(translator)
-    if 'sil_programs' not in globals() or reload_resources:
-        global sil_programs
-        sil_programs = load_sil_files(jvm, sif)
-    modules = [main_module.global_module] + list(analyzer.modules.values())
-    prog = translator.translate_program(modules, sil_programs, selected,
-                                        arp=arp, ignore_global=ignore_global)
-    if sif:
-        set_all_low_methods(jvm, viper_ast.all_low_methods)
-        set_preserves_low_methods(jvm, viper_ast.preserves_low_methods)
+    with phase_timer.phase(TRANSLATION):
+        analyzer.process(translator)
+        if sif not in sil_programs or reload_resources:
+            sil_programs[sif] = load_sil_files(jvm, sif)
+        modules = [main_module.global_module] + list(analyzer.modules.values())
+        # SIF programs are transformed as a whole and are therefore not split.
+        prog = translator.translate_program(modules, sil_programs[sif], selected,
+                                            arp=arp,
+                                            ignore_global=ignore_global,
+                                            parts=None if sif else parts,
+                                            type_slice=type_slice)
     if verbose:
         print('Translation successful.')
+        print(resolution_cache.statistics())
+        print(translator.prog_translator.pruning_statistics())
+        print(translator.call_translator.inline_templates.statistics())
+        print('Created {} positions in {:.2f} seconds.'.format(
+            viper_ast.position_count, viper_ast.position_time))
     if sif:
-        configure_mpp_transformation(jvm,
-                                     ctrl_opt=True,
-                                     seq_opt=True,
-                                     act_opt=True,
-                                     func_opt=True)
-        prog = jvm.viper.silver.sif.SIFExtendedTransformer.transform(prog, False)
+        sif_config = SIFConfig(viper_ast.all_low_methods,
+                               viper_ast.preserves_low_methods,
+                               viper_ast.domain_funcs_to_duplicate,
+                               ctrl_opt=True,
+                               seq_opt=True,
+                               act_opt=True,
+                               func_opt=True)
+        with phase_timer.phase(SIF_TRANSFORMATION):
+            prog = transform_to_mpp(jvm, prog, sif_config)
         if verbose:
             print('Transformation to MPP successful.')
     if arp:
-        prog = get_arp_plugin(jvm).before_verify(prog)
+        with phase_timer.phase(ARP_TRANSFORMATION):
+            prog = get_arp_plugin(jvm).before_verify(prog)
+            for part in parts or []:
+                part.program = get_arp_plugin(jvm).before_verify(part.program)
         if verbose:
             print('ARP transformation successful.')
     # Run consistency check in translated AST
-    consistency_errors = viper_ast.to_list(prog.checkTransitively())
+    with phase_timer.phase(CONSISTENCY_CHECK):
+        consistency_errors = viper_ast.to_list(prog.checkTransitively())
     for error in consistency_errors:
         print(error.toString())
     if consistency_errors:
@@ -174,22 +254,80 @@ def collect_modules(analyzer: Analyzer, path: str) -> None:
 
 
 def verify(prog: 'viper.silver.ast.Program', path: str,
-           jvm: JVM, backend=ViperVerifier.silicon, arp=False) -> VerificationResult:
+           jvm: JVM, backend=ViperVerifier.silicon, arp=False,
+           parts: List[ProgramPart] = None, workers: int = 1,
+           cache: TranslationCache = None,
+           verbose: bool = False, options: Sequence[str] = (),
+           timeout: int = 0, budget: float = 0) -> VerificationResult:
     """
-    Verifies the given Viper program
+    Verifies the given Viper program on an already started backend instance
+    from the backend pool. If the program has been split into parts, the
+    parts are verified concurrently on up to ``workers`` instances instead.
+    If a cache is given, parts which have been verified successfully before
+    (with the same dependencies) are skipped. The result of a split program
+    records the verification time and outcome of every part.
+
+    The backends are started with the given command line options (see
+    ``backend_options``). Backends which exceed the given timeout (which
+    applies to every part) are stopped shortly after, and all backends are
+    stopped once the given total budget (in seconds) is used up.
     """
     try:
-        if backend == ViperVerifier.silicon:
-            verifier = Silicon(jvm, path)
-        elif backend == ViperVerifier.carbon:
-            verifier = Carbon(jvm, path)
-        vresult = verifier.verify(prog, arp=arp)
-        return vresult
+        with phase_timer.phase(VERIFICATION), \
+                Watchdog(jvm, timeout, budget) as watchdog:
+            pool = get_backend_pool(jvm)
+            if not parts:
+                return pool.verify(prog, backend, arp=arp, options=options,
+                                   watchdog=watchdog)
+            todo = parts
+            if cache:
+                fingerprinter = PartFingerprinter([backend.name, arp] +
+                                                  list(options), parts)
+                fingerprints = {id(part): fingerprinter.fingerprint(part)
+                                for part in parts}
+                todo = [part for part in parts
+                        if not cache.is_verified(fingerprints[id(part)])]
+                if verbose:
+                    print('Reusing results for {} of {} parts.'.format(
+                        len(parts) - len(todo), len(parts)))
+            results = pool.verify_all([part.program for part in todo], backend,
+                                      arp=arp, options=options,
+                                      workers=workers, watchdog=watchdog)
+            if cache:
+                # Only successes are recorded; failures are always re-verified
+                # s.t. their errors are reported with up-to-date positions.
+                for part, result in zip(todo, results):
+                    if result:
+                        cache.mark_verified(fingerprints[id(part)])
+            merged = merge_results(results)
+            merged.timings = part_timings(parts, todo, results)
+            return merged
     except JavaException as je:
         print(je.stacktrace())
         traceback.print_exc()
 
 
+def part_timings(parts: List[ProgramPart], verified: List[ProgramPart],
+                  results: List[VerificationResult]) -> List[MemberTiming]:
+    """
+    Returns the timings of all parts of a program, given the results of the
+    ones which were verified (the others were cached).
+    """
+    part_results = {id(part): result for part, result in zip(verified, results)}
+    timings = []
+    for part in parts:
+        member = None
+        if part.name:
+            member = next(m for m in part.members if m.name() == part.name)
+        result = part_results.get(id(part))
+        if result is None:
+            timings.append(MemberTiming.of_member(member, 0.0, CACHED))
+        else:
+            timings.append(MemberTiming.of_member(member, result.duration,
+                                                  result.outcome))
+    return timings
+
+
 def _parse_log_level(log_level_string: str) -> int:
     """ Parses the log level provided by the user.
     """
@@ -208,6 +346,7 @@ def _parse_log_level(log_level_string: str) -> int:
 def main() -> None:
     """ Entry point for the translator.
     """
+    global sil_snapshots
     parser = argparse.ArgumentParser()
     parser.add_argument(
         'python_file',
@@ -257,6 +396,10 @@ def main() -> None:
         '--arp',
         action='store_true',
         help='Use Abstract Read Permissions')
+    parser.add_argument(
+        '--type-slice',
+        action='store_true',
+        help='only encode the part of the type hierarchy the program needs')
     parser.add_argument(
         '--log',
         type=_parse_log_level,
@@ -268,6 +411,16 @@ def main() -> None:
         help=('run verification the given number of times to benchmark '
               'performance'),
         default=-1)
+    parser.add_argument(
+        '--profile',
+        default=None,
+        help=('record the time spent in every phase and translated member '
+              'and write it to the given file'))
+    parser.add_argument(
+        '--profile-format',
+        choices=['json', 'chrome'],
+        help='format of the profile (JSON tree or Chrome trace events)',
+        default='json')
     parser.add_argument(
         '--ide-mode',
         action='store_true',
@@ -287,6 +440,72 @@ def main() -> None:
         action='store_true',
         help='Start Nagini server'
     )
+    parser.add_argument(
+        '--server-workers',
+        type=int,
+        help='number of requests the server verifies concurrently',
+        default=2
+    )
+    parser.add_argument(
+        '--parallel',
+        type=int,
+        help=('split the program into one part per method and verify the '
+              'parts on the given number of backend instances concurrently'),
+        default=1
+    )
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help=('split the program into one part per method and only verify '
+              'parts whose translation or dependencies changed since they '
+              'were last verified successfully')
+    )
+    parser.add_argument(
+        '--report-timings',
+        action='store_true',
+        help=('split the program into one part per method and report how '
+              'long the verification of each method took and its outcome')
+    )
+    parser.add_argument(
+        '--method-timeout',
+        type=int,
+        help=('split the program into one part per method and stop '
+              'verifying a method after the given number of seconds'),
+        default=0
+    )
+    parser.add_argument(
+        '--budget',
+        type=float,
+        help=('stop verifying after the given total number of seconds and '
+              'report all methods not verified by then'),
+        default=0
+    )
+    parser.add_argument(
+        '--z3-memory',
+        type=int,
+        help='memory limit of Z3 in megabytes',
+        default=0
+    )
+    parser.add_argument(
+        '--z3-args',
+        help='additional arguments passed to Z3',
+        default=None
+    )
+    parser.add_argument(
+        '--backend-cores',
+        type=int,
+        help='number of parallel verifiers inside each backend instance',
+        default=0
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='do not use or update the on-disk translation cache'
+    )
+    parser.add_argument(
+        '--cache-dir',
+        help='directory of the translation cache',
+        default=config.cache_config.directory)
     args = parser.parse_args()
 
     config.classpath = args.viper_jar_path
@@ -301,104 +520,182 @@ def main() -> None:
         parser.error('missing argument: --z3')
     if args.verifier == 'carbon' and not config.classpath:
         parser.error('missing argument: --boogie')
+    if args.parallel > 1 and args.sif:
+        parser.error('--parallel cannot be used with --sif')
+    if args.incremental and args.sif:
+        parser.error('--incremental cannot be used with --sif')
+    if args.report_timings and args.sif:
+        parser.error('--report-timings cannot be used with --sif')
+    if args.method_timeout and args.sif:
+        parser.error('--method-timeout cannot be used with --sif')
+    if args.incremental and (args.no_cache or
+                             not config.cache_config.enabled):
+        parser.error('--incremental cannot be used with the cache disabled')
 
     logging.basicConfig(level=args.log)
 
     os.environ['MYPYPATH'] = config.mypy_path
     jvm = JVM(config.classpath)
+    cache = None
+    sil_snapshots = None
+    if config.cache_config.enabled and not args.no_cache:
+        cache = TranslationCache(args.cache_dir, config.cache_config.max_size)
+        sil_snapshots = ProgramSnapshots(args.cache_dir)
     if args.server:
-        import zmq
-        context = zmq.Context()
-        socket = context.socket(zmq.REP)
-        socket.bind(DEFAULT_SERVER_SOCKET)
-        global sil_programs
-        sil_programs = load_sil_files(jvm, args.sif)
-
-        while True:
-            file = socket.recv_string()
-            response = ['']
-
-            def add_response(part):
-                response[0] = response[0] + '\n' + part
-
-            translate_and_verify(file, jvm, args, add_response, arp=args.arp)
-            socket.send_string(response[0])
+        from nagini_translation.server import VerificationServer
+        sil_programs[args.sif] = load_sil_files(jvm, args.sif)
+        server = VerificationServer(jvm, args, args.server_workers,
+                                    cache=cache)
+        server.serve_forever()
     else:
-        translate_and_verify(args.python_file, jvm, args, arp=args.arp)
+        translate_and_verify(args.python_file, jvm, args, arp=args.arp,
+                             cache=cache)
 
 
-def translate_and_verify(python_file, jvm, args, print=print, arp=False):
+def translate_and_verify(python_file, jvm, args, print=print, arp=False,
+                         cache: TranslationCache = None):
+    if args.profile:
+        profiler.start()
     try:
         start = time.time()
         selected = set(args.select.split(',')) if args.select else set()
-        prog = translate(python_file, jvm, selected, args.sif,
-                         ignore_global=args.ignore_global, arp=arp, verbose=args.verbose)
-        if args.print_silver:
-            if args.verbose:
-                print('Result:')
-            print(str(prog))
-        if args.write_silver_to_file:
-            with open(args.write_silver_to_file, 'w') as fp:
-                fp.write(str(prog))
         if args.verifier == 'silicon':
             backend = ViperVerifier.silicon
         elif args.verifier == 'carbon':
             backend = ViperVerifier.carbon
         else:
             raise ValueError('Unknown verifier specified: ' + args.verifier)
+        needs_program = args.print_silver or args.write_silver_to_file
+        options = backend_options(backend, args.method_timeout,
+                                  args.z3_memory, args.z3_args,
+                                  args.backend_cores)
+        cache_key = None
+        if cache and args.benchmark < 1 and not args.report_timings:
+            cache_key = cache.key(python_file, selected, args.sif, arp,
+                                  args.ignore_global, args.type_slice)
+            output_key = result_key(args.verifier, args.ide_mode,
+                                    args.show_viper_errors, options)
+        if cache_key:
+            entry = cache.lookup(cache_key)
+            if (entry and output_key in entry['results'] and
+                    (entry['program'] or not needs_program)):
+                if args.verbose:
+                    print('Using cached result.')
+                _output_program(entry['program'], args, print)
+                print(entry['results'][output_key])
+                duration = '{:.2f}'.format(time.time() - start)
+                print('Verification took ' + duration + ' seconds.')
+                return
+        dependencies = []
+        incremental_cache = cache if args.incremental else None
+        split = (args.parallel > 1 or incremental_cache is not None or
+                 args.report_timings or args.method_timeout > 0)
+        parts = [] if split else None
+        prog = translate(python_file, jvm, selected, args.sif,
+                         ignore_global=args.ignore_global, arp=arp, verbose=args.verbose,
+                         dependencies=dependencies, parts=parts,
+                         type_slice=args.type_slice)
+        if args.verbose and parts:
+            print('Split program into {} parts.'.format(len(parts)))
+        prog_text = str(prog) if needs_program else None
+        _output_program(prog_text, args, print)
         if args.benchmark >= 1:
-            print("Run, Total, Start, End, Time".format())
+            print(', '.join(['Run', 'Total', 'Start', 'End', 'Time'] +
+                            PHASES))
             for i in range(args.benchmark):
+                phase_timer.reset()
                 start = time.time()
-                prog = translate(python_file, jvm, selected, args.sif, arp=arp)
-                vresult = verify(prog, python_file, jvm, backend=backend, arp=arp)
+                parts = [] if parts is not None else None
+                prog = translate(python_file, jvm, selected, args.sif, arp=arp,
+                                 parts=parts, type_slice=args.type_slice)
+                vresult = verify(prog, python_file, jvm, backend=backend,
+                                 arp=arp, parts=parts, workers=args.parallel,
+                                 options=options, timeout=args.method_timeout,
+                                 budget=args.budget)
                 end = time.time()
-                print("{}, {}, {}, {}, {}".format(
-                    i, args.benchmark, start, end, end - start))
+                times = phase_timer.times()
+                print(', '.join(str(value) for value in
+                                [i, args.benchmark, start, end, end - start] +
+                                [times.get(phase, 0.0) for phase in PHASES]))
         else:
-            vresult = verify(prog, python_file, jvm, backend=backend, arp=arp)
+            vresult = verify(prog, python_file, jvm, backend=backend, arp=arp,
+                             parts=parts, workers=args.parallel,
+                             cache=incremental_cache, verbose=args.verbose,
+                             options=options, timeout=args.method_timeout,
+                             budget=args.budget)
         if args.verbose:
             print("Verification completed.")
-        print(vresult.to_string(args.ide_mode, args.show_viper_errors))
+            print(str(get_backend_pool(jvm).statistics))
+        output = vresult.to_string(args.ide_mode, args.show_viper_errors,
+                                   args.report_timings)
+        print(output)
+        if cache_key and vresult.outcome not in INCOMPLETE_OUTCOMES:
+            cache.store(cache_key, python_file, dependencies, prog_text,
+                        {output_key: output})
         duration = '{:.2f}'.format(time.time() - start)
         print('Verification took ' + duration + ' seconds.')
     except (TypeException, InvalidProgramException, UnsupportedException) as e:
         print("Translation failed")
-        if isinstance(e, (InvalidProgramException, UnsupportedException)):
-            if isinstance(e, InvalidProgramException):
-                issue = 'Invalid program: '
-                if e.message:
-                    issue += e.message
-                else:
-                    issue += e.code
-            else:
-                issue = 'Not supported: '
-                if e.args[0]:
-                    issue += e.args[0]
-                else:
-                    issue += astunparse.unparse(e.node)
-            line = str(e.node.lineno)
-            col = str(e.node.col_offset)
-            print(issue + ' (' + python_file + '@' + line + '.' + col + ')')
-        if isinstance(e, TypeException):
-            for msg in e.messages:
-                parts = TYPE_ERROR_MATCHER.match(msg)
-                if parts:
-                    parts = parts.groupdict()
-                    file = parts['file']
-                    if file == '__main__':
-                        file = python_file
-                    msg = parts['msg']
-                    line = parts['line']
-                    print('Type error: ' + msg + ' (' + file + '@' + line + '.0)')
-                else:
-                    print(msg)
+        for message in translation_error_messages(e, python_file):
+            print(message)
     except ConsistencyException as e:
         print(e.message + ': Translated AST contains inconsistencies.')
 
     except JavaException as e:
         print(e.stacktrace())
         raise e
+    finally:
+        if args.profile:
+            profiler.stop()
+            profiler.write(args.profile, args.profile_format)
+
+
+def translation_error_messages(e: Exception, python_file: str) -> List[str]:
+    """
+    Creates user-facing messages for an exception that made the translation of
+    the given file fail.
+    """
+    messages = []
+    if isinstance(e, (InvalidProgramException, UnsupportedException)):
+        if isinstance(e, InvalidProgramException):
+            issue = 'Invalid program: '
+            if e.message:
+                issue += e.message
+            else:
+                issue += e.code
+        else:
+            issue = 'Not supported: '
+            if e.args[0]:
+                issue += e.args[0]
+            else:
+                issue += astunparse.unparse(e.node)
+        line = str(e.node.lineno)
+        col = str(e.node.col_offset)
+        messages.append(issue + ' (' + python_file + '@' + line + '.' + col + ')')
+    if isinstance(e, TypeException):
+        for msg in e.messages:
+            parts = TYPE_ERROR_MATCHER.match(msg)
+            if parts:
+                parts = parts.groupdict()
+                file = parts['file']
+                if file == '__main__':
+                    file = python_file
+                msg = parts['msg']
+                line = parts['line']
+                messages.append('Type error: ' + msg + ' (' + file + '@' + line + '.0)')
+            else:
+                messages.append(msg)
+    return messages
+
+
+def _output_program(prog_text: str, args, print=print) -> None:
+    if args.print_silver:
+        if args.verbose:
+            print('Result:')
+        print(prog_text)
+    if args.write_silver_to_file:
+        with open(args.write_silver_to_file, 'w') as fp:
+            fp.write(prog_text)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,567 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+"""Nagini verification server.
+
+Clients talk to the server over a ZeroMQ socket. Requests are JSON objects
+of the form::
+
+    {"id": "1", "command": "verify", "file": "/path/to/file.py",
+     "options": {"verifier": "silicon", "select": ["f", "C.m"]}}
+
+where ``source`` can be given instead of (or in addition to) ``file`` to
+verify a module that is not saved on disk. Supported options are
+``verifier``, ``sif``, ``arp``, ``type_slice``, ``select``,
+``ignore_global``, ``ide_mode``, ``show_viper_errors``, ``method_timeout``,
+``budget``, ``z3_memory``, ``z3_args`` and ``backend_cores``; missing options default to the values the
+server was started with. As on the command line, programs are split into
+one part per (selected) member if a method timeout is given, s.t. the
+timeout applies to every member. A request that is
+queued or running can be cancelled with::
+
+    {"id": "2", "command": "cancel", "target": "1"}
+
+Request ids must be strings or numbers, and a client cannot send a verify
+request with the id of one of its requests that is still queued or running.
+Verify requests without an id get one assigned by the server, which is
+returned in the response.
+
+Every verify request is answered with a JSON object containing its ``id``,
+a ``status`` (``success``, ``failure``, ``timeout``,
+``translation_failure``, ``cancelled`` or ``error``), the reported ``errors``, the textual ``output``
+the command line tool would print, the ``members`` of split programs with
+their ``outcome`` and verification ``time``, and ``timing`` information in
+seconds.
+For compatibility with older clients, a request that is just a file name is
+answered with the plain text output.
+
+Requests are processed by a pool of worker threads which take started
+backend instances from the shared backend pool inside the single JVM, so
+that several requests can be verified concurrently. Translation is not
+thread-safe (mypy, the analyzer and the error manager use global state) and
+is therefore serialized. The error information of every translated program
+is kept in its own generation of the error manager, which is released once
+the response to its request has been sent.
+"""
+
+import itertools
+import json
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import zmq
+
+from nagini_translation.lib.cache import result_key, TranslationCache
+from nagini_translation.lib.constants import DEFAULT_SERVER_SOCKET
+from nagini_translation.lib.errors import error_manager
+from nagini_translation.lib.jvmaccess import JVM
+from nagini_translation.lib.typeinfo import (
+    enable_incremental_checks,
+    TypeException,
+)
+from nagini_translation.lib.util import (
+    ConsistencyException,
+    InvalidProgramException,
+    UnsupportedException,
+)
+from nagini_translation.main import (
+    part_timings,
+    translate,
+    translation_error_messages,
+)
+from nagini_translation.verifier import (
+    backend_options,
+    BUDGET_EXCEEDED,
+    Failure,
+    get_backend_pool,
+    INCOMPLETE_OUTCOMES,
+    MemberTiming,
+    merge_results,
+    TIMEOUT,
+    VerificationResult,
+    ViperVerifier,
+    Watchdog,
+)
+from typing import Any, Dict, List, Optional
+
+
+_RESULTS_ADDRESS = 'inproc://nagini-results'
+
+_INLINE_FILE_NAME = 'inline.py'
+
+
+class ServerRequest:
+    """
+    A verification request received by the server.
+    """
+
+    def __init__(self, identity: bytes, request_id: Any, data: Dict[str, Any],
+                 legacy: bool) -> None:
+        self.identity = identity
+        self.id = request_id
+        self.file = data.get('file')
+        self.source = data.get('source')
+        self.options = data.get('options') or {}
+        self.legacy = legacy
+        self.received = time.time()
+        self.cancelled = False
+        # Generation of the error information of the translated program,
+        # which is released once the response has been sent.
+        self.error_generation = None
+        # Backend instance currently verifying this request, if any.
+        self.verifier = None
+
+
+class RequestOptions:
+    """
+    The options of a verification request. Missing options default to the
+    values the server was started with.
+    """
+
+    def __init__(self, options: Dict[str, Any], args) -> None:
+        def option(name: str) -> Any:
+            return options.get(name, getattr(args, name))
+        self.verifier = option('verifier')
+        self.sif = option('sif')
+        self.arp = option('arp')
+        self.type_slice = option('type_slice')
+        self.ignore_global = option('ignore_global')
+        self.ide_mode = option('ide_mode')
+        self.show_viper_errors = option('show_viper_errors')
+        self.method_timeout = option('method_timeout')
+        self.budget = option('budget')
+        self.z3_memory = option('z3_memory')
+        self.z3_args = option('z3_args')
+        self.backend_cores = option('backend_cores')
+        selected = options.get('select', args.select) or []
+        if isinstance(selected, str):
+            selected = selected.split(',')
+        self.select = set(selected)
+
+
+class VerificationServer:
+    """
+    Accepts verification requests from any number of clients and processes
+    them concurrently on a pool of worker threads.
+    """
+
+    def __init__(self, jvm: JVM, args, workers: int,
+                 address: str = DEFAULT_SERVER_SOCKET,
+                 cache: TranslationCache = None) -> None:
+        self.jvm = jvm
+        self.args = args
+        self.workers = max(1, workers)
+        self.address = address
+        self.cache = cache
+        self.pool = get_backend_pool(jvm)
+        self.context = zmq.Context.instance()
+        self.queue = queue.Queue()
+        self.requests = {}
+        self._generated_ids = itertools.count(1)
+        self.translation_lock = threading.Lock()
+        self.state_lock = threading.Lock()
+        # Type checks of later requests reuse mypy's cache of earlier ones.
+        enable_incremental_checks()
+
+    def serve_forever(self) -> None:
+        """
+        Starts the worker threads and processes incoming requests.
+        """
+        socket = self.context.socket(zmq.ROUTER)
+        socket.bind(self.address)
+        results = self.context.socket(zmq.PULL)
+        results.bind(_RESULTS_ADDRESS)
+        # Start backends for the default verifier right away, s.t. the first
+        # requests do not have to wait for them.
+        self.pool.start(self._backend(self.args.verifier), count=self.workers)
+        for index in range(self.workers):
+            worker = threading.Thread(target=self._work,
+                                      name='nagini-worker-' + str(index),
+                                      daemon=True)
+            worker.start()
+        poller = zmq.Poller()
+        poller.register(socket, zmq.POLLIN)
+        poller.register(results, zmq.POLLIN)
+        while True:
+            events = dict(poller.poll())
+            if results in events:
+                socket.send_multipart(results.recv_multipart())
+            if socket in events:
+                reply = self._receive(socket.recv_multipart())
+                if reply is not None:
+                    socket.send_multipart(reply)
+
+    def _receive(self, frames: List[bytes]) -> Optional[List[bytes]]:
+        """
+        Handles a message received from a client. Returns the frames of an
+        immediate reply, if any.
+        """
+        identity = frames[0]
+        payload = frames[-1].decode()
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            # Legacy request consisting of just a file name.
+            request = ServerRequest(identity, None,
+                                    {'file': payload.strip()}, True)
+            self.queue.put(request)
+            return None
+        command = data.get('command', 'verify')
+        request_id = data.get('id')
+        if command == 'cancel':
+            found = self._cancel(identity, data.get('target'))
+            return self._frames(identity, {
+                'id': request_id,
+                'status': 'ok' if found else 'unknown',
+            })
+        if command != 'verify':
+            return self._frames(identity, {
+                'id': request_id,
+                'status': 'error',
+                'output': 'Unknown command: ' + str(command),
+            })
+        if request_id is not None and not isinstance(request_id, (str, int)):
+            return self._frames(identity, {
+                'id': None,
+                'status': 'error',
+                'output': 'Request ids must be strings or numbers.',
+            })
+        with self.state_lock:
+            if request_id is None:
+                request_id = self._generate_id(identity)
+            duplicate = (identity, request_id) in self.requests
+            if not duplicate:
+                request = ServerRequest(identity, request_id, data, False)
+                self.requests[(identity, request_id)] = request
+        if duplicate:
+            return self._frames(identity, {
+                'id': request_id,
+                'status': 'error',
+                'output': 'Request id {} is already in use.'.format(
+                    json.dumps(request_id)),
+            })
+        self.queue.put(request)
+        return None
+
+    def _generate_id(self, identity: bytes) -> str:
+        """
+        Returns an id for a request of the given client which does not have
+        one. The state lock must be held.
+        """
+        while True:
+            request_id = 'server-{}'.format(next(self._generated_ids))
+            if (identity, request_id) not in self.requests:
+                return request_id
+
+    def _cancel(self, identity: bytes, request_id: Any) -> bool:
+        with self.state_lock:
+            request = self.requests.get((identity, request_id))
+            if request is None:
+                return False
+            # The worker checks the flag after it assigns a verifier, under
+            # the same lock, so the cancellation is seen by one of the two.
+            request.cancelled = True
+            verifier = request.verifier
+        if verifier is not None:
+            # Stopping the backend makes the running verification fail, the
+            # worker then reports the request as cancelled.
+            verifier.stop()
+        return True
+
+    def _frames(self, identity: bytes, response: Dict[str, Any]) -> List[bytes]:
+        return [identity, b'', json.dumps(response).encode()]
+
+    def _work(self) -> None:
+        """
+        Main loop of a worker thread.
+        """
+        self.jvm.attach_current_thread()
+        results = self.context.socket(zmq.PUSH)
+        results.connect(_RESULTS_ADDRESS)
+        while True:
+            request = self.queue.get()
+            try:
+                response = self._process(request)
+            except Exception as e:
+                response = self._response(request, 'error', {},
+                                          output=str(e))
+            with self.state_lock:
+                self.requests.pop((request.identity, request.id), None)
+            if request.legacy:
+                payload = response['output']
+                results.send_multipart([request.identity, b'',
+                                        ('\n' + payload).encode()])
+            else:
+                results.send_multipart(self._frames(request.identity,
+                                                    response))
+            if request.error_generation is not None:
+                error_manager.release(request.error_generation)
+
+    def _backend(self, name: str) -> ViperVerifier:
+        if name == 'silicon':
+            return ViperVerifier.silicon
+        if name == 'carbon':
+            return ViperVerifier.carbon
+        raise ValueError('Unknown verifier specified: ' + name)
+
+    def _process(self, request: ServerRequest) -> Dict[str, Any]:
+        """
+        Translates and verifies the program of the given request.
+        """
+        start = time.time()
+        timing = {'queued': start - request.received}
+        if request.cancelled:
+            return self._response(request, 'cancelled', timing)
+        options = RequestOptions(request.options, self.args)
+        if options.method_timeout and options.sif:
+            return self._response(request, 'error', timing,
+                                  output='method_timeout cannot be used with '
+                                         'sif.')
+        tmp_dir = None
+        path = request.file
+        try:
+            if request.source is not None:
+                tmp_dir = tempfile.mkdtemp(prefix='nagini')
+                path = self._write_source(request, tmp_dir)
+            if not path:
+                return self._response(request, 'error', timing,
+                                      output='No file or source given.')
+            return self._process_file(request, options, path,
+                                      tmp_dir is not None, start, timing)
+        finally:
+            if tmp_dir:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _write_source(self, request: ServerRequest, tmp_dir: str) -> str:
+        """
+        Writes the source of the given request to a file in the given
+        directory and returns its path.
+        """
+        name = (os.path.basename(request.file) if request.file
+                else _INLINE_FILE_NAME)
+        path = os.path.join(tmp_dir, name)
+        with open(path, 'w') as file:
+            file.write(request.source)
+        return path
+
+    def _process_file(self, request: ServerRequest, options: 'RequestOptions',
+                      path: str, inline: bool, start: float,
+                      timing: Dict[str, float]) -> Dict[str, Any]:
+        """
+        Translates and verifies the program in the given file, or takes the
+        response from the cache. Sources sent inline are not cached.
+        """
+        backend = self._backend(options.verifier)
+        backend_opts = backend_options(
+            backend, options.method_timeout, options.z3_memory,
+            options.z3_args, options.backend_cores)
+        display_path = request.file or _INLINE_FILE_NAME
+        cache_key = None
+        if self.cache and not inline:
+            cache_key = self.cache.key(path, options.select, options.sif,
+                                       options.arp, options.ignore_global,
+                                       options.type_slice)
+            output_key = result_key('server:' + backend.name,
+                                    options.ide_mode,
+                                    options.show_viper_errors, backend_opts)
+            cached = self._cached(cache_key, output_key)
+            if cached is not None:
+                timing['total'] = time.time() - start
+                return self._response(request, cached['status'], timing,
+                                      output=cached['output'],
+                                      errors=cached['errors'],
+                                      members=cached.get('members'))
+
+        dependencies = []
+        # As on the command line, a method timeout applies to every
+        # member, so the program is split into one part per member.
+        parts = [] if options.method_timeout else None
+        prog, failure = self._translate(request, options, path, display_path,
+                                        dependencies, parts, timing)
+        if failure is not None:
+            return self._response(request, 'translation_failure', timing,
+                                  output=failure)
+        if request.cancelled:
+            return self._response(request, 'cancelled', timing)
+        programs = [part.program for part in parts] if parts else [prog]
+        results = self._verify_all(request, programs, backend, backend_opts,
+                                   options, timing)
+        if results is None:
+            return self._response(request, 'cancelled', timing)
+        members = []
+        if parts:
+            vresult = merge_results(results)
+            members = [self._member_data(member_timing) for member_timing
+                       in part_timings(parts, parts, results)]
+        else:
+            vresult = results[0]
+        output = vresult.to_string(options.ide_mode, options.show_viper_errors)
+        errors = []
+        if not vresult:
+            errors = [self._error_data(error, options.ide_mode,
+                                       options.show_viper_errors)
+                      for error in vresult.errors]
+        if inline:
+            output = output.replace(path, display_path)
+            for error in errors:
+                error['message'] = error['message'].replace(path, display_path)
+                error['file'] = display_path
+        status = self._status(vresult)
+        if cache_key and vresult.outcome not in INCOMPLETE_OUTCOMES:
+            cached = {'status': status, 'output': output, 'errors': errors,
+                      'members': members}
+            self.cache.store(cache_key, path, dependencies, None,
+                             {output_key: json.dumps(cached)})
+        timing['total'] = time.time() - start
+        return self._response(request, status, timing, output=output,
+                              errors=errors, members=members)
+
+    def _cached(self, cache_key: str,
+                output_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the cached response data for the given keys, if any.
+        """
+        entry = self.cache.lookup(cache_key)
+        if entry and output_key in entry['results']:
+            return json.loads(entry['results'][output_key])
+        return None
+
+    def _translate(self, request: ServerRequest, options: 'RequestOptions',
+                   path: str, display_path: str, dependencies: List[str],
+                   parts: Optional[List], timing: Dict[str, float]):
+        """
+        Translates the given file. Returns the program and None, or None and
+        the output describing why the translation failed.
+        """
+        with self.translation_lock:
+            request.error_generation = error_manager.start_generation()
+            translation_start = time.time()
+            try:
+                prog = translate(path, self.jvm, options.select, options.sif,
+                                 arp=options.arp,
+                                 ignore_global=options.ignore_global,
+                                 type_slice=options.type_slice,
+                                 dependencies=dependencies, parts=parts,
+                                 clear_errors=False)
+            except (TypeException, InvalidProgramException,
+                    UnsupportedException) as e:
+                messages = translation_error_messages(e, display_path)
+                return None, '\n'.join(['Translation failed'] + messages)
+            except ConsistencyException as e:
+                return None, (e.message +
+                              ': Translated AST contains inconsistencies.')
+            finally:
+                timing['translation'] = time.time() - translation_start
+        return prog, None
+
+    def _verify_all(self, request: ServerRequest, programs: List,
+                    backend: ViperVerifier, backend_opts: List[str],
+                    options: 'RequestOptions',
+                    timing: Dict[str, float]) -> Optional[List]:
+        """
+        Verifies the given programs one after the other, under a common
+        watchdog. Returns None if the request is cancelled.
+        """
+        results = []
+        verification_start = time.time()
+        with Watchdog(self.jvm, options.method_timeout,
+                      options.budget) as watchdog:
+            for program in programs:
+                result = self._verify(request, program, backend, backend_opts,
+                                      options.arp, watchdog)
+                if request.cancelled:
+                    return None
+                results.append(result)
+        timing['verification'] = time.time() - verification_start
+        return results
+
+    def _status(self, vresult: VerificationResult) -> str:
+        if vresult:
+            return 'success'
+        if vresult.outcome in (TIMEOUT, BUDGET_EXCEEDED):
+            return 'timeout'
+        return 'failure'
+
+    def _verify(self, request: ServerRequest, prog: 'silver.ast.Program',
+                backend: ViperVerifier, options: List[str], arp: bool,
+                watchdog: Watchdog) -> Optional[VerificationResult]:
+        """
+        Verifies the given program (or part of a program) of the given
+        request on an instance from the backend pool, which is stopped if the
+        request is cancelled. Returns None if it was cancelled.
+        """
+        if watchdog.exhausted():
+            return Failure.from_errors(
+                [], [watchdog.describe(BUDGET_EXCEEDED)], BUDGET_EXCEEDED)
+        verifier = self.pool.acquire(backend, options)
+        with self.state_lock:
+            request.verifier = verifier
+            cancelled = request.cancelled
+        if cancelled:
+            # Cancelled while waiting for an instance.
+            request.verifier = None
+            self.pool.release(verifier)
+            return None
+        watchdog.watch(verifier)
+        result = None
+        try:
+            result = verifier.verify(prog, arp=arp)
+        except Exception:
+            if request.cancelled:
+                return None
+            if not watchdog.interrupted(verifier):
+                raise
+        finally:
+            interruption = watchdog.unwatch(verifier)
+            request.verifier = None
+            # Stopped or crashed instances are discarded by the pool.
+            self.pool.release(verifier)
+        if interruption:
+            result = Failure.from_errors(
+                [], [watchdog.describe(interruption)], interruption)
+        result.duration = verifier.verification_time
+        return result
+
+    def _member_data(self, timing: MemberTiming) -> Dict[str, Any]:
+        return {
+            'name': timing.name,
+            'line': timing.line,
+            'outcome': timing.outcome,
+            'time': timing.duration,
+        }
+
+    def _error_data(self, error, ide_mode: bool,
+                    show_viper_errors: bool) -> Dict[str, Any]:
+        return {
+            'id': error.full_id,
+            'message': error.string(ide_mode, show_viper_errors),
+            'file': error.position.file_name,
+            'line': error.position.line,
+            'column': error.position.column,
+        }
+
+    def _response(self, request: ServerRequest, status: str,
+                  timing: Dict[str, float], output: str = '',
+                  errors: List[Dict[str, Any]] = None,
+                  members: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+        if status == 'cancelled' and not output:
+            output = 'Verification cancelled'
+        if request.legacy and 'total' in timing:
+            duration = '{:.2f}'.format(timing['total'])
+            output += '\nVerification took ' + duration + ' seconds.'
+        return {
+            'id': request.id,
+            'status': status,
+            'output': output,
+            'errors': errors or [],
+            'members': members or [],
+            'timing': timing,
+        }
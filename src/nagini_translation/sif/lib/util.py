@@ -4,33 +4,85 @@ License, v. 2.0. If a copy of the MPL was not distributed with this
 file, You can obtain one at http://mozilla.org/MPL/2.0/.
 """
 
-from typing import Optional
+import threading
+
+from typing import Iterable, Optional
 
 from nagini_translation.lib.context import Context
 from nagini_translation.lib.program_nodes import MethodType
 from nagini_translation.lib.typedefs import DomainFuncApp
 from nagini_translation.translators.type_domain_factory import TypeDomainFactory
 
-def configure_mpp_transformation(jvm, ctrl_opt: bool, seq_opt: bool,
-                                 act_opt: bool, func_opt: bool) -> None:
+class SIFConfig:
     """
-    Configure which optimizations to apply in MPP transformation.
+    Configuration of the transformation of a single program to a modular
+    product program: the methods which are all-low or preserve lowness, the
+    domain functions which have to be duplicated, and which optimizations
+    to apply.
     - ctrl_opt: only generate those control variables which are needed.
     - seq_opt:  bunch together statements which are executed under the same condition without
                 interference with the other execution.
     - act_opt:  at the beginning of each method add an 'assume p1' statement.
     - func_opt: only apply the _checkDefined and _isDefined functions in the first execution.
     """
-    jvm.viper.silver.sif.SIFExtendedTransformer.optimizeControlFlow(ctrl_opt)
-    jvm.viper.silver.sif.SIFExtendedTransformer.optimizeSequential(seq_opt)
-    jvm.viper.silver.sif.SIFExtendedTransformer.optimizeRestrictActVars(act_opt)
-    if func_opt:
-        jvm.viper.silver.sif.SIFExtendedTransformer.addPrimedFuncAppReplacement(
-            "_checkDefined", "first_arg")
-        jvm.viper.silver.sif.SIFExtendedTransformer.addPrimedFuncAppReplacement(
-            "_isDefined", "true")
-    else:
-        jvm.viper.silver.sif.SIFExtendedTransformer.clearPrimedFuncAppReplacement()
+
+    def __init__(self, all_low_methods: Iterable[str] = (),
+                 preserves_low_methods: Iterable[str] = (),
+                 domain_funcs_to_duplicate: Iterable['silver.ast.DomainFunc'] = (),
+                 ctrl_opt: bool = True, seq_opt: bool = True,
+                 act_opt: bool = True, func_opt: bool = True) -> None:
+        self.all_low_methods = set(all_low_methods)
+        self.preserves_low_methods = set(preserves_low_methods)
+        self.domain_funcs_to_duplicate = list(domain_funcs_to_duplicate)
+        self.ctrl_opt = ctrl_opt
+        self.seq_opt = seq_opt
+        self.act_opt = act_opt
+        self.func_opt = func_opt
+
+    def apply(self, jvm) -> None:
+        """
+        Sets the global state of the transformer to this configuration,
+        overwriting everything set by previous configurations. Domain
+        functions to duplicate and primed function application replacements
+        are only ever added by the transformer, so they are cleared first.
+        """
+        transformer = jvm.viper.silver.sif.SIFExtendedTransformer
+        transformer.setAllLowMethods(_to_scala_set(jvm, self.all_low_methods))
+        transformer.setPreservesLowMethods(
+            _to_scala_set(jvm, self.preserves_low_methods))
+        transformer.clearDomainFuncToDuplicate()
+        if self.domain_funcs_to_duplicate:
+            seq = jvm.scala.collection.mutable.ArraySeq(
+                len(self.domain_funcs_to_duplicate))
+            for i, func in enumerate(self.domain_funcs_to_duplicate):
+                seq.update(i, func)
+            transformer.addDomainFuncToDuplicate(seq)
+        transformer.optimizeControlFlow(self.ctrl_opt)
+        transformer.optimizeSequential(self.seq_opt)
+        transformer.optimizeRestrictActVars(self.act_opt)
+        transformer.clearPrimedFuncAppReplacement()
+        if self.func_opt:
+            transformer.addPrimedFuncAppReplacement("_checkDefined", "first_arg")
+            transformer.addPrimedFuncAppReplacement("_isDefined", "true")
+
+
+# The transformer is configured through global state in the JVM, so a
+# configuration must not be changed while another program is transformed.
+_transformation_lock = threading.Lock()
+
+
+def transform_to_mpp(jvm, prog: 'silver.ast.Program',
+                     config: SIFConfig) -> 'silver.ast.Program':
+    """
+    Transforms the given program to a modular product program using the
+    given configuration. Can be called from several threads sharing a JVM;
+    transformations are then run one at a time, each with its own
+    configuration.
+    """
+    with _transformation_lock:
+        config.apply(jvm)
+        return jvm.viper.silver.sif.SIFExtendedTransformer.transform(prog, False)
+
 
 def _to_scala_set(jvm, inset: set):
     seq = jvm.scala.collection.mutable.ArraySeq(len(inset))
@@ -38,14 +90,6 @@ def _to_scala_set(jvm, inset: set):
         seq.update(i, elem)
     return seq.toSet()
 
-def set_all_low_methods(jvm, names: set) -> None:
-    scala_set = _to_scala_set(jvm, names)
-    jvm.viper.silver.sif.SIFExtendedTransformer.setAllLowMethods(scala_set)
-
-def set_preserves_low_methods(jvm, names: set) -> None:
-    scala_set = _to_scala_set(jvm, names)
-    jvm.viper.silver.sif.SIFExtendedTransformer.setPreservesLowMethods(scala_set)
-
 def set_equality_comp_functions(jvm, names: set) -> None:
     if not names:
         return
@@ -26,6 +26,7 @@ class ViperASTExtended(ViperAST):
         self.all_low_methods = set()
         self.preserves_low_methods = set()
         self.equality_comp_functions = set()
+        self.domain_funcs_to_duplicate = []
         self.ctx = None
         self.type_factory = None
 
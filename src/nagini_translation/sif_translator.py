@@ -78,4 +78,5 @@ class SIFTranslator(Translator):
 
         self.obligation_translator = config.obligation_translator
         self.prog_translator = config.prog_translator
+        self.call_translator = config.call_translator
         self.expr_translator = config.expr_translator
@@ -30,16 +30,30 @@ Supported annotation types are:
 4.  ``Label(via)`` – mark location to be used in other annotations.
 5.  ``IgnoreFile(<issue>)`` – mark that file cannot be tested due to
     critical issue such as a crash, which is tracked in ``issue``.
+
+With ``--workers N``, the tests are run by a ``ParallelTestRunner`` in
+``N`` worker processes, each of which keeps its own JVM and backends
+running between tests. In both modes, the duration of every test is
+written to a timings file, which is used to start the longest tests first
+in the next parallel run.
 """
 
 
 import abc
+import json
+import multiprocessing
 import os
 import pytest
 import re
+import sys
+import time
 import tokenize
+import traceback
 from collections import Counter
-from typing import Any, Dict, List, Optional
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
 
 
 # These imports monkey-patch mypy and should happen as early as possible.
@@ -51,6 +65,7 @@ from nagini_translation.lib.errors import error_manager
 from nagini_translation.lib.typeinfo import TypeException
 from nagini_translation.lib.util import InvalidProgramException
 from nagini_translation.main import translate, verify, TYPE_ERROR_PATTERN
+from nagini_translation.sif.lib.util import SIFConfig, transform_to_mpp
 from nagini_translation.verifier import VerificationResult, ViperVerifier
 
 
@@ -65,6 +80,8 @@ _BACKEND_SILICON = 'silicon'
 _BACKEND_CARBON = 'carbon'
 _BACKEND_ANY = 'ANY'
 
+_SIF_CONCURRENCY_THREADS = 4
+
 
 def _consume(key: str, dictionary: Dict[str, Any], check: bool = False) -> Any:
     """Destructive read from the dictionary.
@@ -506,8 +523,9 @@ class AnnotationManager:
                     break
             else:
                 unexpected_errors.append(error)
-        assert not unexpected_errors
-        assert not annotations
+        assert not unexpected_errors, 'Unexpected errors: {}'.format(
+            unexpected_errors)
+        assert not annotations, 'Missing errors: {}'.format(annotations)
 
     def has_unexpected_missing(self) -> bool:
         """Check if there are unexpected or missing output annotations."""
@@ -559,13 +577,15 @@ class VerificationTest(AnnotatedTest):
 
     def test_file(
             self, path: str, jvm: jvmaccess.JVM, verifier: ViperVerifier,
-            sif: bool, reload_resources: bool, arp: bool):
+            sif: bool, reload_resources: bool, arp: bool,
+            type_slice: bool = False):
         """Test specific Python file."""
         annotation_manager = self.get_annotation_manager(path, verifier.name)
         if annotation_manager.ignore_file():
             pytest.skip('Ignored')
         path = os.path.abspath(path)
-        prog = translate(path, jvm, sif=sif, arp=arp, reload_resources=reload_resources)
+        prog = translate(path, jvm, sif=sif, arp=arp, reload_resources=reload_resources,
+                         type_slice=type_slice)
         assert prog is not None
         vresult = verify(prog, path, jvm, verifier, arp=arp)
         self._evaluate_result(vresult, annotation_manager, jvm, sif)
@@ -604,23 +624,30 @@ class VerificationTest(AnnotatedTest):
 _VERIFICATION_TESTER = VerificationTest()
 
 
-def test_verification(path, verifier, sif, reload_resources, arp):
+def test_verification(path, verifier, sif, reload_resources, arp, type_slice):
     """Execute provided verification test."""
-    _VERIFICATION_TESTER.test_file(path, _JVM, verifier, sif, reload_resources, arp)
+    job = ScheduledTest(path, verifier, sif, reload_resources, arp, type_slice)
+    if _PARALLEL_RUNNER:
+        _PARALLEL_RUNNER.report(job)
+        return
+    with _measure(job):
+        _VERIFICATION_TESTER.test_file(path, _JVM, verifier, sif,
+                                       reload_resources, arp, type_slice)
 
 
 class TranslationTest(AnnotatedTest):
     """Test for testing translation errors."""
 
     def test_file(self, path: str, jvm: jvmaccess.JVM, sif: bool,
-                  reload_resources: bool, arp: bool):
+                  reload_resources: bool, arp: bool, type_slice: bool = False):
         """Test specific Python file."""
         annotation_manager = self.get_annotation_manager(path, _BACKEND_ANY)
         if annotation_manager.ignore_file():
             pytest.skip('Ignored')
         path = os.path.abspath(path)
         try:
-            translate(path, jvm, sif=sif, arp=arp, reload_resources=reload_resources)
+            translate(path, jvm, sif=sif, arp=arp, reload_resources=reload_resources,
+                      type_slice=type_slice)
             actual_errors = []
         except InvalidProgramException as exp1:
             actual_errors = [InvalidProgramError(exp1)]
@@ -636,6 +663,341 @@ class TranslationTest(AnnotatedTest):
 _TRANSLATION_TESTER = TranslationTest()
 
 
-def test_translation(path, sif, reload_resources, arp):
+def test_translation(path, sif, reload_resources, arp, type_slice):
     """Execute provided translation test."""
-    _TRANSLATION_TESTER.test_file(path, _JVM, sif, reload_resources, arp)
+    job = ScheduledTest(path, None, sif, reload_resources, arp, type_slice)
+    if _PARALLEL_RUNNER:
+        _PARALLEL_RUNNER.report(job)
+        return
+    with _measure(job):
+        _TRANSLATION_TESTER.test_file(path, _JVM, sif, reload_resources, arp,
+                                      type_slice)
+
+
+def test_sif_concurrency(paths, monkeypatch):
+    """Transform SIF programs concurrently in one JVM.
+
+    Every program is transformed with its own configuration by several
+    threads at once, and the results must be the same as those of the
+    sequential transformations done during translation. Every program is
+    also transformed without duplicating its thread domain functions, and
+    programs with and without them alternate, so configurations leaking
+    into the next transformation are detected.
+    """
+    from nagini_translation import main
+    recorded = []
+
+    def record_transformation(jvm, prog, sif_config):
+        result = transform_to_mpp(jvm, prog, sif_config)
+        recorded.append((prog, sif_config, str(result)))
+        return result
+
+    monkeypatch.setattr(main, 'transform_to_mpp', record_transformation)
+    for path in paths:
+        translate(os.path.abspath(path), _JVM, sif=True)
+    assert recorded
+
+    transformations = []
+    for prog, sif_config, expected in recorded:
+        assert sif_config.domain_funcs_to_duplicate
+        plain_config = SIFConfig(sif_config.all_low_methods,
+                                 sif_config.preserves_low_methods, (),
+                                 sif_config.ctrl_opt, sif_config.seq_opt,
+                                 sif_config.act_opt, sif_config.func_opt)
+        plain = str(transform_to_mpp(_JVM, prog, plain_config))
+        assert plain != expected
+        # Transforming the original program again must not be affected by
+        # the plain configuration.
+        assert str(transform_to_mpp(_JVM, prog, sif_config)) == expected
+        transformations.append((prog, sif_config, expected))
+        transformations.append((prog, plain_config, plain))
+
+    def transform_all(index):
+        _JVM.attach_current_thread()
+        mismatches = []
+        # Start with a different program in every thread.
+        for i in range(len(transformations)):
+            prog, sif_config, expected = transformations[
+                (index + i) % len(transformations)]
+            if str(transform_to_mpp(_JVM, prog, sif_config)) != expected:
+                mismatches.append(i)
+        return mismatches
+
+    with ThreadPoolExecutor(_SIF_CONCURRENCY_THREADS) as executor:
+        results = list(executor.map(transform_all,
+                                    range(_SIF_CONCURRENCY_THREADS)))
+    assert all(not mismatches for mismatches in results)
+
+
+# Axioms of the type domain which must (True) or must not (False) be kept when
+# the type slice tests are translated.
+_TYPE_SLICE_AXIOMS = {
+    # Non-generic classes rooted at object use a subtype table instead of the
+    # hierarchy axioms.
+    'test_closed_hierarchy.py': {
+        'subtype_table': True,
+        'issubtype_transitivity': False,
+        'issubtype_exclusion': False,
+        'issubtype_exclusion_propagation': False,
+        'tuple_arg_def': False,
+    },
+    'test_type_variables.py': {
+        'subtype_table': True,
+        'issubtype_transitivity': False,
+    },
+    # Generic classes fall back to the default axioms.
+    'test_generic_hierarchy.py': {
+        'subtype_table': False,
+        'issubtype_transitivity': True,
+        'issubtype_exclusion': True,
+        'issubtype_exclusion_propagation': True,
+    },
+    # Lists are generic, but do not need the tuple axioms.
+    'test_no_tuples.py': {
+        'subtype_table': False,
+        'issubtype_transitivity': True,
+        'tuple_arg_def': False,
+        'tuple_args_def': False,
+        'tuple_self_subtype': False,
+    },
+}
+
+
+def test_type_slice_domain(path):
+    """Check which type axioms the translation with a type slice keeps."""
+    prog = translate(os.path.abspath(path), _JVM, type_slice=True)
+    kept = set(re.findall(r'axiom (\w+)', str(prog)))
+    expected = _TYPE_SLICE_AXIOMS[os.path.basename(path)]
+    assert {name: name in kept for name in expected} == expected
+
+
+_PASSED = 'passed'
+_SKIPPED = 'skipped'
+_FAILED = 'failed'
+
+
+class ScheduledTest:
+    """A single test, i.e., a test file together with its parameters.
+
+    Jobs with a verifier are verification tests, the others are
+    translation tests.
+    """
+
+    def __init__(self, path: str, verifier: Optional[ViperVerifier],
+                 sif: bool, reload_resources: bool, arp: bool,
+                 type_slice: bool) -> None:
+        self.path = path
+        self.verifier = verifier
+        self.sif = sif
+        self.reload_resources = reload_resources
+        self.arp = arp
+        self.type_slice = type_slice
+
+    @property
+    def key(self) -> str:
+        params = 'sif={:d}:arp={:d}:reload={:d}:slice={:d}'.format(
+            self.sif, self.arp, self.reload_resources, self.type_slice)
+        if self.verifier:
+            return 'verification:{}:{}:{}'.format(self.verifier.name, params,
+                                                  self.path)
+        return 'translation:{}:{}'.format(params, self.path)
+
+
+def _run_job(job: ScheduledTest) -> Tuple[str, str, float]:
+    """Run a test in a worker process of a ``ParallelTestRunner``.
+
+    Returns the outcome of the test, the skip reason or failure traceback,
+    and the duration of the test.
+    """
+    start = time.time()
+    try:
+        if job.verifier:
+            _VERIFICATION_TESTER.test_file(
+                job.path, _JVM, job.verifier, job.sif, job.reload_resources,
+                job.arp, job.type_slice)
+        else:
+            _TRANSLATION_TESTER.test_file(
+                job.path, _JVM, job.sif, job.reload_resources, job.arp,
+                job.type_slice)
+        outcome, message = _PASSED, ''
+    except pytest.skip.Exception as exc:
+        outcome, message = _SKIPPED, exc.msg
+    except Exception:
+        outcome, message = _FAILED, traceback.format_exc()
+    return outcome, message, time.time() - start
+
+
+class RunTimings:
+    """The outcomes and durations of tests, as written to the timings file.
+
+    The entries of the previous run are loaded when the timings are created,
+    and entries of tests that are not run again are kept.
+    """
+
+    def __init__(self, path: str, workers: int) -> None:
+        self.path = path
+        self.workers = workers
+        self.previous = self._load()
+        self.tests = dict(self.previous)
+        self.total_time = 0.0
+        # Number of tests recorded in this run.
+        self.recorded = 0
+        self._start = time.time()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, 'r') as fp:
+                return json.load(fp)['tests']
+        except (OSError, ValueError, KeyError, TypeError):
+            return {}
+
+    def expected_duration(self, job: ScheduledTest) -> float:
+        """The duration of the job in the previous run, if known."""
+        # Jobs without recorded duration (e.g. new tests) come first.
+        entry = self.previous.get(job.key)
+        if not isinstance(entry, dict):
+            return float('inf')
+        return entry.get('duration', float('inf'))
+
+    def record(self, job: ScheduledTest, outcome: str, duration: float) -> None:
+        self.recorded += 1
+        self.total_time += duration
+        self.tests[job.key] = {
+            'path': job.path,
+            'verifier': job.verifier.name if job.verifier else None,
+            'sif': job.sif,
+            'arp': job.arp,
+            'reload_resources': job.reload_resources,
+            'type_slice': job.type_slice,
+            'outcome': outcome,
+            'duration': duration,
+        }
+
+    @contextmanager
+    def measure(self, job: ScheduledTest):
+        """Record the outcome and duration of a job run in this process."""
+        start = time.time()
+        outcome = _FAILED
+        try:
+            yield
+            outcome = _PASSED
+        except pytest.skip.Exception:
+            outcome = _SKIPPED
+            raise
+        finally:
+            self.record(job, outcome, time.time() - start)
+
+    def write(self) -> None:
+        """Write the timings file, unless no test was recorded in this run."""
+        if not self.recorded:
+            return
+        report = {
+            'workers': self.workers,
+            'wall_time': time.time() - self._start,
+            'total_time': self.total_time,
+            'tests': self.tests,
+        }
+        try:
+            with open(self.path, 'w') as fp:
+                json.dump(report, fp, indent=2, sort_keys=True)
+        except OSError as exc:
+            print('Could not write test timings: {}'.format(exc))
+
+
+class ParallelTestRunner:
+    """Runs tests in a pool of worker processes.
+
+    Every worker imports this module and thus starts its own JVM once;
+    backends are kept running between tests by the backend pool of the
+    worker. All jobs are submitted up front, longest first according to
+    the durations recorded in the timings file, s.t. long tests do not end
+    up at the end of the run. The test functions then only report the
+    outcomes computed by the workers. If a worker dies (e.g. because the
+    JVM or Z3 crashed), the tests still waiting for a result fail instead
+    of waiting forever.
+    """
+
+    def __init__(self, workers: int, timings: RunTimings) -> None:
+        self.workers = workers
+        self.timings = timings
+        self._pool = None
+        self._pending = {}
+
+    def start(self, jobs: List[ScheduledTest]) -> None:
+        """Start running the given jobs."""
+        jobs = sorted(jobs, key=self.timings.expected_duration, reverse=True)
+        # Workers are spawned instead of forked, since the JVM of this
+        # process cannot be used from a forked child.
+        if sys.version_info >= (3, 7):
+            context = multiprocessing.get_context('spawn')
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=context)
+        else:
+            # Before Python 3.7, the executor always uses the default start
+            # method.
+            multiprocessing.set_start_method('spawn', force=True)
+            self._pool = ProcessPoolExecutor(self.workers)
+        for job in jobs:
+            self._pending[job.key] = self._pool.submit(_run_job, job)
+
+    def report(self, job: ScheduledTest) -> None:
+        """Wait for the given job and report its outcome to pytest."""
+        pending = self._pending.pop(job.key, None)
+        assert pending, 'Test was not scheduled: {}'.format(job.key)
+        try:
+            outcome, message, duration = pending.result()
+        except BrokenProcessPool as exc:
+            outcome, duration = _FAILED, 0.0
+            message = 'Worker process died: {}'.format(exc)
+        self.timings.record(job, outcome, duration)
+        if outcome == _SKIPPED:
+            pytest.skip(message)
+        elif outcome == _FAILED:
+            pytest.fail(message, pytrace=False)
+
+    def stop(self) -> None:
+        """Stop the workers, cancelling the jobs which have not started."""
+        for pending in self._pending.values():
+            pending.cancel()
+        self._pending.clear()
+        self._pool.shutdown(wait=True)
+
+
+_PARALLEL_RUNNER = None
+_TIMINGS = None
+
+
+def start_timings(workers: int, timings_path: str) -> None:
+    """Record the outcomes and durations of the tests run in this session."""
+    global _TIMINGS
+    _TIMINGS = RunTimings(timings_path, workers)
+
+
+def start_parallel_runner(workers: int, jobs: List[ScheduledTest]) -> None:
+    """Run the given jobs in parallel instead of in the test functions."""
+    global _PARALLEL_RUNNER
+    _PARALLEL_RUNNER = ParallelTestRunner(workers, _TIMINGS)
+    _PARALLEL_RUNNER.start(jobs)
+
+
+def stop_test_runs() -> None:
+    """Stop the worker processes, if any, and write the timings file.
+
+    The timings file is only written if a test was measured in this session.
+    """
+    global _PARALLEL_RUNNER, _TIMINGS
+    if _PARALLEL_RUNNER:
+        _PARALLEL_RUNNER.stop()
+        _PARALLEL_RUNNER = None
+    if _TIMINGS:
+        _TIMINGS.write()
+        _TIMINGS = None
+
+
+@contextmanager
+def _measure(job: ScheduledTest):
+    """Record the timing of a job run by its test function, if enabled."""
+    if _TIMINGS:
+        with _TIMINGS.measure(job):
+            yield
+    else:
+        yield
@@ -13,7 +13,7 @@ from nagini_translation.lib.program_nodes import (
     PythonMethod,
     PythonNode,
 )
-from nagini_translation.lib.resolver import get_target
+from nagini_translation.lib.resolver import get_target, resolution_cache
 from nagini_translation.lib.typeinfo import TypeInfo
 from nagini_translation.lib.viper_ast import ViperAST
 from nagini_translation.translators.abstract import (
@@ -83,19 +83,27 @@ class Translator:
         config.type_factory = TypeDomainFactory(viper_ast, self)
         self.obligation_translator = config.obligation_translator
         self.prog_translator = config.prog_translator
+        self.call_translator = config.call_translator
         self.expr_translator = config.expr_translator
 
     def translate_program(self, modules: List[PythonModule], sil_progs: List,
                           selected: Set[str] = None,
                           ignore_global: bool = False,
-                          arp: bool = False) -> 'silver.ast.Program':
+                          arp: bool = False,
+                          parts: List = None,
+                          type_slice: bool = False) -> 'silver.ast.Program':
         ctx = Context()
         ctx.current_class = None
         ctx.current_function = None
         ctx.module = modules[0]
         ctx.arp = arp
-        return self.prog_translator.translate_program(modules, sil_progs, ctx,
-                                                      selected, ignore_global)
+        resolution_cache.start()
+        try:
+            return self.prog_translator.translate_program(
+                modules, sil_progs, ctx, selected, ignore_global, parts,
+                type_slice)
+        finally:
+            resolution_cache.stop()
 
     def translate_pythonvar_decl(self, var: PythonVar,
             module: PythonModule) -> 'silver.ast.LocalVarDecl':
@@ -21,6 +21,7 @@ from nagini_translation.lib.program_nodes import (
     PythonVar,
 )
 from nagini_translation.lib.jvmaccess import JVM
+from nagini_translation.lib.profiling import profiler
 from nagini_translation.lib.typedefs import (
     Expr,
     Info,
@@ -127,7 +128,9 @@ class AbstractTranslator(metaclass=ABCMeta):
 
     def translate_predicate(self, pred: PythonMethod,
                             ctx: Context) -> 'ast.silver.Predicate':
-        return self.config.pred_translator.translate_predicate(pred, ctx)
+        return profiler.translate_member(
+            'predicate', pred, self.viper,
+            self.config.pred_translator.translate_predicate, pred, ctx)
 
     def translate_static_field_access(self, field: PythonGlobalVar,
                                       receiver: Union[Expr, PythonType],
@@ -149,13 +152,16 @@ class AbstractTranslator(metaclass=ABCMeta):
                 List['ast.silver.Function'],
                 List['ast.silver.Method'],
                 ]:
-        return self.config.io_operation_translator.translate_io_operation(
-            operation,
-            ctx)
+        return profiler.translate_member(
+            'io_operation', operation, self.viper,
+            self.config.io_operation_translator.translate_io_operation,
+            operation, ctx)
 
     def translate_method(self, method: PythonMethod,
                          ctx: Context) -> 'silver.ast.Method':
-        return self.config.method_translator.translate_method(method, ctx)
+        return profiler.translate_member(
+            'method', method, self.viper,
+            self.config.method_translator.translate_method, method, ctx)
 
     def translate_main_method(self, modules: List[PythonModule],
                               ctx: Context) -> 'silver.ast.Method':
@@ -163,13 +169,16 @@ class AbstractTranslator(metaclass=ABCMeta):
 
     def translate_function(self, func: PythonMethod,
                            ctx: Context) -> 'silver.ast.Function':
-        return self.config.method_translator.translate_function(func, ctx)
+        return profiler.translate_member(
+            'function', func, self.viper,
+            self.config.method_translator.translate_function, func, ctx)
 
     def translate_predicate_family(self, root: PythonMethod,
             preds: List[PythonMethod], ctx: Context) -> 'ast.silver.Predicate':
-        return self.config.pred_translator.translate_predicate_family(root,
-                                                                      preds,
-                                                                      ctx)
+        return profiler.translate_member(
+            'predicate_family', root, self.viper,
+            self.config.pred_translator.translate_predicate_family, root,
+            preds, ctx)
 
     def translate_operator(self, left: Expr, right: Expr, left_type: PythonType,
                            right_type: PythonType, node: ast.AST,
@@ -42,6 +42,7 @@ from nagini_translation.lib.constants import (
     TUPLE_TYPE,
 )
 from nagini_translation.lib.errors import rules
+from nagini_translation.lib.inline_templates import InlineTemplates
 from nagini_translation.lib.program_nodes import (
     chain_cond_exp,
     GenericType,
@@ -80,6 +81,11 @@ from nagini_translation.translators.common import CommonTranslator
 
 class CallTranslator(CommonTranslator):
 
+    def __init__(self, config: 'TranslatorConfig', jvm: 'JVM', source_file: str,
+                 type_info: 'TypeInfo', viper_ast: 'ViperAST') -> None:
+        super().__init__(config, jvm, source_file, type_info, viper_ast)
+        # Templates of the bodies of inlined methods, see inline_method.
+        self.inline_templates = InlineTemplates(viper_ast)
 
     def _translate_isinstance(self, node: ast.Call,
                               ctx: Context) -> StmtsAndExpr:
@@ -904,12 +910,16 @@ class CallTranslator(CommonTranslator):
                                      self.no_info(ctx))
         ctx.added_handlers.append((method, ctx.var_aliases, ctx.label_aliases))
 
-        # Translate body
-        start, end = get_body_indices(method.node.body)
-        stmts = []
+        # Translate body, or instantiate its template for this call site
+        def translate_body() -> List[Stmt]:
+            start, end = get_body_indices(method.node.body)
+            stmts = []
+            for stmt in method.node.body[start:end]:
+                stmts += self.translate_stmt(stmt, ctx)
+            return stmts
 
-        for stmt in method.node.body[start:end]:
-            stmts += self.translate_stmt(stmt, ctx)
+        stmts = self.inline_templates.translate_body(method, translate_body,
+                                                     ctx)
 
         ctx.inlined_calls.remove(method)
         ctx.var_aliases = old_var_aliases
@@ -924,6 +934,16 @@ class CallTranslator(CommonTranslator):
         of the call node.
         """
         assert ctx.current_function
+        return self.inline_templates.inline_call(
+            self._translate_inlined_call, method, node, is_super,
+            inline_reason, ctx)
+
+    def _translate_inlined_call(self, method: PythonMethod, node: ast.Call,
+                                is_super: bool, inline_reason: str,
+                                ctx: Context) -> StmtsAndExpr:
+        """
+        Inlines a call as described in _inline_call.
+        """
         if method in ctx.inlined_calls:
             raise InvalidProgramException(node, 'recursive.static.call')
         position = self.to_position(node, ctx)
@@ -5,8 +5,9 @@ file, You can obtain one at http://mozilla.org/MPL/2.0/.
 """
 
 import ast
+import re
 from collections import OrderedDict
-from typing import List, Set, Tuple
+from typing import Iterable, List, Optional, Set, Tuple
 
 from nagini_translation.lib.constants import (
     ARBITRARY_BOOL_FUNC,
@@ -23,6 +24,7 @@ from nagini_translation.lib.constants import (
     JOINABLE_FUNC,
     MAY_SET_PRED,
     METHOD_ID_DOMAIN,
+    OBJECT_TYPE,
     PRIMITIVES,
     RESULT_NAME,
     STRING_TYPE,
@@ -49,6 +51,7 @@ from nagini_translation.lib.typedefs import (
     Function,
     Info,
     Method,
+    Node,
     Position,
     Predicate,
     Program,
@@ -64,11 +67,121 @@ from nagini_translation.translators.abstract import Context
 from nagini_translation.translators.common import CommonTranslator
 
 
+class ProgramPart:
+    """
+    A part of a program which can be verified independently of the rest,
+    see ``ProgramTranslator._split_program``.
+    """
+
+    def __init__(self, name: Optional[str], program: Program,
+                 shared: List[Node], members: List[Node]) -> None:
+        # Silver name of the method verified by this part, None for the
+        # part containing the rest of the program.
+        self.name = name
+        self.program = program
+        # Domains and fields, which are the same in all parts.
+        self.shared = shared
+        # Functions, predicates and methods contained in this part.
+        self.members = members
+
+
+IDENTIFIER = re.compile(r"[A-Za-z_$][A-Za-z0-9_$']*")
+
+
+class PreambleIndex:
+    """
+    The names referenced by the members of a Silver program parsed from the
+    resources, used to determine which of them a translated program needs.
+    Since parsed resources are reused, every program is indexed only once
+    (see ``get``).
+    """
+
+    _indexes = {}
+
+    # Maximum number of indexed programs; there is one program with and one
+    # without the SIF resources, the rest are left over from reloads.
+    _max_indexes = 4
+
+    def __init__(self, viper: 'ViperAST', program: Program) -> None:
+        # Names referenced by every function, method, predicate, domain
+        # function and domain. A domain function references its domain.
+        self.references = {}
+        # Keys of the axioms that mention a domain function, by function name,
+        # and of the axioms which mention none, by domain name.
+        self.axioms = {}
+        # Names referenced by every axiom, by key (domain name and index).
+        self.axiom_references = {}
+        members = (viper.to_list(program.functions()) +
+                   viper.to_list(program.methods()) +
+                   viper.to_list(program.predicates()))
+        for member in members:
+            self.references[member.name()] = self._referenced_names(member)
+        domains = viper.to_list(program.domains())
+        domain_functions = set()
+        for domain in domains:
+            for function in viper.to_list(domain.functions()):
+                references = self._referenced_names(function)
+                references.add(domain.name())
+                self.references[function.name()] = references
+                domain_functions.add(function.name())
+        for domain in domains:
+            for index, axiom in enumerate(viper.to_list(domain.axioms())):
+                key = (domain.name(), index)
+                references = self._referenced_names(axiom)
+                self.axiom_references[key] = references
+                mentioned = references & domain_functions
+                for name in mentioned or [domain.name()]:
+                    self.axioms.setdefault(name, []).append(key)
+
+    def _referenced_names(self, node: Node) -> Set[str]:
+        return set(IDENTIFIER.findall(str(node)))
+
+    @classmethod
+    def get(cls, viper: 'ViperAST', program: Program) -> 'PreambleIndex':
+        entry = cls._indexes.get(id(program))
+        if entry is None or entry[0] is not program:
+            if len(cls._indexes) >= cls._max_indexes:
+                cls._indexes.clear()
+            entry = (program, cls(viper, program))
+            cls._indexes[id(program)] = entry
+        return entry[1]
+
+    def reachable(self, roots: Iterable[str]) -> Tuple[Set[str],
+                                                       Set[Tuple[str, int]]]:
+        """
+        Returns the names of all members (transitively) referenced by the
+        given names, and the keys of all axioms to keep. An axiom is kept if
+        it mentions a reachable domain function, or if it mentions none and
+        its domain is reachable; everything it references is reachable as
+        well.
+        """
+        names = set()
+        axioms = set()
+        to_visit = list(roots)
+        while to_visit:
+            name = to_visit.pop()
+            if name in names:
+                continue
+            names.add(name)
+            to_visit.extend(self.references.get(name, ()))
+            for key in self.axioms.get(name, ()):
+                if key not in axioms:
+                    axioms.add(key)
+                    to_visit.extend(self.axiom_references[key])
+        return names, axioms
+
+
 class ProgramTranslator(CommonTranslator):
     def __init__(self, config: 'TranslatorConfig', jvm: 'JVM', source_file: str,
                  type_info: 'TypeInfo', viper_ast: 'ViperAST') -> None:
         super().__init__(config, jvm, source_file, type_info, viper_ast)
         self.required_names = {}
+        # If set, dependencies are tracked for all program elements, not just
+        # for selected ones.
+        self.track_all = False
+        # Numbers of builtin elements before and after pruning those the
+        # program does not need, by kind.
+        self.pruning = OrderedDict()
 
     def translate_field(self, field: PythonField,
                         ctx: Context) -> 'silver.ast.Field':
@@ -492,14 +605,22 @@ class ProgramTranslator(CommonTranslator):
 
     def _convert_silver_elements(
             self, sil_progs: Program, all_used: List[str],
+            translated_names: Set[str],
             ctx: Context) -> Tuple[List[Domain],
                                    List[Predicate],
                                    List[Function],
-                                   List[Method]]:
+                                   List[Method],
+                                   Set[str]]:
         """
         Extracts domains, functions, predicates and methods from the given list
         of Silver programs, applies the necessary conversions (e.g. related to
-        obligations) to them, and returns them in separate lists.
+        obligations) to them, and returns them in separate lists, together
+        with the names of all elements the program needs.
+
+        Only the methods and functions which are used are extracted, and of
+        the domains, domain functions, axioms and predicates only those which
+        are reachable from them or from the names used by the translated
+        elements (``translated_names``).
         """
         domains = []
         functions = []
@@ -540,30 +661,111 @@ class ProgramTranslator(CommonTranslator):
         # requirements (which should never be the case).
         self._add_all_used_names(used_names)
 
-        domains += [
-            domain for domain in self.viper.to_list(sil_progs.domains())
-            if domain.name() != 'PyType']
+        index = PreambleIndex.get(self.viper, sil_progs)
+        reachable, axioms = index.reachable(used_names | translated_names)
+
+        all_domains = [domain
+                       for domain in self.viper.to_list(sil_progs.domains())
+                       if domain.name() != 'PyType']
+        all_functions = self.viper.to_list(sil_progs.functions())
+        all_predicates = self.viper.to_list(sil_progs.predicates())
+        domain_functions = [0, 0]
+        domain_axioms = [0, 0]
+        for domain in all_domains:
+            pruned = self._prune_domain(domain, reachable, axioms)
+            domain_functions[0] += domain.functions().size()
+            domain_axioms[0] += domain.axioms().size()
+            if pruned:
+                domains.append(pruned)
+                domain_functions[1] += pruned.functions().size()
+                domain_axioms[1] += pruned.axioms().size()
 
         functions += [
-            function
-            for function in self.viper.to_list(sil_progs.functions())
+            function for function in all_functions
             if function.name() in used_names]
-        predicates += self.viper.to_list(sil_progs.predicates())
-
-        return domains, predicates, functions, methods
+        predicates += [predicate for predicate in all_predicates
+                       if predicate.name() in reachable]
+
+        self.pruning['domains'] = (len(all_domains), len(domains))
+        self.pruning['domain functions'] = tuple(domain_functions)
+        self.pruning['axioms'] = tuple(domain_axioms)
+        self.pruning['functions'] = (len(all_functions), len(functions))
+        self.pruning['predicates'] = (len(all_predicates), len(predicates))
+        return domains, predicates, functions, methods, reachable
+
+    def _prune_domain(self, domain: Domain, reachable: Set[str],
+                      axioms: Set[Tuple[str, int]]) -> Optional[Domain]:
+        """
+        Returns the given builtin domain reduced to its reachable functions
+        and the given axioms, or None if the domain is not reachable.
+        """
+        name = domain.name()
+        if name not in reachable:
+            return None
+        all_functions = self.viper.to_list(domain.functions())
+        all_axioms = self.viper.to_list(domain.axioms())
+        domain_functions = [function for function in all_functions
+                            if function.name() in reachable]
+        domain_axioms = [axiom for index, axiom in enumerate(all_axioms)
+                         if (name, index) in axioms]
+        if (len(domain_functions) == len(all_functions) and
+                len(domain_axioms) == len(all_axioms)):
+            return domain
+        return self.viper.Domain(name, domain_functions, domain_axioms,
+                                 self.viper.to_list(domain.typVars()),
+                                 domain.pos(), domain.info())
+
+    def _slice_types(self, class_types: List[Tuple[PythonClass,
+                                                   List[DomainFunc],
+                                                   List[DomainAxiom],
+                                                   Set[str]]],
+                     names: Set[str]) -> List[Tuple[PythonClass,
+                                                    List[DomainFunc],
+                                                    List[DomainAxiom],
+                                                    Set[str]]]:
+        """
+        Returns the entries of the given list of class types which are needed
+        by a program using the given names, i.e., those of the types whose
+        functions are used, of the types their axioms use, and of ``object``
+        and ``NoneType``, which the default axioms use.
+        """
+        by_name = {}
+        for entry in class_types:
+            name = entry[0].sil_name
+            for func_name in (name, name + '_arg', name + '_basic'):
+                by_name[func_name] = entry
+        to_visit = [entry[0].sil_name for entry in class_types
+                    if entry[0].name in (OBJECT_TYPE, 'NoneType')]
+        to_visit.extend(name for name in names if name in by_name)
+        needed = set()
+        while to_visit:
+            cls, _, _, used_names = by_name[to_visit.pop()]
+            if cls in needed:
+                continue
+            needed.add(cls)
+            to_visit.extend(name for name in used_names if name in by_name)
+        return [entry for entry in class_types if entry[0] in needed]
+
+    def pruning_statistics(self) -> str:
+        """
+        Returns a description of how many builtin elements were kept.
+        """
+        return 'Kept builtin elements: ' + ', '.join(
+            '{} of {} {}'.format(after, before, kind)
+            for kind, (before, after) in self.pruning.items()) + '.'
 
     def track_dependencies(self, selected_names: List[str], selected: Set[str],
                            node: PythonNode, ctx: Context) -> None:
         """
-        If specific parts of the program have been selected to be verified,
-        marks that the given PythonNode is about to be translated, s.t. it can
-        be tracked which other elements are referenced by the translation of
-        this node. Also checks if the given element is among those selected
-        to be verified, and adds its Silver name to the list of selected Silver
-        names later used when computing which parts of the program to give to
-        Viper.
+        If specific parts of the program have been selected to be verified (or
+        the program is going to be split), marks that the given PythonNode is
+        about to be translated, s.t. it can be tracked which other elements are
+        referenced by the translation of this node. Also checks if the given
+        element is among those selected to be verified, and adds its Silver
+        name to the list of selected Silver names later used when computing
+        which parts of the program to give to Viper.
         """
-        if not selected:
+        if not selected and not self.track_all:
             return
         if node.sil_name in self.viper.used_names_sets:
             used_names = self.viper.used_names_sets[node.sil_name]
@@ -573,11 +775,122 @@ class ProgramTranslator(CommonTranslator):
         self.viper.used_names_sets[node.sil_name] = used_names
         if selected_names is None:
             return
-        if (node.name in selected or
+        if (self.track_all or node.name in selected or
                 (hasattr(node, 'cls') and node.cls and
                  node.cls.name + '.' + node.name in selected)):
             selected_names.append(node.sil_name)
 
+    def _dependency_closure(self, names: Iterable[str]) -> List[str]:
+        """
+        Returns the given names together with the names of all elements they
+        (transitively) depend on, according to the tracked dependencies.
+        """
+        result = list(names)
+        seen = set(result)
+        i = 0
+        while i < len(result):
+            name = result[i]
+            to_add = set()
+            if name in self.viper.used_names_sets:
+                to_add = self.viper.used_names_sets[name]
+            if name in self.required_names:
+                to_add = self.required_names[name]
+            for add in to_add:
+                if add not in seen:
+                    seen.add(add)
+                    result.append(add)
+            i += 1
+        return result
+
+    def _method_stub(self, method: Method, ctx: Context) -> Method:
+        """
+        Returns a copy of the given method without body, i.e., a method
+        which can be called but is not verified itself.
+        """
+        return self.viper.Method(method.name(),
+                                 self.viper.to_list(method.formalArgs()),
+                                 self.viper.to_list(method.formalReturns()),
+                                 self.viper.to_list(method.pres()),
+                                 self.viper.to_list(method.posts()), [], None,
+                                 method.pos(), method.info())
+
+    def _split_program(self, member_names: List[str], domains: List[Domain],
+                       fields: List[Field], functions: List[Function],
+                       predicates: List[Predicate], methods: List[Method],
+                       builtin_predicates: Set[str],
+                       ctx: Context) -> List['ProgramPart']:
+        """
+        Splits the program into independent parts which can be verified
+        separately: One for every translated method, containing the method
+        itself and everything it depends on (with all other methods reduced
+        to their signatures), and one for the remaining program, in which
+        exactly those methods are reduced to their signatures.
+
+        The whole program is checked for consistency separately, and a part
+        only differs from it in the functions, predicates and methods it
+        contains. Instead of checking every part as a whole, it is therefore
+        only checked that its members do not reference any of the others;
+        if they do, the dependencies of the method were not tracked
+        completely, and it is verified as part of the remaining program.
+        """
+        members = set(member_names)
+        no_pos = self.no_position(ctx)
+        no_info = self.no_info(ctx)
+        shared = domains + fields
+        method_names = [m.name() for m in methods]
+        function_names = [f.name() for f in functions]
+        predicate_names = [p.name() for p in predicates]
+        all_names = set(method_names + function_names + predicate_names)
+        stubs = {}
+        # Names of the functions, predicates and methods referenced by a
+        # member, keyed by the identity of the member.
+        references = {}
+
+        def stub(method: Method, name: str) -> Method:
+            if name not in stubs:
+                stubs[name] = self._method_stub(method, ctx)
+            return stubs[name]
+
+        def referenced_names(member: Node) -> Set[str]:
+            key = id(member)
+            if key not in references:
+                names = set(IDENTIFIER.findall(str(member)))
+                references[key] = names & all_names
+            return references[key]
+
+        parts = []
+        split_names = set()
+        for method, name in zip(methods, method_names):
+            if name not in members or self.viper.from_option(method.body()) is None:
+                continue
+            closure = set(self._dependency_closure([name]))
+            part_methods = [m if m is method else stub(m, n)
+                            for m, n in zip(methods, method_names)
+                            if n in closure]
+            part_functions = [f for f, n in zip(functions, function_names)
+                              if n in closure]
+            part_predicates = [p for p, n in zip(predicates, predicate_names)
+                               if n in closure or n in builtin_predicates]
+            part_members = part_functions + part_predicates + part_methods
+            contained = closure | builtin_predicates
+            if any(referenced_names(member) - contained
+                   for member in part_members):
+                # Dependency tracking is incomplete for this method, so it
+                # has to be verified as part of the remaining program.
+                continue
+            part = self.viper.Program(domains, fields, part_functions,
+                                      part_predicates, part_methods, no_pos,
+                                      no_info)
+            parts.append(ProgramPart(name, part, shared, part_members))
+            split_names.add(name)
+        rest_methods = [stub(m, n) if n in split_names else m
+                        for m, n in zip(methods, method_names)]
+        rest = self.viper.Program(domains, fields, functions, predicates,
+                                  rest_methods, no_pos, no_info)
+        parts.append(ProgramPart(None, rest, shared,
+                                 functions + predicates + rest_methods))
+        return parts
+
     def create_functions_domain(self, constants: List, ctx: Context):
         return self.viper.Domain(FUNCTION_DOMAIN_NAME, constants, [], [],
                                  self.no_position(ctx), self.no_info(ctx))
@@ -631,8 +944,8 @@ class ProgramTranslator(CommonTranslator):
         domain = self.viper.Domain(THREAD_DOMAIN, [get_method, get_arg, get_old], [], [],
                                    pos, info)
         if isinstance(self.viper, ViperASTExtended):
-            self.viper.ast_extensions.SIFExtendedTransformer.addDomainFuncToDuplicate(
-                self.viper.to_seq([get_method, get_arg, get_old]))
+            self.viper.domain_funcs_to_duplicate.extend(
+                [get_method, get_arg, get_old])
         return domain
 
     def create_definedness_functions(self, ctx: Context) -> List['silver.ast.Function']:
@@ -1116,11 +1429,24 @@ class ProgramTranslator(CommonTranslator):
 
     def translate_program(self, modules: List[PythonModule], sil_progs: Program,
                           ctx: Context, selected: Set[str] = None,
-                          ignore_global: bool = False) -> Program:
+                          ignore_global: bool = False,
+                          parts: List[ProgramPart] = None,
+                          type_slice: bool = False) -> Program:
         """
         Translates the PythonModules created by the analyzer to a Viper program.
+        If a list of parts is given, the program is additionally split into
+        independently verifiable parts (see ``_split_program``), one for
+        every selected method (or every method if none are selected), which
+        are added to the list. If
+        ``type_slice`` is set, the type domain only contains the types the
+        program needs (see ``_slice_types``).
         """
-        fields = self._create_predefined_fields(ctx)
+        split = parts is not None
+        self.track_all = split and not selected
+        # Names used by elements which are not tracked individually.
+        untracked_names = self.viper.used_names
+        predefined_fields = self._create_predefined_fields(ctx)
+        fields = list(predefined_fields)
         domains = []
         predicates = []
         functions = []
@@ -1140,6 +1466,9 @@ class ProgramTranslator(CommonTranslator):
 
         type_funcs = self.type_factory.get_default_functions(ctx)
         type_axioms = self.type_factory.get_default_axioms(ctx)
+        # Type functions and axioms of every class, together with the names
+        # they use.
+        class_types = []
 
         predicate_families = OrderedDict()
         static_fields = OrderedDict()
@@ -1224,10 +1553,13 @@ class ProgramTranslator(CommonTranslator):
                     adt_list.append(cls)
                 old_class = ctx.current_class
                 ctx.current_class = cls
+                # The names used by the type of a class are recorded
+                # separately, they are only needed if the type is.
+                used_names = self.viper.used_names
+                self.viper.used_names = set()
                 funcs, axioms = self.type_factory.create_type(cls, ctx)
-                type_funcs.extend(funcs)
-                if axioms:
-                    type_axioms.extend(axioms)
+                class_types.append((cls, funcs, axioms, self.viper.used_names))
+                self.viper.used_names = used_names
                 for func_name in cls.functions:
                     func = cls.functions[func_name]
                     if func.interface:
@@ -1284,9 +1616,15 @@ class ProgramTranslator(CommonTranslator):
                 ctx.current_class = old_class
 
         if not ignore_global:
+            if selected or split:
+                # The main method does not exist before its translation, so
+                # the names it uses are collected separately.
+                self.viper.used_names = set()
+            main_names = self.viper.used_names
             main_py_method, main_method = self.translate_main_method(modules, ctx)
             methods.append(main_method)
             self.track_dependencies(selected_names, selected, main_py_method, ctx)
+            self.viper.used_names.update(main_names)
 
         # Translate global variables.
         for module in modules:
@@ -1322,27 +1660,21 @@ class ProgramTranslator(CommonTranslator):
         all_used_names = None
         if selected:
             # Compute all dependencies of directly selected methods/...
-            all_used_names = list(selected_names)
-            i = 0
-            while i < len(all_used_names):
-                name = all_used_names[i]
-                to_add = set()
-                if name in self.viper.used_names_sets:
-                    to_add = self.viper.used_names_sets[name]
-                if name in self.required_names:
-                    to_add = self.required_names[name]
-                for add in to_add:
-                    if not add in all_used_names:
-                        all_used_names.append(add)
-                i += 1
+            all_used_names = self._dependency_closure(selected_names)
 
             # Filter out anything the selected part does not depend on.
             predicates = [p for p in predicates if p.name() in all_used_names]
             functions = [f for f in functions if f.name() in all_used_names]
             methods = [m for m in methods if m.name() in all_used_names]
+        elif split:
+            # Everything is used, but the names are spread over the tracked
+            # sets.
+            tracked_names = set(untracked_names)
+            for used_names in self.viper.used_names_sets.values():
+                tracked_names.update(used_names)
+            all_used_names = self._dependency_closure(
+                selected_names + sorted(tracked_names))
 
-        domains.append(self.type_factory.create_type_domain(type_funcs,
-                                                            type_axioms, ctx))
         domains.append(self.create_thread_domain(ctx))
         domains.append(self.create_functions_domain(func_constants, ctx))
         domains.append(self.create_method_id_domain(threading_ids_constants, ctx))
@@ -1351,9 +1683,33 @@ class ProgramTranslator(CommonTranslator):
         domains.extend(adts_domains)
         functions.extend(adts_functions)
 
-        converted_sil_progs = self._convert_silver_elements(sil_progs,
-                                                            all_used_names, ctx)
-        s_domains, s_predicates, s_functions, s_methods = converted_sil_progs
+        # Names used by any translated element, including those which are not
+        # selected and the domains, which are never filtered.
+        translated_names = set(untracked_names)
+        translated_names.update(self.viper.used_names)
+        for used_names in self.viper.used_names_sets.values():
+            translated_names.update(used_names)
+        converted_sil_progs = self._convert_silver_elements(
+            sil_progs, all_used_names, translated_names, ctx)
+        s_domains, s_predicates, s_functions, s_methods, reachable = (
+            converted_sil_progs)
+        kept_fields = [field for field in predefined_fields
+                       if field.name() in reachable]
+        self.pruning['fields'] = (len(predefined_fields), len(kept_fields))
+        fields = kept_fields + fields[len(predefined_fields):]
+
+        if type_slice:
+            sliced_types = self._slice_types(class_types, reachable)
+            self.pruning['types'] = (len(class_types), len(sliced_types))
+            class_types = sliced_types
+            type_axioms = self.type_factory.slice_default_axioms(
+                type_axioms, [cls for cls, _, _, _ in class_types], ctx)
+        for _, funcs, axioms, _ in class_types:
+            type_funcs.extend(funcs)
+            type_axioms.extend(axioms)
+        domains.insert(0, self.type_factory.create_type_domain(type_funcs,
+                                                               type_axioms,
+                                                               ctx))
         domains += s_domains
         predicates += s_predicates
         functions += s_functions
@@ -1362,4 +1718,10 @@ class ProgramTranslator(CommonTranslator):
         prog = self.viper.Program(domains, fields, functions, predicates,
                                   methods, self.no_position(ctx),
                                   self.no_info(ctx))
+        if split:
+            builtin_predicates = set(p.name() for p in s_predicates)
+            parts.extend(self._split_program(selected_names, domains, fields,
+                                             functions, predicates, methods,
+                                             builtin_predicates, ctx))
+        self.track_all = False
         return prog
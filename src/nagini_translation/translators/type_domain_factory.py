@@ -17,7 +17,7 @@ from nagini_translation.lib.program_nodes import (
 )
 from nagini_translation.lib.viper_ast import ViperAST
 from nagini_translation.translators.abstract import Context, Expr
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 
 class TypeDomainFactory:
@@ -27,6 +27,14 @@ class TypeDomainFactory:
     """
     UNION_TYPE_SIZE = 4
 
+    # Default axioms which relate arbitrary types of the hierarchy, and which
+    # can be replaced by a subtype table for closed hierarchies.
+    HIERARCHY_AXIOMS = ('issubtype_transitivity', 'issubtype_exclusion',
+                        'issubtype_exclusion_propagation')
+
+    # Default axioms about tuple types.
+    TUPLE_AXIOMS = ('tuple_arg_def', 'tuple_args_def', 'tuple_self_subtype')
+
     def __init__(self, viper: ViperAST, translator: 'Translator') -> None:
         self.viper = viper
         self.type_domain = 'PyType'
@@ -325,6 +333,139 @@ class TypeDomainFactory:
             # create axioms that relate arguments to functions
         return funcs, axioms
 
+    def _supertype(self, cls: PythonClass) -> Optional[PythonType]:
+        """
+        Returns the type the given class extends according to its subtype
+        axiom, or None if it has no subtype axiom.
+        """
+        if cls.superclass:
+            return cls.superclass
+        if cls.interface or cls.name == OBJECT_TYPE:
+            return None
+        return cls.module.global_module.classes[OBJECT_TYPE]
+
+    def _ancestors(self, cls: PythonClass) -> List[PythonClass]:
+        result = []
+        supertype = self._supertype(cls)
+        while supertype:
+            result.append(supertype)
+            supertype = self._supertype(supertype)
+        return result
+
+    def is_closed_hierarchy(self, classes: List[PythonClass]) -> bool:
+        """
+        Checks if the given classes form a closed hierarchy, i.e., a tree of
+        non-generic classes with ``object`` as its root which contains all
+        their supertypes. For such a hierarchy, the hierarchy axioms can be
+        replaced by a subtype table (see ``create_subtype_table``).
+        """
+        names = set()
+        for cls in classes:
+            if cls.type_vars or cls.name == TUPLE_TYPE:
+                return False
+            names.add(cls.name)
+        if OBJECT_TYPE not in names:
+            return False
+        for cls in classes:
+            if cls.name == OBJECT_TYPE:
+                continue
+            supertype = self._supertype(cls)
+            if (not isinstance(supertype, PythonClass) or
+                    supertype not in classes):
+                return False
+        return True
+
+    def slice_default_axioms(self, axioms: List['silver.ast.DomainAxiom'],
+                             classes: List[PythonClass],
+                             ctx: Context) -> List['silver.ast.DomainAxiom']:
+        """
+        Returns the default axioms needed for the given slice of the type
+        hierarchy: The tuple axioms are dropped if the slice does not contain
+        tuples, and for a closed hierarchy, the hierarchy axioms are replaced
+        by a subtype table.
+        """
+        dropped = set()
+        if all(cls.name != TUPLE_TYPE for cls in classes):
+            dropped.update(self.TUPLE_AXIOMS)
+        table = []
+        if self.is_closed_hierarchy(classes):
+            dropped.update(self.HIERARCHY_AXIOMS)
+            table = self.create_subtype_table(classes, ctx)
+        return [axiom for axiom in axioms if axiom.name() not in dropped] + table
+
+    def create_subtype_table(self, classes: List[PythonClass],
+                             ctx: Context) -> List['silver.ast.DomainAxiom']:
+        """
+        Creates axioms stating the subtype relation of the given closed
+        hierarchy (see ``is_closed_hierarchy``). The first one is a table of
+        ground facts, e.g. for classes A and B extending object:
+
+        issubtype(A(), object()) && !issubtype(object(), A()) &&
+        !issubtype(A(), B()) && ...
+
+        The others state the supertypes of every class and the types its
+        subtypes cannot be subtypes of, e.g.:
+
+        forall t: PyType :: { issubtype(t, A()) }
+          issubtype(t, A()) ==> issubtype(t, object()) && !issubtype(t, B())
+
+        All of these follow from the transitivity and exclusion axioms, which
+        are not needed any more.
+        """
+        position, info = self.no_position(ctx), self.no_info(ctx)
+        ancestors = {cls: self._ancestors(cls) for cls in classes}
+        literals = {cls: self.viper.DomainFuncApp(cls.sil_name, [],
+                                                  self.type_type(), position,
+                                                  info, self.type_domain)
+                    for cls in classes}
+        facts = []
+        for sub in classes:
+            for sup in classes:
+                if sub is sup:
+                    continue
+                fact = self._issubtype(literals[sub], literals[sup], ctx)
+                if sup not in ancestors[sub]:
+                    fact = self.viper.Not(fact, position, info)
+                facts.append(fact)
+        result = []
+        if facts:
+            table = facts[0]
+            for fact in facts[1:]:
+                table = self.viper.And(table, fact, position, info)
+            result.append(self.viper.DomainAxiom('subtype_table', table,
+                                                 position, info,
+                                                 self.type_domain))
+        t_decl = self.viper.LocalVarDecl('t', self.type_type(), position, info)
+        t_ref = self.viper.LocalVar('t', self.type_type(), position, info)
+        for cls in classes:
+            consequences = []
+            for other in classes:
+                if other is cls:
+                    continue
+                if other in ancestors[cls]:
+                    consequences.append(
+                        self._issubtype(t_ref, literals[other], ctx))
+                elif cls not in ancestors[other]:
+                    # Neither a supertype nor a subtype.
+                    consequences.append(self.viper.Not(
+                        self._issubtype(t_ref, literals[other], ctx),
+                        position, info))
+            if not consequences:
+                continue
+            rhs = consequences[0]
+            for consequence in consequences[1:]:
+                rhs = self.viper.And(rhs, consequence, position, info)
+            lhs = self._issubtype(t_ref, literals[cls], ctx)
+            trigger = self.viper.Trigger([lhs], position, info)
+            body = self.viper.Forall([t_decl], [trigger],
+                                     self.viper.Implies(lhs, rhs, position,
+                                                        info),
+                                     position, info)
+            result.append(self.viper.DomainAxiom(
+                'subtype_hierarchy_' + cls.sil_name, body, position, info,
+                self.type_domain))
+        return result
+
     def create_arg_functions(self, cls: 'PythonClass',
                              ctx: Context) -> List['silver.ast.DomainFunc']:
         position, info = self.no_position(ctx), self.no_info(ctx)
@@ -0,0 +1,11 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+"""Unit tests for the data structures and caches of Nagini.
+
+Unlike the tests in ``tests.py``, which translate and verify annotated
+Python files, these tests check individual components directly.
+"""
@@ -0,0 +1,162 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+"""Unit tests for the translation cache."""
+
+import configparser
+import os
+
+from nagini_translation.lib import config
+from nagini_translation.lib.cache import (
+    declared_globals,
+    normalize_locals,
+    PartFingerprinter,
+    result_key,
+    TranslationCache,
+)
+from nagini_translation.translators.program import ProgramPart
+
+
+def test_cache_result_key_covers_backend(tmpdir, monkeypatch):
+    """Results are not reused with other backends or backend options."""
+    cache = TranslationCache(str(tmpdir), 1024 * 1024)
+    source = tmpdir.join('module.py')
+    source.write('x = 1\n')
+    options = ['--timeout', '10']
+    key = cache.key(str(source), set(), False, False, False)
+    cache.store(key, str(source), [], None,
+                {result_key('silicon', False, False, options): 'cached'})
+    results = cache.lookup(key)['results']
+    assert result_key('silicon', False, False, options) in results
+    assert result_key('silicon', False, False, ['--timeout', '20']) not in results
+    assert result_key('silicon', False, False) not in results
+    monkeypatch.setattr(config, 'z3_path', '/opt/z3-new/bin/z3')
+    assert result_key('silicon', False, False, options) not in results
+    monkeypatch.undo()
+    monkeypatch.setattr(config, 'classpath',
+                        config.classpath + os.pathsep + 'silicon-new.jar')
+    assert result_key('silicon', False, False, options) not in results
+
+
+def test_cache_key_covers_obligation_config(tmpdir, monkeypatch):
+    """Changing the obligation settings in nagini.cfg changes the key."""
+    cache = TranslationCache(str(tmpdir), 1024 * 1024)
+    source = tmpdir.join('module.py')
+    source.write('x = 1\n')
+    parser = configparser.ConfigParser()
+    parser.read_string('[Obligations]\n')
+    monkeypatch.setattr(config.obligation_config, '_info',
+                        parser['Obligations'])
+    default_key = cache.key(str(source), set(), False, False, False)
+    parser['Obligations']['disable_termination_check'] = 'True'
+    termination_key = cache.key(str(source), set(), False, False, False)
+    parser['Obligations']['disable_all'] = 'True'
+    all_key = cache.key(str(source), set(), False, False, False)
+    assert len({default_key, termination_key, all_key}) == 3
+
+
+def test_cache_keys_cover_backend_upgrades(tmpdir, monkeypatch):
+    """Upgrading a backend in place invalidates results and parts."""
+    jar = tmpdir.join('silicon.jar')
+    jar.write(b'old silicon', 'wb')
+    z3 = tmpdir.join('z3')
+    z3.write(b'old z3', 'wb')
+    monkeypatch.setattr(config, 'classpath', str(jar))
+    monkeypatch.setattr(config, 'z3_path', str(z3))
+    monkeypatch.setattr(config, 'boogie_path', None)
+    keys = {result_key('silicon', False, False)}
+    settings = {PartFingerprinter(['silicon'], []).settings}
+    for path, contents in ((jar, b'new silicon'), (z3, b'new z3 version')):
+        path.write(contents, 'wb')
+        keys.add(result_key('silicon', False, False))
+        settings.add(PartFingerprinter(['silicon'], []).settings)
+    assert len(keys) == 3
+    assert len(settings) == 3
+
+
+def silver_method(name: str, arg: str, local: str, label: str,
+                  loop: bool = False) -> str:
+    """Returns the text of a Silver method with the given names."""
+    body = ['  var {}: Int'.format(local), '  {} := {}'.format(local, arg)]
+    if loop:
+        body.extend(['  while ({} > 0)'.format(local), '  {',
+                     '    {0} := {0} - 1'.format(local), '  }'])
+    body.extend(['  label {}'.format(label),
+                 '  assert (forall i: Int :: old[{}]({}) >= i || true)'.format(
+                     label, local)])
+    return 'method {}({}: Int)\n{{\n{}\n}}'.format(name, arg, '\n'.join(body))
+
+
+def split_program(edited: bool) -> list:
+    """
+    Returns the parts of a program with two methods, where editing the first
+    one renumbers the fresh names of the second one.
+    """
+    first = silver_method('m_first', 'x', 'y', 'post_loop', loop=edited)
+    offset = 1 if edited else 0
+    second = silver_method('m_second', 'x_{}'.format(offset),
+                           'y_{}'.format(offset),
+                           'post_loop_{}'.format(offset))
+    stub = 'method m_second(x_{}: Int)'.format(offset)
+    shared = ['field value: Int']
+    return [ProgramPart('m_first', None, shared, [first, stub]),
+            ProgramPart('m_second', None, shared, [second]),
+            ProgramPart(None, None, shared, [stub])]
+
+
+def test_incremental_parts_ignore_renumbered_names(tmpdir):
+    """Editing one method only re-verifies the part of that method."""
+    cache = TranslationCache(str(tmpdir), 1024 * 1024)
+    parts = split_program(False)
+    fingerprinter = PartFingerprinter(['silicon'], parts)
+    for part in parts:
+        cache.mark_verified(fingerprinter.fingerprint(part))
+    parts = split_program(True)
+    fingerprinter = PartFingerprinter(['silicon'], parts)
+    verified = [cache.is_verified(fingerprinter.fingerprint(part))
+                for part in parts]
+    assert verified == [False, True, True]
+
+
+def test_normalize_locals():
+    """Only local names are renamed, in the order of their declarations."""
+    text = ('method m(x_3: Ref) returns (res: Int)\n{\n  var y_2: Int\n'
+            '  label l_5\n  res := (let z == (f(x_3)) in z + y_2)\n'
+            '  assert (forall k_1: Int :: g(k_1, res))\n}')
+    assert normalize_locals(text) == (
+        'method m($local0: Ref) returns ($local1: Int)\n{\n'
+        '  var $local2: Int\n  label $local3\n'
+        '  $local1 := (let $local4 == (f($local0)) in $local4 + $local2)\n'
+        '  assert (forall $local5: Int :: g($local5, $local1))\n}')
+    assert normalize_locals('field value: Int') == 'field value: Int'
+
+
+def test_normalize_locals_keeps_names_of_globals():
+    """Locals sharing their name with a global are not renamed."""
+    def program(name: str) -> list:
+        method = ('method m({0}: Ref)\n{{\n  var y: Int\n'
+                  '  y := {0}({0}.{0})\n}}').format(name)
+        return [method, 'function {}(x: Int): Int'.format(name),
+                'field {}: Int'.format(name)]
+
+    first, second = program('a'), program('b')
+    assert declared_globals(first) == {'m', 'a'}
+    normalized = [normalize_locals(text, declared_globals(first))
+                  for text in first]
+    assert normalized[0] == ('method m(a: Ref)\n{\n  var $local0: Int\n'
+                             '  $local0 := a(a.a)\n}')
+    assert normalized[0] != normalize_locals(second[0],
+                                             declared_globals(second))
+    # Parts which only differ in such names get different fingerprints.
+    fingerprints = []
+    for members in (first, second):
+        parts = [ProgramPart('m', None, members[2:], members[:2])]
+        fingerprinter = PartFingerprinter(['silicon'], parts)
+        fingerprints.append(fingerprinter.fingerprint(parts[0]))
+    assert fingerprints[0] != fingerprints[1]
+    # Texts already containing normalized names are not renamed.
+    text = 'method m(x: Int)\n{\n  var $local0: Int\n}'
+    assert normalize_locals(text) == text
@@ -0,0 +1,80 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+"""Unit tests for the error manager."""
+
+import ast
+
+from nagini_translation.lib.errors.manager import ErrorManager
+
+
+class Position:
+    """Stands in for a Silver position with the given ID."""
+
+    def __init__(self, position_id: str) -> None:
+        self._id = position_id
+
+    def id(self) -> str:
+        return self._id
+
+
+def test_error_information_round_trip():
+    """Positions map back to their nodes, vias and rules."""
+    manager = ErrorManager()
+    call = ast.Call(ast.Name('f', ast.Load()), [], [])
+    other = ast.Name('x', ast.Load())
+    via = ('call', call)
+    vias = [via]
+    rules = {('assert.failed', 'assertion.false'): ('call.precondition',
+                                                    'assertion.false')}
+    first_id = manager.add_error_information(other, vias, 'first', rules)
+    second_id = manager.add_error_information(call, [via], None)
+    third_id = manager.add_error_information(other, [], 'third', rules)
+    # IDs are dense.
+    assert [first_id, second_id, third_id] == ['0', '1', '2']
+    assert manager.size() == 3
+    assert manager.get_node(Position(first_id)) is other
+    assert manager.get_node(Position(second_id)) is call
+    assert manager.get_vias(first_id) == [via]
+    assert manager.get_vias(second_id) == [via]
+    assert manager.get_vias(third_id) == []
+    # Equal via lists and the same rules are stored only once.
+    assert manager.get_vias(first_id) is manager.get_vias(second_id)
+    assert manager._get_conversion_rules(Position(first_id)) is rules
+    assert manager._get_conversion_rules(Position(second_id)) is None
+    assert manager._get_conversion_rules(Position(third_id)) is rules
+    item = manager._get_item(Position(third_id))
+    assert item.node is other and item.reason_string == 'third'
+    # Positions which were not created by Nagini are not found.
+    assert manager.get_node(Position('3')) is None
+    assert manager.get_node(Position('-1')) is None
+    assert manager.get_node(Position('nagini')) is None
+    assert manager.get_node(object()) is None
+    manager.clear()
+    assert manager.size() == 0
+    assert manager.get_node(Position(first_id)) is None
+
+
+def test_error_generations_are_released_independently():
+    """Releasing a generation keeps the information of the others."""
+    manager = ErrorManager()
+    first_node = ast.Name('first', ast.Load())
+    second_node = ast.Name('second', ast.Load())
+    first = manager.start_generation()
+    first_id = manager.add_error_information(first_node, [], 'first')
+    second = manager.start_generation()
+    second_id = manager.add_error_information(second_node, [], 'second')
+    assert manager.get_node(Position(first_id)) is first_node
+    manager.release(first)
+    assert manager.get_node(Position(first_id)) is None
+    assert manager.get_node(Position(second_id)) is second_node
+    third_id = manager.add_error_information(second_node, [], 'third')
+    assert int(third_id) > int(second_id)
+    manager.release(second)
+    assert manager.size() == 0
+    # IDs are not reused after a release.
+    assert int(manager.add_error_information(first_node, [], '')) > int(third_id)
+    assert manager.get_node(Position(third_id)) is None
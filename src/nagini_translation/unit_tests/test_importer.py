@@ -0,0 +1,72 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+"""Unit tests for the import hook of the contracts module."""
+
+import importlib.util
+import os
+import shutil
+import sys
+
+from nagini_contracts import importer, transformer
+from nagini_contracts.importer import ContractsImporter
+
+
+ANNOTATED_MODULE = """
+from nagini_contracts.contracts import *
+
+
+def double(x: int) -> int:
+    Requires(x >= 0)
+    Ensures(Result() == 2 * x)
+    return 2 * x
+"""
+
+
+def load_with_contracts_importer(name: str, directory: str):
+    """Loads the module ``name`` from ``directory`` with a new import hook."""
+    spec = ContractsImporter().find_spec(name, [directory])
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_contracts_importer_caches_transformed_bytecode(tmpdir, monkeypatch):
+    """Transformed modules are cached until the transformer changes."""
+    monkeypatch.setattr(sys, 'dont_write_bytecode', False)
+    source = tmpdir.join('annotated.py')
+    source.write(ANNOTATED_MODULE)
+    transformations = []
+
+    def counting_transform_ast(tree):
+        transformations.append(tree)
+        return transformer.transform_ast(tree)
+    monkeypatch.setattr(importer, 'transform_ast', counting_transform_ast)
+
+    module = load_with_contracts_importer('annotated', str(tmpdir))
+    assert module.double(3) == 6
+    assert len(transformations) == 1
+    tag = importer._transformer_tag()
+    cached = importlib.util.cache_from_source(str(source), optimization=tag)
+    assert os.path.exists(cached)
+    assert not os.path.exists(importlib.util.cache_from_source(str(source)))
+
+    # The second import reads the transformed bytecode from __pycache__.
+    module = load_with_contracts_importer('annotated', str(tmpdir))
+    assert module.double(3) == 6
+    assert len(transformations) == 1
+
+    # Editing the transformer changes the tag, so the module is transformed
+    # again instead of being loaded from the outdated bytecode.
+    edited = tmpdir.join('transformer.py')
+    shutil.copyfile(transformer.__file__, str(edited))
+    with open(str(edited), 'a') as file:
+        file.write('\n# edited\n')
+    monkeypatch.setattr(transformer, '__file__', str(edited))
+    assert importer._transformer_tag() != tag
+    module = load_with_contracts_importer('annotated', str(tmpdir))
+    assert module.double(3) == 6
+    assert len(transformations) == 2
@@ -0,0 +1,74 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+"""Unit tests for the templates of inlined method bodies."""
+
+import ast
+import pytest
+
+from types import SimpleNamespace
+
+from nagini_translation import main
+from nagini_translation.benchmarks.inlining import (
+    generate_chain,
+    generate_wide,
+)
+from nagini_translation.lib import config
+from nagini_translation.lib.errors import error_manager
+from nagini_translation.lib.inline_templates import BodyInfo, InlineTemplates
+from nagini_translation.tests import _JVM
+
+
+def body_info(source: str) -> BodyInfo:
+    method = SimpleNamespace(node=ast.parse(source).body[0])
+    return BodyInfo(method)
+
+
+def test_body_info():
+    """
+    Bodies with loops or bound variables are not supported; accesses to
+    private fields make templates depend on the current class.
+    """
+    info = body_info('def f(self, x):\n'
+                     '    """Doc."""\n'
+                     '    self.f = x\n'
+                     '    Ensures(self.f == x)\n')
+    assert info.supported
+    assert not info.accesses_private
+    assert info.identifiers == {'self', 'x'}
+    assert not body_info('def f(x):\n'
+                         '    while x:\n'
+                         '        x = x - 1\n').supported
+    assert not body_info('def f(xs):\n'
+                         '    ys = [x for x in xs]\n').supported
+    assert body_info('def f(self):\n'
+                     '    self.__f = 0\n').accesses_private
+
+
+@pytest.mark.parametrize('source', [generate_chain(4, 2), generate_wide(5, 2)])
+def test_instantiated_templates(tmpdir, monkeypatch, source):
+    """
+    Instantiating templates gives the same program and error information as
+    translating every inlined body.
+    """
+    path = tmpdir.join('constructors.py')
+    path.write(source)
+    instantiated = []
+    instantiate = InlineTemplates._instantiate
+
+    def count_instantiations(self, template, roles, ctx):
+        instantiated.append(template)
+        return instantiate(self, template, roles, ctx)
+
+    monkeypatch.setattr(InlineTemplates, '_instantiate', count_instantiations)
+    section = config.file_config.config['Translation']
+    results = []
+    for enabled in ('false', 'true'):
+        monkeypatch.setitem(section, 'inline_templates', enabled)
+        prog = main.translate(str(path), _JVM)
+        results.append((str(prog), error_manager.size()))
+    assert instantiated
+    assert results[0] == results[1]
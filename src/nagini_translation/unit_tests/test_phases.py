@@ -0,0 +1,66 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+"""Unit tests for the phase benchmark."""
+
+import json
+import os
+import pytest
+
+from nagini_translation.benchmarks import phases
+from nagini_translation.verifier import FAILED, VERIFIED
+
+
+def test_benchmark_baseline(capsys):
+    """
+    Slower phases, larger programs, changed outcomes and missing baselines
+    are reported.
+    """
+    baseline = {
+        'a.py': {'phases': {'translation': 1.0, 'verification': 2.0},
+                 'size': {'methods': 10, 'lines': 100},
+                 'outcome': 'failed', 'errors': 2},
+    }
+    faster = {
+        'a.py': {'phases': {'translation': 1.05, 'verification': 1.0},
+                 'size': {'methods': 10, 'lines': 110},
+                 'outcome': 'failed', 'errors': 2},
+    }
+    assert phases.compare(faster, baseline, 0.2, 0.1)
+    slower = {
+        'a.py': {'phases': {'translation': 2.0, 'verification': 2.0},
+                 'size': {'methods': 10, 'lines': 150},
+                 'outcome': 'failed', 'errors': 2},
+    }
+    assert not phases.compare(slower, baseline, 0.2, 0.1)
+    assert not phases.compare(dict(faster, **{'b.py': faster['a.py']}),
+                              baseline, 0.2, 0.1)
+    more_errors = {'a.py': dict(faster['a.py'], errors=3)}
+    assert not phases.compare(more_errors, baseline, 0.2, 0.1)
+    output = capsys.readouterr().out
+    assert 'translation took 2.00s instead of 1.00s' in output
+    assert 'lines grew from 100 to 150' in output
+    assert 'No baseline for b.py' in output
+    assert 'was failed with 2 errors, now failed with 3 errors' in output
+
+
+def test_benchmark_baseline_covers_corpus():
+    """The stored baseline has complete results for the whole corpus."""
+    stored = os.path.join(os.path.dirname(phases.__file__),
+                          'phases_baseline.json')
+    if not os.path.exists(stored):
+        pytest.skip('No benchmark baseline recorded, see make '
+                    'benchmark_baseline.')
+    with open(stored) as file:
+        baseline = json.load(file)
+    names = phases.CORPUS + [phases.SYNTHETIC_PREFIX + str(size)
+                             for size in phases.SYNTHETIC_SIZES]
+    for name in names:
+        assert name in baseline, name
+        result = baseline[name]
+        assert result['phases']['total'] > 0, name
+        assert result['size']['methods'] > 0, name
+        assert result['outcome'] in (VERIFIED, FAILED), name
@@ -0,0 +1,111 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+"""Unit tests for splitting Silver programs into parts."""
+
+from nagini_translation.translators.program import ProgramTranslator
+
+
+class SilverMember:
+    """Stands in for a Silver function, predicate or method."""
+
+    def __init__(self, name: str, text: str, body: str = None) -> None:
+        self._name = name
+        self.text = text
+        self._body = body
+
+    def name(self) -> str:
+        return self._name
+
+    def body(self):
+        return self._body
+
+    def formalArgs(self):
+        return []
+
+    formalReturns = pres = posts = formalArgs
+
+    def pos(self):
+        return None
+
+    info = pos
+
+    def __str__(self) -> str:
+        return self.text + (' { ' + self._body + ' }' if self._body else '')
+
+
+class SilverProgram:
+    """Stands in for a Silver program."""
+
+    def __init__(self, domains, fields, functions, predicates, methods, pos,
+                 info) -> None:
+        self.functions = functions
+        self.predicates = predicates
+        self.methods = methods
+
+
+class SplitViperAST:
+    """Provides the parts of the Viper AST interface splitting needs."""
+
+    def __init__(self, used_names_sets) -> None:
+        self.used_names_sets = used_names_sets
+
+    Program = SilverProgram
+
+    def Method(self, name, args, returns, pres, posts, locals, body, pos,
+               info) -> SilverMember:
+        return SilverMember(name, 'method ' + name + '()')
+
+    def to_list(self, seq) -> list:
+        return list(seq)
+
+    def from_option(self, option):
+        return option
+
+
+def test_split_program():
+    """
+    Every selected method gets its own part with its dependencies, unless
+    its dependencies were not tracked completely.
+    """
+    viper = SplitViperAST({
+        'm_first': {'f_helper', 'm_second'},
+        'm_second': set(),
+        # References p_untracked without tracking it.
+        'm_third': {'f_helper'},
+    })
+    translator = ProgramTranslator(None, None, 'test.py', None, viper)
+    translator.no_position = translator.no_info = lambda ctx: None
+    helper = SilverMember('f_helper', 'function f_helper(): Int')
+    untracked = SilverMember('p_untracked', 'predicate p_untracked()')
+    builtin = SilverMember('p_builtin', 'predicate p_builtin()')
+    first = SilverMember('m_first', 'method m_first()',
+                         'm_second() ; x := f_helper()')
+    second = SilverMember('m_second', 'method m_second()', 'inhale true')
+    third = SilverMember('m_third', 'method m_third()',
+                         'fold p_untracked() ; x := f_helper()')
+    abstract = SilverMember('m_abstract', 'method m_abstract()')
+    methods = [first, second, third, abstract]
+    parts = translator._split_program(
+        ['m_first', 'm_second', 'm_third', 'm_abstract'], ['domain'],
+        ['field'], [helper], [untracked, builtin], methods, {'p_builtin'},
+        None)
+    assert [part.name for part in parts] == ['m_first', 'm_second', None]
+    first_part, second_part, rest = parts
+    assert first_part.shared == ['domain', 'field']
+    assert first_part.program.functions == [helper]
+    assert first_part.program.predicates == [builtin]
+    assert first_part.program.methods[0] is first
+    assert str(first_part.program.methods[1]) == 'method m_second()'
+    assert second_part.program.methods == [second]
+    assert second_part.program.functions == []
+    # The methods with their own parts are only stubs in the rest.
+    assert [str(m) for m in rest.program.methods[:2]] == [
+        'method m_first()', 'method m_second()']
+    assert rest.program.methods[2:] == [third, abstract]
+    assert rest.program.functions == [helper]
+    assert rest.program.predicates == [untracked, builtin]
+    assert first_part.members == [helper, builtin] + first_part.program.methods
@@ -0,0 +1,41 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+"""Unit tests for name resolution."""
+
+import ast
+
+from nagini_translation.lib.resolver import get_target, resolution_cache
+
+
+class Scope:
+    """Stands in for a container, with locals if ``has_locals`` is set."""
+
+    def __init__(self, contents: dict, has_locals: bool) -> None:
+        self.contents = contents
+        if has_locals:
+            self.locals = contents
+
+    def get_contents(self, only_top: bool) -> dict:
+        return self.contents
+
+
+def test_resolution_sees_new_locals():
+    """Resolved names are re-resolved once a method gets a new local."""
+    global_x = object()
+    module = Scope({'x': global_x}, False)
+    method = Scope({'y': object()}, True)
+    node = ast.parse('x', mode='eval').body
+    resolution_cache.start()
+    try:
+        assert get_target(node, [method, module], method) is global_x
+        assert get_target(node, [method, module], method) is global_x
+        local_x = object()
+        method.locals['x'] = local_x
+        assert get_target(node, [method, module], method) is local_x
+        assert resolution_cache.hits == 1
+    finally:
+        resolution_cache.stop()
@@ -0,0 +1,88 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+"""Unit tests for the verification server."""
+
+import json
+import pytest
+
+from nagini_translation.lib import typeinfo
+from nagini_translation.verifier import (
+    BackendPool,
+    ViperVerifier,
+    Watchdog,
+)
+
+
+def send_to_server(server, identity: bytes, request) -> dict:
+    """Sends a request to the server, returns the immediate reply if any."""
+    frames = server._receive([identity, b'', json.dumps(request).encode()])
+    return json.loads(frames[-1].decode()) if frames else None
+
+
+def test_server_request_ids(monkeypatch):
+    """Requests in flight never share an id."""
+    server_module = pytest.importorskip('nagini_translation.server')
+    monkeypatch.setattr(server_module, 'get_backend_pool', BackendPool)
+    monkeypatch.setattr(typeinfo, '_incremental', False)
+    server = server_module.VerificationServer(None, None, 1)
+    verify = {'command': 'verify', 'file': 'test.py'}
+    assert send_to_server(server, b'a', dict(verify, id='1')) is None
+    reply = send_to_server(server, b'a', dict(verify, id='1'))
+    assert reply['status'] == 'error' and reply['id'] == '1'
+    # Other clients may use the same ids.
+    assert send_to_server(server, b'b', dict(verify, id='1')) is None
+    assert send_to_server(server, b'a', verify) is None
+    assert send_to_server(server, b'a', verify) is None
+    reply = send_to_server(server, b'a', dict(verify, id=['1']))
+    assert reply['status'] == 'error'
+    # Requests without id get distinct ones.
+    assert len(server.requests) == server.queue.qsize() == 4
+    assert len({request_id for identity, request_id in server.requests
+                if identity == b'a'}) == 3
+    reply = send_to_server(server, b'a', {'id': '5', 'command': 'cancel',
+                                          'target': '1'})
+    assert reply['status'] == 'ok'
+    assert server.requests[(b'a', '1')].cancelled
+    assert not server.requests[(b'b', '1')].cancelled
+
+
+class UnusedBackend:
+    """Stands in for a backend instance which must not verify anything."""
+
+    verification_time = 0.0
+
+    def verify(self, prog, arp: bool = False):
+        raise AssertionError('Cancelled request was verified.')
+
+
+def test_server_cancel_while_acquiring_backend(monkeypatch):
+    """Requests cancelled while waiting for a backend are not verified."""
+    server_module = pytest.importorskip('nagini_translation.server')
+    monkeypatch.setattr(server_module, 'get_backend_pool', BackendPool)
+    monkeypatch.setattr(typeinfo, '_incremental', False)
+    server = server_module.VerificationServer(None, None, 1)
+    verify = {'command': 'verify', 'file': 'test.py'}
+    assert send_to_server(server, b'a', dict(verify, id='1')) is None
+    request = server.requests[(b'a', '1')]
+    instance = UnusedBackend()
+    released = []
+
+    def acquire(backend, options):
+        # The cancellation arrives before the instance is assigned.
+        reply = send_to_server(server, b'a', {'id': '2', 'command': 'cancel',
+                                              'target': '1'})
+        assert reply['status'] == 'ok'
+        return instance
+
+    monkeypatch.setattr(server.pool, 'acquire', acquire)
+    monkeypatch.setattr(server.pool, 'release', released.append)
+    with Watchdog(None, None, None) as watchdog:
+        result = server._verify(request, None, ViperVerifier.silicon, [],
+                                False, watchdog)
+    assert result is None
+    assert released == [instance]
+    assert request.verifier is None
@@ -0,0 +1,44 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+"""Unit tests for the snapshots of the builtin Silver programs."""
+
+import pytest
+
+from nagini_translation import main
+from nagini_translation.lib.snapshot import ProgramSnapshots, snapshot_key
+from nagini_translation.tests import _JVM
+
+
+def test_snapshot_key(tmpdir):
+    """Keys change with the contents of the resources."""
+    resource = tmpdir.join('all.sil')
+    resource.write('field a: Int')
+    key = snapshot_key([str(resource)])
+    assert key == snapshot_key([str(resource)])
+    resource.write('field b: Int')
+    assert snapshot_key([str(resource)]) != key
+    assert snapshot_key([str(tmpdir.join('missing.sil'))]) is None
+
+
+@pytest.mark.parametrize('sif', [False, True])
+def test_snapshot_round_trip(tmpdir, monkeypatch, sif):
+    """
+    The second process loads the program from the snapshot stored by the
+    first one, and gets the same program.
+    """
+    monkeypatch.setattr(main, 'sil_snapshots', ProgramSnapshots(str(tmpdir)))
+    parsed = main.load_sil_files(_JVM, sif)
+    assert tmpdir.join('preamble').listdir()
+
+    def parse_sil_file(sil_path, jvm):
+        raise AssertionError('resources parsed again')
+
+    monkeypatch.setattr(main, 'parse_sil_file', parse_sil_file)
+    loaded = main.load_sil_files(_JVM, sif)
+    assert str(loaded) == str(parsed)
+    assert parsed.equals(loaded)
+    assert loaded.checkTransitively().isEmpty()
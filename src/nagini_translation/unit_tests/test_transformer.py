@@ -0,0 +1,101 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+"""Unit tests for erasing contracts and ghost code."""
+
+import ast
+
+from nagini_contracts import transformer
+
+
+def assert_transforms_to(source: str, expected: str) -> None:
+    """Checks that transforming ``source`` results in ``expected``."""
+    transformed = transformer.transform_ast(ast.parse(source))
+    assert ast.dump(transformed) == ast.dump(ast.parse(expected))
+    compile(transformed, '<transformed>', 'exec')
+
+
+def test_transformer_keeps_predicates_and_pure_functions():
+    """Predicates and functions returning unfoldings are not removed."""
+    assert_transforms_to("""
+@Predicate
+def cell_pred(c: Cell) -> bool:
+    return Acc(c.value) and c.value > 0
+
+
+@Pure
+def get_value(c: Cell) -> int:
+    Requires(cell_pred(c))
+    return Unfolding(cell_pred(c), c.value)
+""", """
+@Predicate
+def cell_pred(c: Cell) -> bool:
+    return Acc(c.value) and c.value > 0
+
+
+@Pure
+def get_value(c: Cell) -> int:
+    return Unfolding(cell_pred(c), c.value)
+""")
+
+
+def test_transformer_removes_ghost_code():
+    """Ghost functions and all statements using ghost code are removed."""
+    assert_transforms_to("""
+def f(x: int) -> int:
+    _gh_old = twice(x)
+    if x > 0:
+        while _gh_old > x:
+            _gh_old -= 1
+        if twice(x) > 0:
+            x += 1
+    self._gh_count = 0
+    return x
+
+
+@Ghost
+@Pure
+def twice(x: int) -> int:
+    return 2 * x
+
+
+_gh_calls = 0
+""", """
+def f(x: int) -> int:
+    return x
+""")
+
+
+def test_transformer_handles_try_blocks_left_empty():
+    """
+    Try-statements whose body becomes empty are removed unless they have an
+    else-branch; empty handlers get a pass-statement.
+    """
+    assert_transforms_to("""
+def f(c: Cell) -> int:
+    try:
+        Assert(c.value >= 0)
+    except ValueError:
+        return 0
+    try:
+        Fold(cell_pred(c))
+    except ValueError:
+        Unfold(cell_pred(c))
+    else:
+        c.value = 2
+    finally:
+        Assert(c.value > 0)
+    return c.value
+""", """
+def f(c: Cell) -> int:
+    try:
+        pass
+    except ValueError:
+        pass
+    else:
+        c.value = 2
+    return c.value
+""")
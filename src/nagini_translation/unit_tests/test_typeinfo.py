@@ -0,0 +1,192 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+"""Unit tests for type checking and the type information."""
+
+from collections import OrderedDict
+from nagini_translation.lib import typeinfo
+from nagini_translation.lib.typeinfo import (
+    CheckResult,
+    is_optional_error,
+    TypeInfo,
+    TypeScope,
+)
+
+
+def test_type_check_reuses_unchanged_modules(tmpdir, monkeypatch):
+    """
+    With incremental checks, checking an unchanged file again does not run
+    mypy.
+    """
+    monkeypatch.setattr(typeinfo, '_incremental', True)
+    monkeypatch.setattr(typeinfo, '_check_results', OrderedDict())
+    monkeypatch.setattr(typeinfo, '_module_types', {})
+    path = tmpdir.join('reused.py')
+    path.write('def f(x: int) -> int:\n'
+               '    y = x + 1\n'
+               '    return y\n')
+    first = TypeInfo()
+    assert first.check(str(path))
+    builds = []
+    build = TypeInfo._build
+
+    def counting_build(self, *args, **kwargs):
+        builds.append(args)
+        return build(self, *args, **kwargs)
+
+    monkeypatch.setattr(TypeInfo, '_build', counting_build)
+    second = TypeInfo()
+    assert second.check(str(path))
+    assert not builds
+    assert (str(second.get_type(['__main__', 'f'], 'y')[0]) ==
+            str(first.get_type(['__main__', 'f'], 'y')[0]))
+    path.write('def f(x: int) -> int:\n'
+               '    y = x + 1\n'
+               '    z = y\n'
+               '    return z\n')
+    third = TypeInfo()
+    assert third.check(str(path))
+    assert builds
+    assert third.get_type(['__main__', 'f'], 'z')[0] is not None
+    # Without incremental checks, results are neither reused nor stored.
+    monkeypatch.setattr(typeinfo, '_incremental', False)
+    monkeypatch.setattr(typeinfo, '_check_results', OrderedDict())
+    del builds[:]
+    assert TypeInfo().check(str(path))
+    assert builds
+    assert not typeinfo._check_results
+
+
+class CheckedModule:
+    """Stands in for the type information of a checked module."""
+
+    def __init__(self, path) -> None:
+        self.name = path.purebasename
+        self.path = str(path)
+        self.stamp = typeinfo._file_stamp(self.path)
+
+
+def test_type_check_results_are_bounded(tmpdir, monkeypatch):
+    """Only current and recently used check results are kept."""
+    monkeypatch.setattr(typeinfo, '_check_results', OrderedDict())
+    monkeypatch.setattr(typeinfo, '_module_types', {})
+    monkeypatch.setattr(typeinfo, '_MAX_CHECK_RESULTS', 2)
+    modules = {}
+    for name in ('first', 'second', 'third'):
+        path = tmpdir.join(name + '.py')
+        path.write('x = 1\n')
+        modules[name] = CheckedModule(path)
+        typeinfo._module_types[name] = modules[name]
+        typeinfo._store_check(name, CheckResult([modules[name]], True))
+    assert list(typeinfo._check_results) == ['second', 'third']
+    assert set(typeinfo._module_types) == {'second', 'third'}
+    # Using a result makes it the most recently used one.
+    assert typeinfo._lookup_check('second')
+    typeinfo._module_types['first'] = modules['first']
+    typeinfo._store_check('first', CheckResult([modules['first']], True))
+    assert list(typeinfo._check_results) == ['second', 'first']
+    # Results whose files changed are dropped.
+    tmpdir.join('second.py').write('x = 22\n')
+    assert typeinfo._lookup_check('second') is None
+    assert list(typeinfo._check_results) == ['first']
+    assert set(typeinfo._module_types) == {'first'}
+
+
+def test_optional_errors():
+    """Only errors caused by strict optional checking skip the second check."""
+    assert is_optional_error(
+        'm.py:3: error: Item "None" of "Optional[C]" has no attribute "f"')
+    assert is_optional_error(
+        'm.py:4: error: Argument 1 to "g" has incompatible type '
+        '"Optional[int]"; expected "int"')
+    assert is_optional_error('m.py:5: note: In function "h":')
+    assert not is_optional_error(
+        'm.py:6: error: Argument 1 to "g" has incompatible type "str"; '
+        'expected "int"')
+    assert not is_optional_error(
+        'm.py:7: error: Unsupported operand types for + ("int" and "str")')
+
+
+# Types of two modules, as stored by the flat tables keyed by fully
+# qualified names which preceded the scope trees. The second module
+# overwrites some entries of the first one.
+MODULE_TYPES = [
+    {
+        ('m', 'x'): 'm.x',
+        ('m', 'f'): 'm.f',
+        ('m', 'f', 'x'): 'm.f.x',
+        ('m', 'f', 'y'): 'm.f.y',
+        ('m', 'C'): 'm.C',
+        ('m', 'C', 'g'): 'm.C.g',
+        ('m', 'C', 'g', 'self'): 'm.C.g.self',
+        ('m', 'C', 'g', 'lambda1_2', 'y'): 'm.C.g.lambda1_2.y',
+    },
+    {
+        ('m', 'f', 'x'): 'm.f.x2',
+        ('n', 'h'): 'n.h',
+        ('n', 'h', 'x'): 'n.h.x',
+        ('n', 'h', 'lambda3_4', 'z'): 'n.h.lambda3_4.z',
+    },
+]
+
+MODULE_ALT_TYPES = [
+    {('m', 'f', 'y'): {(3, 4): 'm.f.y@3'}},
+    {('m', 'f', 'y'): {(5, 6): 'm.f.y@5'}, ('n', 'h', 'x'): {(7, 8): 'n.h.x@7'}},
+]
+
+
+def flat_get_type(all_types, alt_types, prefix, name):
+    key = tuple(prefix + [name])
+    result = all_types.get(key)
+    if result is None:
+        if not prefix:
+            return None, None
+        return flat_get_type(all_types, alt_types, prefix[:-1], name)
+    return result, alt_types.get(key)
+
+
+def flat_get_func_type(all_types, prefix):
+    result = all_types.get(tuple(prefix))
+    if result is None:
+        if not prefix:
+            return None
+        return flat_get_func_type(all_types, prefix[:-1])
+    return result
+
+
+def test_type_scopes_agree_with_flat_tables():
+    """Lookups in merged scope trees equal those in flat tables."""
+    all_types = {}
+    alt_types = {}
+    types = TypeInfo()
+    for module_types, module_alt_types in zip(MODULE_TYPES, MODULE_ALT_TYPES):
+        scopes = TypeScope(None, None)
+        for fqn, typ in module_types.items():
+            scopes.get_scope(fqn[:-1]).types[fqn[-1]] = typ
+        for fqn, alts in module_alt_types.items():
+            scopes.get_scope(fqn[:-1]).alt_types[fqn[-1]] = alts
+        types.scopes.merge(scopes)
+        all_types.update(module_types)
+        alt_types.update(module_alt_types)
+    prefixes = set()
+    names = set()
+    for fqn in all_types:
+        names.add(fqn[-1])
+        for length in range(len(fqn) + 1):
+            prefixes.add(fqn[:length])
+            # Prefixes which continue into scopes without any types.
+            prefixes.add(fqn[:length] + ('lambda5_6',))
+    names.add('unknown')
+    for prefix in sorted(prefixes):
+        assert (types.get_func_type(list(prefix)) ==
+                flat_get_func_type(all_types, list(prefix))), prefix
+        for name in sorted(names):
+            assert (types.get_type(list(prefix), name) ==
+                    flat_get_type(all_types, alt_types, list(prefix), name)), \
+                (prefix, name)
+    assert types.scopes.get(('m', 'f', 'x')) == 'm.f.x2'
+    assert types.scopes.get(('m', 'f', 'z')) is None
+    assert types.scopes.get(('m', 'g', 'x')) is None
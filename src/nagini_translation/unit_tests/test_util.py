@@ -0,0 +1,104 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+"""Unit tests for statement containment and surrounding try blocks."""
+
+import ast
+import random
+
+from nagini_translation.lib.util import (
+    contains_stmt,
+    get_surrounding_try_blocks,
+    number_nodes,
+    TryBlockList,
+)
+
+
+NESTED_STATEMENTS = """
+def f(x: int) -> int:
+    try:
+        y = x
+        with open(x) as a:
+            while x > 0:
+                try:
+                    x -= 1
+                except Exception:
+                    try:
+                        raise
+                    finally:
+                        y = 0
+                else:
+                    for i in range(x):
+                        with a:
+                            y += i
+        try:
+            pass
+        finally:
+            x = y
+    except Exception:
+        try:
+            return x
+        except Exception:
+            pass
+    return y
+"""
+
+
+class TryBlock:
+    """Stands in for a try block, protecting the body of its node."""
+
+    def __init__(self, node: ast.AST) -> None:
+        self.node = node
+        self.protected_region = node.body
+
+
+def walk_contains(container, contained: ast.AST) -> bool:
+    roots = container if isinstance(container, list) else [container]
+    return any(node is contained for root in roots for node in ast.walk(root))
+
+
+def test_statement_containment_intervals():
+    """Interval checks agree with searching the subtrees."""
+    tree = ast.parse(NESTED_STATEMENTS)
+    number_nodes(tree)
+    statements = [node for node in ast.walk(tree) if isinstance(node, ast.stmt)]
+    for container in statements:
+        for stmt in statements:
+            assert (contains_stmt(container, stmt) ==
+                    walk_contains(container, stmt))
+        body = getattr(container, 'body', [])
+        assert (contains_stmt(body, statements[-1]) ==
+                walk_contains(body, statements[-1]))
+    # Nodes created after numbering are found by searching.
+    new_stmt = ast.Pass()
+    statements[0].body.append(new_stmt)
+    assert contains_stmt(statements[0], new_stmt)
+    assert not contains_stmt(statements[1], new_stmt)
+
+
+def test_surrounding_try_blocks():
+    """Try blocks protecting a statement are found innermost first."""
+    tree = ast.parse(NESTED_STATEMENTS)
+    number_nodes(tree)
+    blocks = [TryBlock(node) for node in ast.walk(tree)
+              if isinstance(node, (ast.Try, ast.With))]
+    random.Random(0).shuffle(blocks)
+    try_blocks = TryBlockList()
+    for block in blocks:
+        try_blocks.append(block)
+    for stmt in ast.walk(tree):
+        if not isinstance(stmt, ast.stmt):
+            continue
+        protecting = [block for block in blocks
+                      if walk_contains(block.protected_region, stmt)]
+        # Inner blocks are protected by all outer ones.
+        expected = sorted(protecting, key=lambda block: -sum(
+            1 for other in protecting
+            if walk_contains(other.protected_region, block.node)))
+        assert try_blocks.surrounding(stmt) == expected
+        assert get_surrounding_try_blocks(try_blocks, stmt) == expected
+    # Statements which are not numbered fall back to searching.
+    assert try_blocks.surrounding(ast.Pass()) is None
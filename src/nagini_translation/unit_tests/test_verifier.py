@@ -0,0 +1,245 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+"""Unit tests for the backend pool, the watchdog and merging results."""
+
+import threading
+import time
+
+from nagini_translation import verifier
+from nagini_translation.verifier import (
+    backend_options,
+    BackendPool,
+    BUDGET_EXCEEDED,
+    Failure,
+    merge_results,
+    Success,
+    TIMEOUT,
+    ViperVerifier,
+    Watchdog,
+)
+
+
+class FakeBackend:
+    """Stands in for a started Silicon or Carbon instance."""
+
+    def __init__(self, jvm, filename: str, options=()) -> None:
+        self.options = list(options)
+        self.healthy = True
+        self.stopped = False
+        self.startup_time = 1.0
+        self.verification_time = 0.0
+
+    def stop(self) -> None:
+        self.healthy = False
+        self.stopped = True
+
+
+def test_backend_pool_replaces_failed_instances(monkeypatch):
+    """Failed instances are stopped and replaced by new ones."""
+    monkeypatch.setattr(verifier, 'Silicon', FakeBackend)
+    pool = BackendPool(None)
+    first = pool.acquire(ViperVerifier.silicon)
+    pool.release(first)
+    assert pool.acquire(ViperVerifier.silicon) is first
+    assert pool.acquire(ViperVerifier.silicon, ['--timeout', '5']) is not first
+    first.healthy = False
+    pool.release(first)
+    assert first.stopped
+    second = pool.acquire(ViperVerifier.silicon)
+    assert second is not first
+    pool.release(second)
+    # Instances failing while idle are replaced when they are acquired.
+    second.healthy = False
+    third = pool.acquire(ViperVerifier.silicon)
+    assert third is not second and second.stopped
+    assert pool.statistics.started == 4
+    assert pool.statistics.startup_time == 4.0
+    assert pool.statistics.discarded == 2
+
+
+def test_backend_pool_bounds_idle_instances(monkeypatch):
+    """The pool stops the idle instances released longest ago."""
+    monkeypatch.setattr(verifier, 'Silicon', FakeBackend)
+    monkeypatch.setattr(verifier, 'Carbon', FakeBackend)
+    pool = BackendPool(None, max_idle_per_key=2, max_idle=3)
+    pool.start(ViperVerifier.silicon, count=5)
+    assert pool.statistics.started == 2
+    silicon = [pool.acquire(ViperVerifier.silicon) for _ in range(3)]
+    for instance in silicon:
+        pool.release(instance)
+    assert silicon[0].stopped and not silicon[1].stopped
+    carbon = [pool.acquire(ViperVerifier.carbon, [str(i)]) for i in range(2)]
+    for instance in carbon:
+        pool.release(instance)
+    assert silicon[1].stopped and not silicon[2].stopped
+    assert not any(instance.stopped for instance in carbon)
+    assert pool.statistics.evicted == 2
+    pool.shutdown()
+    assert all(instance.stopped for instance in silicon + carbon)
+
+
+def test_backend_options():
+    """Resource limits are mapped to the options of each backend."""
+    assert backend_options(ViperVerifier.silicon) == []
+    assert backend_options(ViperVerifier.carbon) == []
+    assert backend_options(ViperVerifier.silicon, 10, 512, '-v:1', 2) == [
+        '--timeout', '10', '--z3Args', '-memory:512 -v:1',
+        '--numberOfParallelVerifiers', '2']
+    assert backend_options(ViperVerifier.carbon, 10, 512, '-v:1 -st', 2) == [
+        '--boogieOpt', '/timeLimit:10 /z3opt:memory_max_size=512 '
+        '/z3opt:-v:1 /z3opt:-st /vcsCores:2']
+
+
+class FakeJVM:
+    """Stands in for the JVM the watchdog thread attaches to."""
+
+    def attach_current_thread(self) -> None:
+        pass
+
+
+class FakeProgram:
+    """Stands in for a Silver program with a single method."""
+
+    def methods(self):
+        return self
+
+    def size(self) -> int:
+        return 1
+
+
+class BlockingBackend(FakeBackend):
+    """
+    Stands in for a backend which takes ``duration`` seconds to verify a
+    program unless it is stopped before. A stopped instance fails, unless
+    ``succeeds_when_stopped`` is set.
+    """
+
+    duration = 10.0
+    succeeds_when_stopped = False
+
+    def __init__(self, jvm, filename: str, options=()) -> None:
+        super().__init__(jvm, filename, options)
+        self._stopped = threading.Event()
+
+    def verify(self, prog, arp: bool = False):
+        start = time.time()
+        stopped = self._stopped.wait(self.duration)
+        self.verification_time = time.time() - start
+        if stopped and not self.succeeds_when_stopped:
+            raise RuntimeError('Backend stopped.')
+        return Success()
+
+    def stop(self) -> None:
+        super().stop()
+        self._stopped.set()
+
+
+def verify_watched(pool: BackendPool, watchdog: Watchdog):
+    """Verifies a program on the pool, returns the result and the duration."""
+    start = time.time()
+    result = pool.verify(FakeProgram(), ViperVerifier.silicon,
+                         watchdog=watchdog)
+    return result, time.time() - start
+
+
+def test_watchdog_stops_backends_after_grace_period(monkeypatch):
+    """Backends are stopped once they exceed the timeout and grace period."""
+    monkeypatch.setattr(verifier, 'Silicon', BlockingBackend)
+    monkeypatch.setattr(verifier, '_TIMEOUT_GRACE', 0.5)
+    monkeypatch.setattr(verifier, '_WATCHDOG_INTERVAL', 0.01)
+    pool = BackendPool(FakeJVM())
+    # Backends which finish within the grace period are not stopped.
+    monkeypatch.setattr(BlockingBackend, 'duration', 0.2)
+    with Watchdog(FakeJVM(), 0.1, 0) as watchdog:
+        result, _ = verify_watched(pool, watchdog)
+    assert result
+    assert pool.statistics.discarded == 0
+    monkeypatch.setattr(BlockingBackend, 'duration', 10.0)
+    with Watchdog(FakeJVM(), 0.1, 0) as watchdog:
+        result, duration = verify_watched(pool, watchdog)
+    assert not result and result.outcome == TIMEOUT
+    assert 0.6 <= duration < 5
+    assert result.backend_messages == [
+        'Verification timed out after 0.1 seconds.']
+    # The stopped instance is not reused.
+    assert pool.statistics.discarded == 1
+
+
+def test_watchdog_replaces_results_of_stopped_backends(monkeypatch):
+    """Results of backends stopped by the watchdog are not trusted."""
+    monkeypatch.setattr(verifier, 'Silicon', BlockingBackend)
+    monkeypatch.setattr(verifier, '_TIMEOUT_GRACE', 0.0)
+    monkeypatch.setattr(verifier, '_WATCHDOG_INTERVAL', 0.01)
+    monkeypatch.setattr(BlockingBackend, 'succeeds_when_stopped', True)
+    pool = BackendPool(FakeJVM())
+    with Watchdog(FakeJVM(), 0.1, 0) as watchdog:
+        result, _ = verify_watched(pool, watchdog)
+    assert not result and result.outcome == TIMEOUT
+
+
+def test_watchdog_enforces_budget(monkeypatch):
+    """Once the budget is used up, nothing is verified anymore."""
+    monkeypatch.setattr(verifier, 'Silicon', BlockingBackend)
+    monkeypatch.setattr(verifier, '_WATCHDOG_INTERVAL', 0.01)
+    pool = BackendPool(FakeJVM())
+    with Watchdog(FakeJVM(), 0, 0.1) as watchdog:
+        result, duration = verify_watched(pool, watchdog)
+        assert not result and result.outcome == BUDGET_EXCEEDED
+        assert duration < 5
+        assert watchdog.exhausted()
+        result, _ = verify_watched(pool, watchdog)
+        assert not result and result.outcome == BUDGET_EXCEEDED
+    assert pool.statistics.started == 1
+
+
+class FakeSourcePosition:
+    """Stands in for the source position of an error."""
+
+    def __init__(self, file_name: str, line: int, column: int = 0) -> None:
+        self.file_name = file_name
+        self.line = line
+        self.column = column
+
+    def __str__(self) -> str:
+        return '{}@{}.{}'.format(self.file_name, self.line, self.column)
+
+
+class FakeError:
+    """Stands in for a converted verification error."""
+
+    def __init__(self, full_id: str, position: FakeSourcePosition) -> None:
+        self.full_id = full_id
+        self.position = position
+        self.reason = self
+
+
+def test_merge_results():
+    """Errors of all parts are reported once each, in source order."""
+    assert merge_results([Success(), Success()])
+    shared = FakeError('postcondition.violated', FakeSourcePosition('a.py', 3))
+    late = FakeError('assert.failed', FakeSourcePosition('a.py', 9))
+    early = FakeError('assert.failed', FakeSourcePosition('a.py', 1, 4))
+    other = FakeError('assert.failed', FakeSourcePosition('a.py', 1, 4))
+    other.full_id = 'call.precondition'
+    merged = merge_results([
+        Failure.from_errors([late, shared]),
+        Success(),
+        Failure.from_errors([shared, early, other], ['message']),
+    ])
+    assert not merged
+    assert merged.errors == [early, other, shared, late]
+    assert merged.backend_messages == ['message']
+    assert merged.interruption is None
+
+
+def test_merge_results_interruptions():
+    """An exceeded budget takes precedence over timeouts of single parts."""
+    timeout = Failure.from_errors([], ['timeout'], TIMEOUT)
+    budget = Failure.from_errors([], ['budget'], BUDGET_EXCEEDED)
+    assert merge_results([Success(), timeout]).outcome == TIMEOUT
+    assert merge_results([budget, timeout]).outcome == BUDGET_EXCEEDED
+    assert merge_results([timeout, budget, timeout]).outcome == BUDGET_EXCEEDED
@@ -0,0 +1,122 @@
+"""
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+"""Unit tests for the symbol tables of modules and module views."""
+
+from nagini_translation.lib.program_nodes import PythonModule
+from nagini_translation.lib.views import (
+    flatten_members,
+    ModuleDictView,
+    PythonModuleView,
+)
+
+
+def test_flatten_members():
+    """Names map to their member in the first dict containing them."""
+    first, second = object(), object()
+    flat = flatten_members([{'a': first}, {}, {'a': second, 'b': second}])
+    assert flat == {'a': first, 'b': second}
+    assert flatten_members([]) == {}
+
+
+def make_module(name: str) -> PythonModule:
+    return PythonModule(None, None, name, None, None)
+
+
+def test_module_tables_follow_member_changes(monkeypatch):
+    """Symbol tables are updated per member instead of being rebuilt."""
+    a, b, c = make_module('a'), make_module('b'), make_module('c')
+    a.add_from_import(b)
+    a.add_from_import(PythonModuleView(c, [('g', 'h')]))
+    view = PythonModuleView(a, [('f', None), ('h', None)])
+    functions = view.module.functions
+    assert 'f' not in functions
+    assert view.get_contents(True) == {}
+    assert a.get_contents(True) == {}
+    builds = []
+    build = ModuleDictView._build
+    monkeypatch.setattr(ModuleDictView, '_build',
+                        lambda self: builds.append(self) or build(self))
+    f, g, own_f, cls = object(), object(), object(), object()
+    b.functions['f'] = f
+    c.functions['g'] = g
+    assert functions['f'] is f
+    assert functions['h'] is g
+    assert view.get_contents(True)['f'] is f
+    a.functions['f'] = own_f
+    assert functions['f'] is own_f
+    assert view.get_contents(True)['f'] is own_f
+    assert a.get_contents(True)['f'] is own_f
+    # Classes are searched before functions.
+    a.classes['f'] = cls
+    assert a.get_contents(True)['f'] is cls
+    del a.classes['f']
+    del a.functions['f']
+    assert a.get_contents(True) == {}
+    assert functions['f'] is f
+    b.functions.pop('f')
+    assert 'f' not in functions
+    assert 'f' not in view.get_contents(True)
+    assert builds == []
+    # New imports rebuild the tables of views including the importer.
+    d = make_module('d')
+    d.functions['f'] = f
+    b.add_from_import(d)
+    assert functions['f'] is f
+    assert builds == [functions]
+
+
+def test_included_module_tables_follow_imports():
+    """Attributes of a module and its imports are found in a single table."""
+    a, b, c = make_module('a'), make_module('b'), make_module('c')
+    a.add_from_import(b)
+    f, g, own_f, h = object(), object(), object(), object()
+    b.functions['f'] = f
+    included = a.get_included_contents()
+    assert included == {'f': f}
+    a.methods['f'] = own_f
+    assert included['f'] is own_f
+    a.methods.pop('f')
+    assert included['f'] is f
+    c.functions['g'] = g
+    c.functions['h'] = h
+    b.add_from_import(PythonModuleView(c, [('g', None)]))
+    included = a.get_included_contents()
+    assert included == {'f': f, 'g': g}
+    del c.functions['g']
+    assert included == {'f': f}
+    # Views have tables of their own.
+    view = PythonModuleView(a, [('f', None)])
+    assert view.module.get_included_contents() == {'f': f}
+    assert a.get_included_contents() is included
+
+
+def test_module_views_detect_import_cycles():
+    """Views in an import cycle are complete once the outermost is built."""
+    a, b = make_module('a'), make_module('b')
+    a.add_from_import(PythonModuleView(b, [('x', None)]))
+    b.add_from_import(PythonModuleView(a, [('y', None)]))
+    x, y = object(), object()
+    a.functions['y'] = y
+    b.functions['x'] = x
+    imported_into_a = a.from_imports[0].module.functions
+    imported_into_b = b.from_imports[0].module.functions
+    dicts, members, complete = imported_into_a._build()
+    assert members == {'x': x}
+    assert complete
+    assert imported_into_a not in dicts
+    assert imported_into_b in dicts
+    # The view of a was built while the view of b was under construction,
+    # so it was incomplete and has not been cached.
+    assert dict(imported_into_a.items()) == {'x': x}
+    assert imported_into_b._dict is None
+    dicts, members, complete = imported_into_b._build()
+    assert members == {'y': y}
+    assert complete
+    assert dict(imported_into_b.items()) == {'y': y}
+    new_x = object()
+    b.functions['x'] = new_x
+    assert imported_into_a['x'] is new_x
@@ -5,14 +5,18 @@ file, You can obtain one at http://mozilla.org/MPL/2.0/.
 """
 
 import ast
+import threading
+import time
 
 from abc import ABCMeta
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 from nagini_translation.lib import config
 from nagini_translation.lib.errors import error_manager
 from nagini_translation.lib.jvmaccess import JVM
-from typing import Optional
+from nagini_translation.lib.profiling import profiler
+from typing import List, Optional, Sequence, Tuple
 
 
 class ViperVerifier(Enum):
@@ -20,8 +24,78 @@ class ViperVerifier(Enum):
     carbon = 'carbon'
 
 
+# Outcomes of verifying a member.
+VERIFIED = 'verified'
+FAILED = 'failed'
+TIMEOUT = 'timeout'
+BUDGET_EXCEEDED = 'budget exceeded'
+UNKNOWN = 'unknown'
+CACHED = 'cached'
+
+# Outcomes which depend on the resource limits, and are therefore not cached.
+INCOMPLETE_OUTCOMES = (TIMEOUT, BUDGET_EXCEEDED, UNKNOWN)
+
+# Name under which the part of a split program which does not belong to a
+# single member is reported.
+REST_OF_PROGRAM = '(rest of program)'
+
+_TIMEOUT_ERROR_ID = 'timeout.occurred'
+
+
+class MemberTiming:
+    """
+    Time the backend spent verifying a single member, and the outcome.
+    """
+
+    def __init__(self, name: str, silver_name: Optional[str],
+                 line: Optional[int], duration: float, outcome: str) -> None:
+        self.name = name
+        self.silver_name = silver_name
+        self.line = line
+        self.duration = duration
+        self.outcome = outcome
+
+    @classmethod
+    def of_member(cls, member: Optional['silver.ast.Member'], duration: float,
+                  outcome: str) -> 'MemberTiming':
+        """
+        Creates the timing of the given Silver member (or of the rest of the
+        program if None), using the name of the Python function the member
+        was translated from if there is one.
+        """
+        if member is None:
+            return cls(REST_OF_PROGRAM, None, None, duration, outcome)
+        silver_name = member.name()
+        node = error_manager.get_node(member.pos())
+        if not isinstance(node, ast.FunctionDef):
+            return cls(silver_name, silver_name, None, duration, outcome)
+        name = node.name
+        parent = getattr(node, '_parent', None)
+        if isinstance(parent, ast.ClassDef):
+            name = parent.name + '.' + name
+        return cls(name, silver_name, node.lineno, duration, outcome)
+
+    def to_string(self) -> str:
+        name = self.name
+        if self.line is not None:
+            name += ' (line {})'.format(self.line)
+        if self.silver_name and self.silver_name != self.name:
+            name += ' [{}]'.format(self.silver_name)
+        return '{:8.2f}s  {:15}  {}'.format(self.duration, self.outcome, name)
+
+
 class VerificationResult(metaclass=ABCMeta):
-    pass
+    # Time the backend spent verifying the program.
+    duration = 0.0
+    # Timings of the individual members, if they were verified separately.
+    timings = ()
+
+    def timings_string(self) -> str:
+        """
+        Returns the member timings, slowest first.
+        """
+        timings = sorted(self.timings, key=lambda t: t.duration, reverse=True)
+        return 'Timings:\n' + '\n'.join(t.to_string() for t in timings)
 
 
 class Success(VerificationResult):
@@ -29,33 +103,121 @@ class Success(VerificationResult):
     Encodes a verification success
     """
 
+    outcome = VERIFIED
+
     def __bool__(self):
         return True
 
-    def to_string(self, ide_mode: bool, show_viper_errors: bool) -> str:
-        return "Verification successful"
+    def to_string(self, ide_mode: bool, show_viper_errors: bool,
+                  report_timings: bool = False) -> str:
+        result = "Verification successful"
+        if report_timings and self.timings:
+            result += '\n' + self.timings_string()
+        return result
 
 
 class Failure(VerificationResult):
     """
-    Encodes a verification failure and provides access to the errors
+    Encodes a verification failure and provides access to the errors.
+    Errors which are not verification errors (e.g. timeouts or crashes of
+    the backend) cannot be attributed to Python code and are only kept as
+    messages.
     """
 
     def __init__(
             self, errors: 'silver.verifier.AbstractError',
             jvm: Optional[JVM] = None):
-        self.errors = error_manager.convert(errors, jvm)
+        verification_errors = []
+        self.backend_messages = []
+        # Outcome if the verification was interrupted (TIMEOUT or
+        # BUDGET_EXCEEDED), None otherwise.
+        self.interruption = None
+        for error in errors:
+            if error.fullId() == _TIMEOUT_ERROR_ID:
+                self.interruption = TIMEOUT
+                self.backend_messages.append(error.readableMessage())
+            elif hasattr(error, 'transformedError'):
+                verification_errors.append(error)
+            else:
+                self.backend_messages.append(error.readableMessage())
+        self.errors = error_manager.convert(verification_errors, jvm)
+
+    @classmethod
+    def from_errors(cls, errors: List['Error'],
+                    backend_messages: List[str] = (),
+                    interruption: Optional[str] = None) -> 'Failure':
+        """
+        Creates a failure from already converted errors.
+        """
+        failure = cls.__new__(cls)
+        failure.errors = errors
+        failure.backend_messages = list(backend_messages)
+        failure.interruption = interruption
+        return failure
 
     def __bool__(self):
         return False
 
-    def to_string(self, ide_mode: bool, show_viper_errors: bool) -> str:
+    @property
+    def outcome(self) -> str:
+        if self.interruption:
+            return self.interruption
+        if not self.errors:
+            return UNKNOWN
+        return FAILED
+
+    def to_string(self, ide_mode: bool, show_viper_errors: bool,
+                  report_timings: bool = False) -> str:
         all_errors = [error.string(ide_mode, show_viper_errors) for error in self.errors]
+        all_errors.extend(self.backend_messages)
         unique_errors = []
         for e in all_errors:
             if e not in unique_errors:
                 unique_errors.append(e)
-        return "Verification failed\nErrors:\n" + '\n'.join(unique_errors)
+        result = "Verification failed\nErrors:\n" + '\n'.join(unique_errors)
+        if report_timings and self.timings:
+            result += '\n' + self.timings_string()
+        return result
+
+
+def _source_order(error: 'Error') -> Tuple:
+    try:
+        position = error.position
+        return 0, position.file_name, position.line, position.column
+    except AttributeError:
+        # Errors without a source position are reported last.
+        return 1, '', 0, 0
+
+
+def merge_results(results: List[VerificationResult]) -> VerificationResult:
+    """
+    Combines the results of verifying independent parts of a program into a
+    single result which reports the errors of all parts in source order.
+    Errors reported by several parts (e.g. for a function contained in all
+    of them) are reported only once.
+    """
+    errors = []
+    seen = set()
+    backend_messages = []
+    interruption = None
+    failed = False
+    for result in results:
+        if result:
+            continue
+        failed = True
+        if interruption != BUDGET_EXCEEDED:
+            interruption = result.interruption or interruption
+        backend_messages.extend(result.backend_messages)
+        for error in result.errors:
+            key = (error.full_id, str(error.position),
+                   str(error.reason.position))
+            if key not in seen:
+                seen.add(key)
+                errors.append(error)
+    if not failed:
+        return Success()
+    errors.sort(key=_source_order)
+    return Failure.from_errors(errors, backend_messages, interruption)
 
 
 class ARPPlugin:
@@ -103,40 +265,56 @@ class Silicon:
     Provides access to the Silicon verifier
     """
 
-    def __init__(self, jvm: JVM, filename: str):
+    def __init__(self, jvm: JVM, filename: str, options: Sequence[str] = ()):
         self.jvm = jvm
         self.silver = jvm.viper.silver
         if not jvm.is_known_class(jvm.viper.silicon.Silicon):
             raise Exception('Silicon backend not found on classpath.')
+        start = time.time()
         self.silicon = jvm.viper.silicon.Silicon()
-        args = jvm.scala.collection.mutable.ArraySeq(4)
-        args.update(0, '--z3Exe')
-        args.update(1, config.z3_path)
-        args.update(2, '--disableCatchingExceptions')
-        args.update(3, filename)
-        self.silicon.parseCommandLine(args)
+        args = ['--z3Exe', config.z3_path, '--disableCatchingExceptions']
+        args += list(options) + [filename]
+        self.silicon.parseCommandLine(_to_arg_seq(jvm, args))
         self.silicon.start()
         self.ready = True
+        self.healthy = True
+        self.startup_time = time.time() - start
+        self.verification_time = 0.0
 
     def verify(self, prog: 'silver.ast.Program', arp=False) -> VerificationResult:
         """
         Verifies the given program using Silicon
         """
-        if not self.ready:
-            self.silicon.restart()
-        result = self.silicon.verify(prog)
+        start = time.time()
+        try:
+            if not self.ready:
+                self.silicon.restart()
+            result = self.silicon.verify(prog)
+        except Exception:
+            # Most likely Z3 crashed or the instance was stopped.
+            self.healthy = False
+            raise
+        finally:
+            self.verification_time = time.time() - start
         if arp:
             result = get_arp_plugin(self.jvm).map_result(result)
         self.ready = False
         if isinstance(result, self.silver.verifier.Failure):
-            it = result.errors().toIterator()
-            errors = []
-            while it.hasNext():
-                errors += [it.next()]
-            return Failure(errors, self.jvm)
+            return Failure(_errors_of(self.jvm, result), self.jvm)
         else:
             return Success()
 
+    def stop(self) -> None:
+        """
+        Stops the backend, aborting any verification that is currently
+        running. The instance cannot be used afterwards.
+        """
+        self.healthy = False
+        silicon = self.silicon
+        self.silicon = None
+        if silicon:
+            silicon.stop()
+
     def __del__(self):
         if hasattr(self, 'silicon') and self.silicon:
             self.silicon.stop()
@@ -147,37 +325,407 @@ class Carbon:
     Provides access to the Carbon verifier
     """
 
-    def __init__(self, jvm: JVM, filename: str):
+    def __init__(self, jvm: JVM, filename: str, options: Sequence[str] = ()):
         self.silver = jvm.viper.silver
         if not jvm.is_known_class(jvm.viper.carbon.CarbonVerifier):
             raise Exception('Carbon backend not found on classpath.')
+        start = time.time()
         self.carbon = jvm.viper.carbon.CarbonVerifier()
-        args = jvm.scala.collection.mutable.ArraySeq(5)
-        args.update(0, '--boogieExe')
-        args.update(1, config.boogie_path)
-        args.update(2, '--z3Exe')
-        args.update(3, config.z3_path)
-        args.update(4, filename)
-        self.carbon.parseCommandLine(args)
+        args = ['--boogieExe', config.boogie_path, '--z3Exe', config.z3_path]
+        args += list(options) + [filename]
+        self.carbon.parseCommandLine(_to_arg_seq(jvm, args))
         self.carbon.start()
         self.ready = True
+        self.healthy = True
         self.jvm = jvm
+        self.startup_time = time.time() - start
+        self.verification_time = 0.0
 
     def verify(self, prog: 'silver.ast.Program', arp=False) -> VerificationResult:
         """
         Verifies the given program using Carbon
         """
-        if not self.ready:
-            self.carbon.restart()
-        result = self.carbon.verify(prog)
+        start = time.time()
+        try:
+            if not self.ready:
+                self.carbon.restart()
+            result = self.carbon.verify(prog)
+        except Exception:
+            self.healthy = False
+            raise
+        finally:
+            self.verification_time = time.time() - start
         if arp:
             result = get_arp_plugin(self.jvm).map_result(result)
         self.ready = False
         if isinstance(result, self.silver.verifier.Failure):
-            it = result.errors().toIterator()
-            errors = []
-            while it.hasNext():
-                errors += [it.next()]
-            return Failure(errors)
+            return Failure(_errors_of(self.jvm, result))
         else:
             return Success()
+
+    def stop(self) -> None:
+        """
+        Stops the backend, aborting any verification that is currently
+        running. The instance cannot be used afterwards.
+        """
+        self.healthy = False
+        carbon = self.carbon
+        self.carbon = None
+        if carbon:
+            carbon.stop()
+
+
+def _errors_of(jvm: JVM, result: 'silver.verifier.Failure') -> List:
+    """
+    Returns the errors of the given failure, transferred as a single array.
+    """
+    tag = getattr(getattr(jvm.scala.reflect, 'ClassTag$'), 'MODULE$').AnyRef()
+    errors = result.errors().toArray(tag)
+    # Slicing transfers the array in one call; list() makes the result a
+    # list regardless of what the JPype version returns for slices.
+    return list(errors[0:len(errors)])
+
+
+def _to_arg_seq(jvm: JVM, args: List[str]):
+    result = jvm.scala.collection.mutable.ArraySeq(len(args))
+    for index, arg in enumerate(args):
+        result.update(index, arg)
+    return result
+
+
+# Name passed to backends as the verified file; the backends only use it for
+# reporting, pooled instances verify programs of many files.
+_POOLED_FILE_NAME = 'nagini'
+
+
+def backend_options(backend: ViperVerifier, timeout: int = 0,
+                    z3_memory: int = 0, z3_args: str = None,
+                    cores: int = 0) -> List[str]:
+    """
+    Returns the command line options for the given backend which implement
+    the given timeout (in seconds, per verified method for Carbon, per
+    verified program for Silicon), Z3 memory limit (in megabytes),
+    additional Z3 arguments and number of parallel verifiers inside the
+    backend. Zero or None means that the backend default is used.
+    """
+    options = []
+    if backend == ViperVerifier.silicon:
+        if timeout:
+            options += ['--timeout', str(timeout)]
+        z3 = []
+        if z3_memory:
+            z3.append('-memory:{}'.format(z3_memory))
+        if z3_args:
+            z3.append(z3_args)
+        if z3:
+            options += ['--z3Args', ' '.join(z3)]
+        if cores:
+            options += ['--numberOfParallelVerifiers', str(cores)]
+    elif backend == ViperVerifier.carbon:
+        boogie = []
+        if timeout:
+            boogie.append('/timeLimit:{}'.format(timeout))
+        if z3_memory:
+            boogie.append('/z3opt:memory_max_size={}'.format(z3_memory))
+        if z3_args:
+            boogie.extend('/z3opt:' + arg for arg in z3_args.split())
+        if cores:
+            boogie.append('/vcsCores:{}'.format(cores))
+        if boogie:
+            options += ['--boogieOpt', ' '.join(boogie)]
+    return options
+
+
+# Time a backend may run past its timeout before it is stopped, since
+# backends only check their timeouts from time to time.
+_TIMEOUT_GRACE = 10.0
+
+# Interval in which the watchdog checks the running backends.
+_WATCHDOG_INTERVAL = 0.5
+
+
+class Watchdog:
+    """
+    Stops backend instances which have been verifying a program for
+    (shortly) longer than ``timeout`` seconds, and all running instances
+    once ``budget`` seconds have passed since the watchdog was created, s.t.
+    a single pathological program cannot block the verification
+    indefinitely.
+    """
+
+    def __init__(self, jvm: JVM, timeout: Optional[float],
+                 budget: Optional[float]) -> None:
+        self.jvm = jvm
+        self.timeout = timeout
+        self.limit = timeout + _TIMEOUT_GRACE if timeout else None
+        self.budget = budget
+        self.deadline = time.time() + budget if budget else None
+        self._running = {}
+        self._interrupted = {}
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread = None
+
+    def __enter__(self) -> 'Watchdog':
+        if self.limit or self.deadline:
+            self._thread = threading.Thread(target=self._run,
+                                            name='nagini-watchdog',
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._done.set()
+        if self._thread:
+            self._thread.join()
+
+    def exhausted(self) -> bool:
+        """
+        Checks if the budget is used up.
+        """
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def watch(self, instance) -> None:
+        with self._lock:
+            self._running[id(instance)] = (instance, time.time())
+
+    def interrupted(self, instance) -> bool:
+        with self._lock:
+            return id(instance) in self._interrupted
+
+    def unwatch(self, instance) -> Optional[str]:
+        """
+        Stops watching the given instance. Returns the outcome if the
+        watchdog stopped it (TIMEOUT or BUDGET_EXCEEDED), None otherwise.
+        """
+        with self._lock:
+            self._running.pop(id(instance), None)
+            return self._interrupted.pop(id(instance), None)
+
+    def describe(self, outcome: str) -> str:
+        if outcome == BUDGET_EXCEEDED:
+            return 'Verification budget of {} seconds exceeded.'.format(
+                self.budget)
+        return 'Verification timed out after {} seconds.'.format(
+            self.timeout)
+
+    def _run(self) -> None:
+        self.jvm.attach_current_thread()
+        while not self._done.wait(_WATCHDOG_INTERVAL):
+            now = time.time()
+            to_stop = []
+            with self._lock:
+                for key, (instance, start) in list(self._running.items()):
+                    if self.deadline is not None and now >= self.deadline:
+                        outcome = BUDGET_EXCEEDED
+                    elif self.limit and now - start >= self.limit:
+                        outcome = TIMEOUT
+                    else:
+                        continue
+                    self._interrupted[key] = outcome
+                    del self._running[key]
+                    to_stop.append(instance)
+            for instance in to_stop:
+                instance.stop()
+
+
+class BackendStatistics:
+    """
+    Time spent starting backends and verifying programs with them.
+    """
+
+    def __init__(self) -> None:
+        self.started = 0
+        self.startup_time = 0.0
+        # Instances stopped because they failed, and idle instances stopped
+        # because the pool held too many.
+        self.discarded = 0
+        self.evicted = 0
+        self.verifications = 0
+        self.verification_time = 0.0
+
+    def __str__(self) -> str:
+        return ('Started {} backend(s) in {:.2f} seconds ({} failed, {} '
+                'evicted), {} verification(s) took {:.2f} seconds.'.format(
+                    self.started, self.startup_time, self.discarded,
+                    self.evicted, self.verifications, self.verification_time))
+
+
+class BackendPool:
+    """
+    Hands out started backend instances, keyed by backend and command line
+    options, s.t. starting a backend (parsing its configuration, launching
+    Z3 or Boogie) is only paid once per instance instead of once per
+    verified program. Instances are restarted between programs; instances
+    that failed (e.g. because the solver crashed) are discarded and replaced
+    by new ones.
+
+    Since every distinct set of options needs its own instances, at most
+    ``max_idle_per_key`` idle instances are kept per backend and options,
+    and at most ``max_idle`` in total; the instances released longest ago
+    are stopped first.
+    """
+
+    def __init__(self, jvm: JVM, max_idle_per_key: int = 8,
+                 max_idle: int = 16) -> None:
+        self.jvm = jvm
+        self.max_idle_per_key = max_idle_per_key
+        self.max_idle = max_idle
+        self.statistics = BackendStatistics()
+        # Idle instances by key, each list ordered by release time.
+        self._idle = {}
+        self._released = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, backend: ViperVerifier, options: Sequence[str] = ()):
+        """
+        Returns a started instance of the given backend for the exclusive
+        use of the caller, who has to release it afterwards.
+        """
+        key = (backend, tuple(options))
+        failed = []
+        with self._lock:
+            idle = self._idle.get(key)
+            result = None
+            while idle and not result:
+                instance = idle.pop()
+                if instance.healthy:
+                    result = instance
+                else:
+                    failed.append(instance)
+            if not idle:
+                self._idle.pop(key, None)
+            self.statistics.discarded += len(failed)
+        for instance in failed:
+            instance.stop()
+        if result:
+            return result
+        if backend == ViperVerifier.silicon:
+            instance = Silicon(self.jvm, _POOLED_FILE_NAME, options)
+        elif backend == ViperVerifier.carbon:
+            instance = Carbon(self.jvm, _POOLED_FILE_NAME, options)
+        else:
+            raise ValueError('Unknown verifier: ' + str(backend))
+        instance.pool_key = key
+        with self._lock:
+            self.statistics.started += 1
+            self.statistics.startup_time += instance.startup_time
+        return instance
+
+    def release(self, instance) -> None:
+        """
+        Returns an instance obtained from ``acquire`` to the pool. Stops it
+        if it failed, and stops the idle instances released longest ago if
+        the pool holds too many.
+        """
+        if not instance.healthy:
+            with self._lock:
+                self.statistics.discarded += 1
+            instance.stop()
+            return
+        evicted = []
+        with self._lock:
+            self._released += 1
+            instance.pool_released = self._released
+            idle = self._idle.setdefault(instance.pool_key, [])
+            idle.append(instance)
+            if len(idle) > self.max_idle_per_key:
+                evicted.append(idle.pop(0))
+            total = sum(len(instances) for instances in self._idle.values())
+            while total > self.max_idle:
+                oldest = min(self._idle.values(),
+                             key=lambda instances: instances[0].pool_released)
+                evicted.append(oldest.pop(0))
+                if not oldest:
+                    self._idle.pop(evicted[-1].pool_key)
+                total -= 1
+            self.statistics.evicted += len(evicted)
+        for idle_instance in evicted:
+            idle_instance.stop()
+
+    def start(self, backend: ViperVerifier, options: Sequence[str] = (),
+              count: int = 1) -> None:
+        """
+        Starts instances of the given backend ahead of time, until the pool
+        holds at least ``count`` idle ones (or as many as it may hold).
+        """
+        key = (backend, tuple(options))
+        count = min(count, self.max_idle_per_key, self.max_idle)
+        with self._lock:
+            missing = count - len(self._idle.get(key, []))
+        instances = [self.acquire(backend, options) for _ in range(missing)]
+        for instance in instances:
+            self.release(instance)
+
+    def verify(self, prog: 'silver.ast.Program', backend: ViperVerifier,
+               arp: bool = False, options: Sequence[str] = (),
+               watchdog: Watchdog = None) -> VerificationResult:
+        """
+        Verifies the given program on an instance from the pool. If the
+        given watchdog stops the instance or its budget is used up, the
+        result is a failure with the corresponding outcome.
+        """
+        if watchdog and watchdog.exhausted():
+            return Failure.from_errors(
+                [], [watchdog.describe(BUDGET_EXCEEDED)], BUDGET_EXCEEDED)
+        instance = self.acquire(backend, options)
+        if watchdog:
+            watchdog.watch(instance)
+        result = None
+        try:
+            with profiler.span(backend.name, 'backend',
+                               methods=prog.methods().size()):
+                result = instance.verify(prog, arp=arp)
+        except Exception:
+            if not (watchdog and watchdog.interrupted(instance)):
+                raise
+        finally:
+            interruption = watchdog.unwatch(instance) if watchdog else None
+            with self._lock:
+                self.statistics.verifications += 1
+                self.statistics.verification_time += instance.verification_time
+            self.release(instance)
+        if interruption:
+            # The result of a stopped instance cannot be trusted.
+            result = Failure.from_errors(
+                [], [watchdog.describe(interruption)], interruption)
+        result.duration = instance.verification_time
+        return result
+
+    def verify_all(self, progs: List['silver.ast.Program'],
+                   backend: ViperVerifier, arp: bool = False,
+                   options: Sequence[str] = (),
+                   workers: int = 1,
+                   watchdog: Watchdog = None) -> List[VerificationResult]:
+        """
+        Verifies the given independent programs concurrently on up to
+        ``workers`` instances from the pool. Returns their results in the
+        same order, they can be combined using ``merge_results``.
+        """
+        def verify_one(prog: 'silver.ast.Program') -> VerificationResult:
+            self.jvm.attach_current_thread()
+            return self.verify(prog, backend, arp=arp, options=options,
+                               watchdog=watchdog)
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            return list(executor.map(verify_one, progs))
+
+    def shutdown(self) -> None:
+        """
+        Stops all idle instances.
+        """
+        with self._lock:
+            idle = [i for instances in self._idle.values() for i in instances]
+            self._idle.clear()
+        for instance in idle:
+            instance.stop()
+
+
+_BACKEND_POOL = None
+
+
+def get_backend_pool(jvm: JVM) -> BackendPool:
+    global _BACKEND_POOL
+    if not _BACKEND_POOL:
+        _BACKEND_POOL = BackendPool(jvm)
+    return _BACKEND_POOL
@@ -0,0 +1,47 @@
+from nagini_contracts.contracts import *
+
+
+class Animal:
+    pass
+
+
+class Dog(Animal):
+    pass
+
+
+class Puppy(Dog):
+    pass
+
+
+class Cat(Animal):
+    pass
+
+
+def transitive(p: Puppy) -> None:
+    Assert(isinstance(p, Dog))
+    Assert(isinstance(p, Animal))
+    Assert(isinstance(p, object))
+
+
+def exclusive(o: object) -> None:
+    Requires(isinstance(o, Dog))
+    Assert(isinstance(o, Animal))
+    Assert(not isinstance(o, Cat))
+    #:: ExpectedOutput(assert.failed:assertion.false)
+    Assert(isinstance(o, Puppy))
+
+
+def branches(o: object) -> Animal:
+    Ensures(isinstance(Result(), Animal))
+    Ensures(not isinstance(Result(), Dog) or isinstance(o, Puppy))
+    if isinstance(o, Puppy):
+        return o
+    return Cat()
+
+
+def wrong_branches(o: object) -> Animal:
+    #:: ExpectedOutput(postcondition.violated:assertion.false)
+    Ensures(isinstance(Result(), Dog))
+    if isinstance(o, Dog):
+        return o
+    return Cat()
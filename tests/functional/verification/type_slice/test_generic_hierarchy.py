@@ -0,0 +1,43 @@
+from nagini_contracts.contracts import *
+from typing import Generic, TypeVar
+
+T = TypeVar('T')
+
+
+class Fruit:
+    pass
+
+
+class Apple(Fruit):
+    pass
+
+
+class Box(Generic[T]):
+    def __init__(self, content: T) -> None:
+        Ensures(Acc(self.content) and self.content is content)  # type: ignore
+        self.content = content
+
+    def get(self) -> T:
+        Requires(Acc(self.content))
+        Ensures(Acc(self.content) and Result() is self.content)
+        return self.content
+
+
+class FruitBox(Box[Fruit]):
+    pass
+
+
+def client(b: FruitBox) -> None:
+    Requires(Acc(b.content))
+    Assert(isinstance(b, Box))
+    f = b.get()
+    Assert(isinstance(f, Fruit))
+    #:: ExpectedOutput(assert.failed:assertion.false)
+    Assert(isinstance(f, Apple))
+
+
+def apples() -> None:
+    box = Box(Apple())  # type: Box[Apple]
+    a = box.get()
+    Assert(isinstance(a, Apple))
+    Assert(isinstance(a, Fruit))
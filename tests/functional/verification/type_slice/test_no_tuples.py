@@ -0,0 +1,33 @@
+from nagini_contracts.contracts import *
+from typing import List
+
+
+class Item:
+    pass
+
+
+class Special(Item):
+    pass
+
+
+def first(items: List[Item]) -> Item:
+    Requires(Acc(list_pred(items)) and len(items) > 0)
+    Ensures(Acc(list_pred(items)))
+    Ensures(Result() is items[0])
+    return items[0]
+
+
+def make() -> List[Item]:
+    Ensures(Acc(list_pred(Result())) and len(Result()) == 2)
+    Ensures(isinstance(Result()[1], Special))
+    result = [Item(), Special()]  # type: List[Item]
+    return result
+
+
+def client() -> None:
+    items = make()
+    Assert(isinstance(items[1], Special))
+    i = first(items)
+    Assert(isinstance(i, Item))
+    #:: ExpectedOutput(assert.failed:assertion.false)
+    Assert(isinstance(i, Special))
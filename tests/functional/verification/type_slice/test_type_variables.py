@@ -0,0 +1,42 @@
+from nagini_contracts.contracts import *
+
+# In a closed type slice, the subtype relation is only axiomatized for class
+# literals: issubtype(t1, t2) && issubtype(t2, A()) no longer implies
+# issubtype(t1, A()) if t1 and t2 are both variable types. Python code relates
+# variable types (the types of objects and the cls parameters of class
+# methods) only by equality, which the solver handles without these chains,
+# so the programs below verify as they do without the slice.
+
+
+class Shape:
+    @classmethod
+    def create(cls) -> 'Shape':
+        Ensures(type(Result()) is cls)
+        return cls()
+
+
+class Square(Shape):
+    @classmethod
+    def create_square(cls) -> Shape:
+        Ensures(type(Result()) is cls)
+        Ensures(isinstance(Result(), Square))
+        return cls.create()
+
+
+class Circle(Shape):
+    pass
+
+
+def same_type(a: Square, b: object) -> None:
+    Requires(type(b) is type(a))
+    Assert(isinstance(b, Square))
+    Assert(isinstance(b, Shape))
+    Assert(not isinstance(b, Circle))
+
+
+def client() -> None:
+    s = Square.create_square()
+    Assert(isinstance(s, Square))
+    Assert(not isinstance(s, Circle))
+    #:: ExpectedOutput(assert.failed:assertion.false)
+    Assert(type(s) is Shape)